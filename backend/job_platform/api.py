@@ -1,13 +1,28 @@
 from ninja import NinjaAPI
 from jobs.api import router as jobs_router
 from user_auth.api import router as auth_router
+from taskqueue.api import router as tasks_router
+from jobs.deadlines import QueryDeadlineExceeded
+from job_platform.renderers import FastJSONRenderer
 
 api = NinjaAPI(
     title="Job Platform API",
     description="API for managing job postings. Spec: https://django-ninja.dev/guides/api-docs/",
     version="1.0.0",
-    docs_url="/docs/"
+    docs_url="/docs/",
+    renderer=FastJSONRenderer(),
 )
 
 api.add_router("/auth", auth_router, tags=["Authentication"])
 api.add_router("/jobs", jobs_router, tags=["jobs"])
+api.add_router("/tasks", tasks_router, tags=["tasks"])
+
+
+@api.exception_handler(QueryDeadlineExceeded)
+def query_deadline_exceeded(request, exc):
+    # 查詢超過時間預算時已中斷，不佔用 worker；回傳 503 讓客戶端縮小篩選條件或稍後重試
+    return api.create_response(
+        request,
+        {"message": f"The query exceeded its {exc.budget:g}s time budget; narrow the filters or try again later."},
+        status=503,
+    )
@@ -0,0 +1,56 @@
+import datetime
+import json
+
+from django.conf import settings
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用套件，未安裝時使用標準函式庫
+    orjson = None
+
+_ninja_encoder = NinjaJSONEncoder()
+
+
+def encode_default(o):
+    """與 NinjaJSONEncoder 輸出相同，但 datetime 走捷徑，不經過類別繼承鏈逐層判斷。"""
+    if type(o) is datetime.datetime:
+        # 與 DjangoJSONEncoder 相同：毫秒精度，UTC 以 Z 結尾
+        r = o.isoformat(timespec="milliseconds") if o.microsecond else o.isoformat()
+        if r.endswith("+00:00"):
+            r = r[:-6] + "Z"
+        return r
+    return _ninja_encoder.default(o)
+
+
+# 共用的 encoder 實例，避免每次 json.dumps(cls=...) 都重新建立
+_default_encoder = json.JSONEncoder(default=encode_default)
+_compact_encoder = json.JSONEncoder(default=encode_default, separators=(",", ":"), ensure_ascii=False)
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(BaseRenderer):
+    """
+    NinjaAPI 用的 JSON renderer。
+
+    預設輸出與 ninja 內建 JSONRenderer 逐位元組相同；設定 JSON_RENDERER_COMPACT = True 時改用
+    orjson（未安裝時退回標準函式庫）輸出不含空白、不跳脫非 ASCII 字元的緊湊格式。
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, compact=None):
+        self.compact = compact
+
+    def render(self, request, data, *, response_status):
+        compact = self.compact
+        if compact is None:
+            compact = getattr(settings, "JSON_RENDERER_COMPACT", False)
+        if not compact:
+            return _default_encoder.encode(data)
+        if orjson is not None:
+            return orjson.dumps(data, default=encode_default, option=_ORJSON_OPTIONS)
+        return _compact_encoder.encode(data)
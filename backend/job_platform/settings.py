@@ -62,6 +62,7 @@ INSTALLED_APPS = [
     'ninja',
     'jobs',
     'user_auth',
+    'taskqueue',
     'corsheaders',
 ]
 
@@ -81,6 +82,7 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'job_platform.urls'
 WSGI_APPLICATION = 'job_platform.wsgi.application'
+ASGI_APPLICATION = 'job_platform.asgi.application'
 
 DATABASES = {
   'default': {
@@ -119,6 +121,125 @@ NINJA_JWT = {
   'SIGNING_KEY': SECRET_KEY,
 }
 
+# True 時 API 以 orjson 輸出緊湊 JSON（無空白、不跳脫非 ASCII）；預設與 ninja 內建輸出逐位元組相同
+JSON_RENDERER_COMPACT = os.environ.get('JSON_RENDERER_COMPACT', 'False').lower() in ('true', '1', 'yes', 'on')
+
+# GET /api/jobs/batch 一次最多可查詢的職缺數量
+JOBS_BATCH_MAX_SIZE = 100
+
+# archive_jobs 預設封存到期超過幾天的職缺
+JOBS_ARCHIVE_AFTER_DAYS = 30
+
+# purge_jobs：到期超過幾天的職缺永久刪除，以及每批的 id 範圍大小與批次間暫停秒數
+JOBS_RETENTION_DAYS = 365
+JOBS_PURGE_BATCH_SIZE = 500
+JOBS_PURGE_PAUSE = 0.05
+
+# GET /api/jobs/facets：統計快取秒數（單筆寫入會增量更新，期限只限制狀態隨時間改變造成的誤差）、
+# 最多保留幾組篩選條件的快取，以及每個欄位最多回傳的項目數
+JOBS_FACETS_CACHE_TTL = 300
+JOBS_FACETS_MAX_ENTRIES = 100
+JOBS_FACETS_MAX_LIMIT = 50
+
+# GET /api/jobs/suggest：記憶體內前綴索引在背景重建的間隔秒數（涵蓋其他行程的寫入）與最多回傳筆數
+JOBS_SUGGEST_REFRESH_SECONDS = 300
+JOBS_SUGGEST_MAX_LIMIT = 20
+
+# list_jobs 的 title / company_name / location 篩選：符合的相異值超過此數量時改用 icontains 掃描
+JOBS_TRIGRAM_MAX_TERMS = 50
+# list_jobs?fuzzy=true：trigram 相似度門檻與每個欄位最多納入幾個相近的值
+JOBS_FUZZY_THRESHOLD = 0.3
+JOBS_FUZZY_MAX_TERMS = 50
+
+# GET /api/jobs/{id}/similar：TF-IDF 向量的維度（hashing trick）、索引存檔位置（None 表示不存檔）、
+# 背景重建間隔秒數與最多回傳筆數
+JOBS_SIMILAR_DIMENSIONS = 256
+JOBS_SIMILAR_INDEX_PATH = BASE_DIR / 'similar_index.npz'
+JOBS_SIMILAR_REFRESH_SECONDS = 600
+JOBS_SIMILAR_MAX_LIMIT = 50
+
+# 儲存的搜尋：挑選反向索引鍵時統計 trigram 出現次數的最近職缺數量與統計快取秒數
+JOBS_PERCOLATOR_SAMPLE_SIZE = 5000
+JOBS_PERCOLATOR_STATS_TTL = 3600
+
+# 同公司近似重複刊登：MinHash 估計的 title + description 相似度門檻，以及 POST /api/jobs 遇到重複時
+# 拒絕（"reject"，回傳 409）或照常建立並記錄（"flag"）；批次寫入一律只記錄
+JOBS_DUPLICATE_THRESHOLD = 0.8
+JOBS_DUPLICATE_ACTION = "reject"
+
+# GET /api/jobs/changes 每次最多回傳的變更數量，以及 compact_job_changes 保留刪除紀錄的天數
+JOBS_CHANGES_MAX_LIMIT = 1000
+JOBS_CHANGES_TOMBSTONE_DAYS = 30
+
+# GET /api/jobs/events：廣播器輪詢變更紀錄的間隔秒數（同一行程的寫入會立即喚醒）、閒置連線送出
+# keepalive 的間隔秒數，以及每個連線最多暫存的事件數（超過時結束連線，由客戶端以 Last-Event-ID 重新連線補讀）
+JOBS_EVENTS_POLL_INTERVAL = 1.0
+JOBS_EVENTS_HEARTBEAT_SECONDS = 15
+JOBS_EVENTS_QUEUE_SIZE = 1000
+
+# True 時 API 行程啟動後在記憶體中載入上架職缺的讀取模型，list_jobs 的 status=active 查詢不經過資料庫；
+# 讀取模型落後變更紀錄超過 JOBS_READ_MODEL_MAX_LAG 筆時在背景重新載入
+JOBS_READ_MODEL = os.environ.get('JOBS_READ_MODEL', 'False').lower() in ('true', '1', 'yes', 'on')
+JOBS_READ_MODEL_MAX_LAG = 5000
+
+# 後台職缺列表：分頁最多計數到 JOBS_ADMIN_COUNT_LIMIT 筆，超過時顯示估計值；
+# 篩選選項最多列出 JOBS_ADMIN_FILTER_CHOICES 個值（超過時改為自動完成的輸入框），快取 JOBS_ADMIN_FILTER_CACHE_TTL 秒
+JOBS_ADMIN_COUNT_LIMIT = 10000
+JOBS_ADMIN_FILTER_CHOICES = 50
+JOBS_ADMIN_FILTER_CACHE_TTL = 300
+
+# True 時新增與修改職缺的寫入交給行程內單一寫入執行緒，同時到達的寫入在同一個交易中提交（群組提交）；
+# 佇列中沒有等待的寫入時最多再等 JOBS_WRITE_COALESCE_WINDOW_MS 毫秒收集，每個交易最多 JOBS_WRITE_COALESCE_MAX_BATCH 筆
+JOBS_WRITE_COALESCING = os.environ.get('JOBS_WRITE_COALESCING', 'False').lower() in ('true', '1', 'yes', 'on')
+JOBS_WRITE_COALESCE_WINDOW_MS = 2
+JOBS_WRITE_COALESCE_MAX_BATCH = 100
+
+# 各操作的查詢時間預算（秒）：超過時中斷查詢並回傳 503，避免描述全文比對加上多個技能條件等查詢長時間佔用 worker；
+# staff 使用 JOBS_QUERY_DEADLINES_STAFF（未列出的操作不限制）
+JOBS_QUERY_DEADLINES = {"list": 2.0, "facets": 3.0}
+JOBS_QUERY_DEADLINES_STAFF = {}
+
+# True 時寫入的職缺描述以從現有描述訓練的 zlib 字典壓縮存放（只支援 SQLite），讀取時才解壓縮；
+# 既有的職缺由 compress_job_descriptions 分批壓縮，每次訓練字典抽樣最近 JOBS_DESCRIPTION_DICTIONARY_SAMPLE 筆描述
+JOBS_COMPRESS_DESCRIPTIONS = os.environ.get('JOBS_COMPRESS_DESCRIPTIONS', 'False').lower() in ('true', '1', 'yes', 'on')
+JOBS_DESCRIPTION_DICTIONARY_SAMPLE = 5000
+
+# 依公司名稱把職缺（Job 與 ArchivedJob）分散到 JOBS_SHARDS 個資料庫，各分片各自取得寫入鎖，列表平行查詢各分片後合併；
+# 1 表示不分片。第 0 個分片為 default（既有的職缺留在這裡），其餘為 BASE_DIR 下的 jobs_shard_<n>.sqlite3，
+# 新增分片後以 python manage.py migrate --database jobs_shard_<n> 建立資料表。職缺 id 的高位元為分片編號
+JOBS_SHARDS = int(os.environ.get('JOBS_SHARDS', '1'))
+JOBS_SHARD_DATABASES = ['default'] + [f'jobs_shard_{index}' for index in range(1, JOBS_SHARDS)]
+DATABASES.update({
+    alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / f'{alias}.sqlite3'}
+    for alias in JOBS_SHARD_DATABASES[1:]
+})
+DATABASE_ROUTERS = ['jobs.sharding.JobShardRouter']
+
+# 背景工作佇列（run_worker）：認領後 TASKQUEUE_VISIBILITY_TIMEOUT 秒內未完成也未延長租約的工作由其他 worker 重新認領；
+# 佇列為空時每 TASKQUEUE_POLL_INTERVAL 秒查詢一次；失敗的工作最多執行 TASKQUEUE_MAX_ATTEMPTS 次，
+# 第 n 次失敗後等待 TASKQUEUE_RETRY_DELAY * 2^(n-1) 秒再重試
+TASKQUEUE_VISIBILITY_TIMEOUT = 300
+TASKQUEUE_POLL_INTERVAL = 1.0
+TASKQUEUE_MAX_ATTEMPTS = 3
+TASKQUEUE_RETRY_DELAY = 10
+
+# 快取。default 預設為各行程獨立的記憶體快取：facets 統計、查詢期限的計數等只在寫入的行程內更新。
+# shared 存放所有行程需要一致的少量資料（facets 統計的世代編號），cron、run_worker 與其他 web 行程的批次變更
+# 才能讓每個行程的統計快取失效；未設定 Redis 時以同一台主機上的檔案（JOBS_SHARED_CACHE_DIR）共用。
+# 多台主機或需要跨行程共用完整快取時設定 REDIS_URL（需安裝 redis 套件），兩者都使用 Redis
+REDIS_URL = os.environ.get('REDIS_URL')
+JOBS_SHARED_CACHE_DIR = os.environ.get('JOBS_SHARED_CACHE_DIR', str(BASE_DIR / 'cache'))
+if REDIS_URL:
+    CACHES = {
+        alias: {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL, 'KEY_PREFIX': alias}
+        for alias in ('default', 'shared')
+    }
+else:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': JOBS_SHARED_CACHE_DIR},
+    }
+
 LOGGING = {
   'version': 1,
   'disable_existing_loggers': False,
@@ -157,6 +278,11 @@ LOGGING = {
       'level': 'DEBUG',
       'propagate': True,
     },
+    'taskqueue': {
+      'handlers': ['console', 'file'],
+      'level': 'INFO',
+      'propagate': True,
+    },
     'jobs.management.commands.update_job_status': {
       'handlers': ['console', 'file', 'job_status_file'],
       'level': 'INFO',
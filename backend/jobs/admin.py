@@ -1,11 +1,153 @@
-from django.contrib import admin
-from .models import Job
+import json
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import statuses, trigram
+from .archive import archive_expired_jobs
+from .filters import filter_jobs
+from .models import ArchivedJob, Job, SearchTerm
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    changelist 的分頁：最多計數到 JOBS_ADMIN_COUNT_LIMIT 筆（COUNT 外包一層 LIMIT，找到足夠的列就停止），
+    超過時以 PostgreSQL 查詢計畫估計的筆數分頁，其他資料庫只顯示超過上限。count_label 為頁面上顯示的數量。
+    """
+    count_label = None
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, "JOBS_ADMIN_COUNT_LIMIT", 10000)
+        # 依主鍵由新到舊掃描：不使用日期範圍索引從最舊的職缺開始找，符合的列不論集中在哪一端都能很快湊滿上限
+        count = self.object_list.order_by("-pk")[:limit + 1].count()
+        if count <= limit:
+            return count
+        estimate = estimated_count(self.object_list.order_by())
+        if estimate > limit:
+            self.count_label = f"About {estimate:,}"
+            return estimate
+        self.count_label = f"More than {limit:,}"
+        return limit
+
+
+def estimated_count(queryset):
+    """查詢計畫估計的筆數；只有 PostgreSQL 提供，其他資料庫回傳 0"""
+    if connection.vendor != "postgresql":
+        return 0
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class StatusFilter(admin.SimpleListFilter):
+    """與 list_jobs 的 status 參數相同的條件，可以使用日期與狀態欄位的索引"""
+    title = "status"
+    parameter_name = "status"
+
+    def lookups(self, request, model_admin):
+        return (("active", "Active"), ("expired", "Expired"), ("scheduled", "Scheduled"))
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return filter_jobs(queryset, status=self.value())
+        return queryset
+
+
+class TermFilter(admin.SimpleListFilter):
+    """
+    以 SearchTerm 中的相異值作為選項，不對職缺資料表 SELECT DISTINCT；選項快取 JOBS_ADMIN_FILTER_CACHE_TTL 秒。
+    相異值超過 JOBS_ADMIN_FILTER_CHOICES 個時不列出選項，改為輸入框：輸入時向 autocomplete 網址查詢符合的值，
+    篩選時以 trigram 索引比對子字串。
+    """
+    template = "admin/jobs/term_filter.html"
+    autocomplete = False
+
+    def lookups(self, request, model_admin):
+        limit = getattr(settings, "JOBS_ADMIN_FILTER_CHOICES", 50)
+        key = f"jobs:admin:choices:{self.parameter_name}"
+        values = cache.get(key)
+        if values is None:
+            values = list(SearchTerm.objects.filter(field=self.parameter_name).order_by("value")
+                          .values_list("value", flat=True)[:limit + 1])
+            cache.set(key, values, getattr(settings, "JOBS_ADMIN_FILTER_CACHE_TTL", 300))
+        if len(values) > limit:
+            self.autocomplete = True
+            self.autocomplete_url = reverse("admin:jobs_job_autocomplete", args=[self.parameter_name])
+            return ()
+        return [(value, value) for value in values]
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        if self.autocomplete:
+            return queryset.filter(trigram.substring_filter(self.parameter_name, value))
+        return queryset.filter(**{self.parameter_name: value})
+
+    def choices(self, changelist):
+        # 輸入框以 GET 表單送出，保留其他篩選條件
+        self.preserved = [(name, value) for name, value in changelist.params.items() if name != self.parameter_name]
+        return super().choices(changelist)
+
+
+class LocationFilter(TermFilter):
+    title = "location"
+    parameter_name = "location"
+
+
+class CompanyFilter(TermFilter):
+    title = "company name"
+    parameter_name = "company_name"
+
+
+class JobChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        # 列表不顯示 description，不讀取這個大欄位
+        return super().get_queryset(request, exclude_parameters).defer("description")
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    大量職缺的 changelist：不另外計算整張表的筆數、分頁計數有上限，搜尋以 trigram 索引找出符合的
+    title / company_name / location 值再以欄位索引查詢（結果與 icontains 相同），不掃描 description。
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-posting_date', '-id')
+    search_fields = trigram.SEARCH_FIELDS
+    search_help_text = "Substring match on title, company name or location."
+
+    def get_changelist(self, request, **kwargs):
+        return JobChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = Q()
+        for field in trigram.SEARCH_FIELDS:
+            condition |= trigram.substring_filter(field, search_term)
+        return queryset.filter(condition), False
+
 
 @admin.register(Job)
-class JobAdmin(admin.ModelAdmin):
+class JobAdmin(LargeTableAdmin):
     list_display = ('title', 'company_name', 'location', 'posting_date', 'expiration_date', 'status', 'is_active', 'is_scheduled')
-    list_filter = ('is_active', 'is_scheduled', 'location', 'company_name')
-    search_fields = ('title', 'description', 'company_name', 'location')
+    list_filter = (StatusFilter, 'is_active', 'is_scheduled', LocationFilter, CompanyFilter)
+    actions = ('activate_jobs', 'expire_jobs', 'archive_jobs')
     fieldsets = (
         ('Basic Information', {
             'fields': ('title', 'description', 'company_name', 'location', 'salary_range')
@@ -17,3 +159,54 @@ class JobAdmin(admin.ModelAdmin):
             'fields': ('required_skills',)
         }),
     )
+
+    def get_urls(self):
+        urls = [
+            path('autocomplete/<str:field>/', self.admin_site.admin_view(self.autocomplete_view),
+                 name='jobs_job_autocomplete'),
+        ]
+        return urls + super().get_urls()
+
+    def autocomplete_view(self, request, field):
+        """篩選輸入框的候選值：包含輸入文字的相異值（少於三個字元時為開頭相同），依字母排序"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if field not in trigram.SEARCH_FIELDS:
+            raise Http404
+        term = request.GET.get('term', '').strip()
+        if trigram.trigrams(term):
+            values = trigram.substring_terms(field, term)
+        else:
+            values = SearchTerm.objects.filter(field=field, value__istartswith=term).values("value")
+        limit = getattr(settings, "JOBS_ADMIN_FILTER_CHOICES", 50)
+        return JsonResponse({"results": list(values.order_by("value").values_list("value", flat=True)[:limit])})
+
+    # 批次操作以 id 分批更新並寫入變更紀錄，不逐筆載入職缺；選取所有結果時也不會一次鎖定整張表
+
+    @admin.action(description="Activate selected jobs now")
+    def activate_jobs(self, request, queryset):
+        count = statuses.activate_jobs(queryset, timezone.now())
+        self.message_user(request, f"Activated {count} jobs; expired and already active jobs were skipped.", messages.SUCCESS)
+
+    @admin.action(description="Expire selected jobs now")
+    def expire_jobs(self, request, queryset):
+        count = statuses.expire_jobs(queryset, timezone.now())
+        self.message_user(request, f"Expired {count} jobs; already expired jobs were skipped.", messages.SUCCESS)
+
+    @admin.action(description="Archive selected expired jobs")
+    def archive_jobs(self, request, queryset):
+        count = archive_expired_jobs(timezone.now(), queryset=queryset)
+        self.message_user(request, f"Archived {count} expired jobs; jobs that have not expired were skipped.", messages.SUCCESS)
+
+
+@admin.register(ArchivedJob)
+class ArchivedJobAdmin(LargeTableAdmin):
+    """封存的過期職缺，只供查閱"""
+    list_display = ('title', 'company_name', 'location', 'posting_date', 'expiration_date')
+    list_filter = (LocationFilter, CompanyFilter)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
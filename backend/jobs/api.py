@@ -5,19 +5,40 @@ from ninja.pagination import paginate, PageNumberPagination
 from ninja.params import Query
 from typing import List, Optional
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q, F, Case, When, Value, BooleanField, DateTimeField, ExpressionWrapper
+from django.db.models.lookups import LessThan
 from django.utils import timezone
 from django.core.management import call_command
+from django.conf import settings
 
-from .models import Job
-from .schemas import JobSchema, JobCreateSchema, JobUpdateSchema, MessageSchema, JobFilterSchema, OrderSchema, JobListSchema
+from .models import Job, ArchivedJob, SavedSearch
+from .schemas import JobSchema, JobCreateSchema, JobUpdateSchema, JobPatchSchema, JobConflictSchema, MessageSchema, JobFilterSchema, OrderSchema, JobListItemSchema, JobDetailSchema, JobBatchSchema, JobFacetsSchema, FacetValueSchema, SimilarJobSchema, SavedSearchCreateSchema, SavedSearchSchema, SavedSearchMatchSchema, DuplicateJobSchema, JobChangesSchema, QueryDeadlinesSchema
+from .schemas import STATUS_DEPENDENCIES
+from .fieldsets import parse_fields, project, columns_for, FieldsetQuerySet, LIST_COLUMNS
+from .updates import update_returning
+from .coalescer import atomic_write
+from .deadlines import with_query_deadline
+from . import changes, deadlines, dedupe, facets, search, sharding, statuses
+from .signals import job_patched
+from .events import EVENT_STATUSES, job_events
+from .percolator import NOTIFY_STATUSES
+from .readmodel import READ_MODEL_FIELDS, active_jobs
+from .similar import similar_index
+from .suggest import SUGGEST_FIELDS, suggest_index
+from .salary import parse_salary_range
+from .compression import stored_description
+from .filters import filter_jobs, includes_archive
 from user_auth.authentication import jwt_auth
+from taskqueue.queue import enqueue
+from taskqueue.schemas import TaskSchema
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
-@router.post("", response={201: JobSchema, 400: MessageSchema, 401: MessageSchema}, auth=jwt_auth)
+@router.post("", response={201: JobSchema, 400: MessageSchema, 401: MessageSchema, 409: DuplicateJobSchema}, auth=jwt_auth)
 def create_job(request, payload: JobCreateSchema):
     data = payload.dict()
     
@@ -68,16 +89,26 @@ def create_job(request, payload: JobCreateSchema):
     if data["posting_date"] >= expiration_date:
         return 400, {"message": "Posting date must be before expiration date"}
     
+    # 同公司的近似重複刊登：JOBS_DUPLICATE_ACTION 為 "reject" 時拒絕，"flag" 時照常建立並記錄在 JobFingerprint
+    if getattr(settings, "JOBS_DUPLICATE_ACTION", "reject") == "reject":
+        duplicate_of = dedupe.find_duplicate(data["title"], data["description"], data["company_name"], now=now)
+        if duplicate_of is not None:
+            return 409, {"message": "A near-duplicate job from this company already exists", "duplicate_of": duplicate_of}
+
     # 創建職位
     try:
-        job = Job.objects.create(**data)
+        # 變更紀錄在 post_save 中寫入，與職缺在同一個交易中提交；開啟 JOBS_WRITE_COALESCING 時與並行的寫入一起提交。
+        # 分片時職缺寫入公司所在的分片，default 中的變更紀錄等各自提交
+        shard = sharding.shard_for_company(data["company_name"])
+        job = atomic_write(Job.objects.using(shard).create, **data, using=shard)
         logger.info(f"Created job: {job.title} (ID: {job.id}, Status: {job.status})")
         return 201, job
     except Exception as e:
         logger.error(f"Error creating job: {str(e)}")
         return 400, {"message": f"Error creating job: {str(e)}"}
 
-@router.get("", response=List[JobListSchema], auth=jwt_auth)
+@router.get("", response=List[JobListItemSchema], auth=jwt_auth)
+@with_query_deadline("list")
 @paginate(PageNumberPagination, page_size=10)
 def list_jobs(
     request,
@@ -88,66 +119,277 @@ def list_jobs(
     salary_range: Optional[str] = None,
     required_skills: Optional[str] = None,
     status: Optional[str] = None,
-    order_by: Optional[str] = None
+    salary_min_gte: Optional[int] = None,
+    salary_max_lte: Optional[int] = None,
+    salary_currency: Optional[str] = None,
+    order_by: Optional[str] = None,
+    fields: Optional[str] = None,
+    fuzzy: bool = False,
+    q: Optional[str] = None
 ):
-    jobs = Job.objects.all()
-
-    if title:
-        jobs = jobs.filter(title__icontains=title)
-    if description:
-        jobs = jobs.filter(description__icontains=description)
-    if company_name:
-        jobs = jobs.filter(company_name__icontains=company_name)
-    if location:
-        jobs = jobs.filter(location__icontains=location)
-    if salary_range:
-        jobs = jobs.filter(salary_range__icontains=salary_range)
-    if required_skills:
-        skills = [skill.strip() for skill in required_skills.split(',') if skill.strip()]
-        query = Q()
-        for skill in skills:
-            query &= Q(required_skills__icontains=skill)
-        if query:
-            jobs = jobs.filter(query)
-
-    if status:
-        now = timezone.now()
-        if status.lower() == "active":
-            # 活躍職位：is_active=True + 過了發布日期(或未設定) + 未過期
-            jobs = jobs.filter(
-                Q(is_active=True) &
-                Q(posting_date__lte=now) &
-                Q(expiration_date__gt=now) &
-                Q(is_scheduled=False)  # 排程職位不能是活躍的
-            )
-        elif status.lower() == "expired":
-            # 過期職位：過期日期已過
-            jobs = jobs.filter(expiration_date__lt=now)
-        elif status.lower() == "scheduled":
-            # 排程職位：is_scheduled=True + 發布日期在未來
-            jobs = jobs.filter(
-                Q(is_scheduled=True) &
-                Q(posting_date__gt=now)
-            )
+    selected_fields = parse_fields(fields)
+    filters = {"title": title, "description": description, "company_name": company_name, "location": location,
+               "salary_range": salary_range, "required_skills": required_skills, "status": status,
+               "salary_min_gte": salary_min_gte, "salary_max_lte": salary_max_lte, "salary_currency": salary_currency,
+               "fuzzy": fuzzy, "q": q}
+    now = timezone.now()
 
     logger.debug(f"Filtered order_by: {order_by}")
+    ordering = list(Job._meta.ordering)
     if order_by:
         valid_order_fields = ["posting_date", "-posting_date", "expiration_date", "-expiration_date"]
         if order_by in valid_order_fields:
-            jobs = jobs.order_by(order_by)
+            ordering = [order_by]
+        elif order_by == "relevance" and search.keywords(q):
+            # 依 q 的 BM25 分數排序，分數相同時較新的職缺在前
+            ordering = ["-search_rank"] + ordering
+    if fuzzy and (title or company_name or location):
+        # 模糊搜尋時依相似度排序，相同分數再依指定欄位排序
+        ordering = ["-search_score"] + ordering
+    # 同一時間的職缺很多，依 id 排序讓分頁結果固定（方向與日期欄位相同）
+    ordering.append("-id" if ordering[-1].startswith("-") else "id")
+
+    # 讀取模型只載入 default 的職缺，分片時改查各分片
+    if (getattr(settings, "JOBS_READ_MODEL", False) and not sharding.is_sharded()
+            and (not selected_fields or set(selected_fields) <= READ_MODEL_FIELDS)):
+        # 上架中職缺的查詢由記憶體內的讀取模型回答，條件不支援時回傳 None 改查資料庫
+        jobs = active_jobs.query(filters, order_by, now)
+        if jobs is not None:
+            return FieldsetQuerySet(jobs, selected_fields) if selected_fields else jobs
+
+    # 只 SELECT 輸出需要的欄位
+    columns = columns_for(selected_fields) if selected_fields else LIST_COLUMNS
+    if includes_archive(status):
+        # 過期職缺可能已被封存，合併查詢 Job 與 ArchivedJob；排序欄位必須在 SELECT 中
+        columns = list(columns) + [name.lstrip("-") for name in ordering
+                                   if name.lstrip("-") not in columns and name not in ("-search_score", "-search_rank")]
+        hot = filter_jobs(Job.objects.all(), now=now, **filters).order_by().only(*columns)
+        archived = filter_jobs(ArchivedJob.objects.all(), now=now, **filters).order_by().only(*columns)
+        jobs = hot.union(archived, all=True).order_by(*ordering)
     else:
-        jobs = jobs.order_by(*Job._meta.ordering)
+        jobs = filter_jobs(Job.objects.all(), now=now, **filters).order_by(*ordering).only(*columns)
+    # 分片時平行查詢各分片，依排序合併後分頁
+    jobs = jobs.across_shards()
 
+    if selected_fields:
+        return FieldsetQuerySet(jobs, selected_fields)
     return jobs
 
-@router.get("/{job_id}", response={200: JobSchema, 404: MessageSchema}, auth=jwt_auth)
-def get_job(request, job_id: int):
-    job = get_object_or_404(Job, id=job_id)
+@router.get("/facets", response={200: JobFacetsSchema, 400: MessageSchema}, auth=jwt_auth)
+@with_query_deadline("facets")
+def get_job_facets(request, filters: JobFilterSchema = Query(...), limit: int = 10):
+    """與 list_jobs 相同的篩選條件下，各狀態、地點、公司與技能的職缺數量"""
+    max_limit = getattr(settings, "JOBS_FACETS_MAX_LIMIT", 50)
+    if not 1 <= limit <= max_limit:
+        return 400, {"message": f"limit must be between 1 and {max_limit}"}
+    return 200, facets.get_facets(filters.dict(), limit)
+
+@router.get("/suggest", response={200: List[FacetValueSchema], 400: MessageSchema}, auth=jwt_auth)
+def suggest_jobs(request, field: str, prefix: str, limit: int = 10):
+    """輸入提示：欄位值中任一單字以 prefix 開頭的值，依上架中職缺的出現次數排序"""
+    if field not in SUGGEST_FIELDS:
+        return 400, {"message": f"field must be one of: {', '.join(SUGGEST_FIELDS)}"}
+    max_limit = getattr(settings, "JOBS_SUGGEST_MAX_LIMIT", 20)
+    if not prefix.strip() or not 1 <= limit <= max_limit:
+        return 400, {"message": f"prefix must not be empty and limit must be between 1 and {max_limit}"}
+    return 200, suggest_index.suggest(field, prefix.strip(), limit)
+
+@router.post("/saved-searches", response={201: SavedSearchSchema, 400: MessageSchema}, auth=jwt_auth)
+def create_saved_search(request, payload: SavedSearchCreateSchema):
+    """儲存篩選條件；之後新上架（或排程轉為上架）且符合條件的職缺會記錄在 matches 中"""
+    data = payload.dict()
+    name = data.pop("name").strip()
+    if not name:
+        return 400, {"message": "name must not be empty"}
+    # 新職缺以 facets.matches() 在 Python 中比對，無法判斷關鍵字與模糊比對
+    if data.pop("q") or data.pop("fuzzy"):
+        return 400, {"message": "saved searches do not support q or fuzzy"}
+    filters = {key: value for key, value in data.items() if value not in (None, "")}
+    if "status" in filters:
+        filters["status"] = filters["status"].lower()
+        if filters["status"] not in NOTIFY_STATUSES:
+            return 400, {"message": f"status must be one of: {', '.join(NOTIFY_STATUSES)}"}
+    return 201, SavedSearch.objects.create(user=request.auth, name=name, filters=filters)
+
+@router.get("/saved-searches", response=List[SavedSearchSchema], auth=jwt_auth)
+def list_saved_searches(request):
+    return SavedSearch.objects.filter(user=request.auth).order_by("-created_at", "-id")
+
+@router.delete("/saved-searches/{search_id}", response={204: None, 404: MessageSchema}, auth=jwt_auth)
+def delete_saved_search(request, search_id: int):
+    get_object_or_404(SavedSearch, id=search_id, user=request.auth).delete()
+    return 204, None
+
+@router.get("/saved-searches/{search_id}/matches", response=List[SavedSearchMatchSchema], auth=jwt_auth)
+@paginate(PageNumberPagination, page_size=10)
+def list_saved_search_matches(request, search_id: int, pending: bool = False):
+    """符合儲存搜尋的新上架職缺，最新的在前；pending=true 時只列出尚未通知的"""
+    search = get_object_or_404(SavedSearch, id=search_id, user=request.auth)
+    matches = search.matches.all()
+    if pending:
+        matches = matches.filter(delivered_at__isnull=True)
+    return matches
+
+@router.get("/changes", response={200: JobChangesSchema, 400: MessageSchema}, auth=jwt_auth)
+def get_job_changes(request, since: int = 0, limit: int = 100):
+    """
+    游標 since 之後的職缺變更（新增或修改為 upsert 並附上職缺內容，刪除為 delete），依寫入順序排列。
+    以回傳的 next_cursor 繼續讀取，has_more 為 false 表示已讀到最新；since=0 取得所有職缺目前的狀態。
+    """
+    max_limit = getattr(settings, "JOBS_CHANGES_MAX_LIMIT", 1000)
+    if since < 0 or not 1 <= limit <= max_limit:
+        return 400, {"message": f"since must not be negative and limit must be between 1 and {max_limit}"}
+    items, next_cursor, has_more = changes.changes_since(since, limit)
+    return 200, {"items": items, "next_cursor": next_cursor, "has_more": has_more}
+
+@router.get("/events", response={400: MessageSchema}, auth=jwt_auth)
+async def stream_job_events(request, company_name: Optional[str] = None, status: Optional[str] = None,
+                            last_event_id: Optional[int] = None):
+    """
+    Server-Sent Events：職缺新增（created）、修改（updated）、狀態轉換（status）與刪除（deleted）發生時推送。
+    company_name / status 可用逗號分隔多個值；重新連線時以 Last-Event-ID header（或 last_event_id）補送中斷期間的事件。
+    需以 ASGI 伺服器執行，所有連線共用同一個行程內的廣播器。
+    """
+    if not isinstance(request, ASGIRequest):
+        return 400, {"message": "Event streams require the ASGI application (job_platform.asgi)"}
+    statuses = {value.strip().lower() for value in (status or "").split(",") if value.strip()}
+    if statuses - set(EVENT_STATUSES):
+        return 400, {"message": f"status must be one of: {', '.join(EVENT_STATUSES)}"}
+    companies = {value.strip().lower() for value in (company_name or "").split(",") if value.strip()}
+    header = request.headers.get("Last-Event-ID")
+    if header:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            return 400, {"message": "Last-Event-ID must be an integer"}
+
+    subscription, cursor = await job_events.subscribe(companies, statuses)
+    response = StreamingHttpResponse(job_events.stream(subscription, cursor, last_event_id),
+                                     content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # 不讓 nginx 緩衝事件
+    return response
+
+@router.get("/deadlines", response={200: QueryDeadlinesSchema, 403: MessageSchema}, auth=jwt_auth)
+def get_query_deadlines(request):
+    """各操作的查詢時間預算與超過預算的次數，只有 staff 可以查看"""
+    if not request.auth.is_staff:
+        return 403, {"message": "Staff only"}
+    return 200, {
+        "budgets": getattr(settings, "JOBS_QUERY_DEADLINES", {}),
+        "staff_budgets": getattr(settings, "JOBS_QUERY_DEADLINES_STAFF", {}),
+        "exceeded": deadlines.exceeded_counts(),
+    }
+
+@router.get("/batch", response={200: JobBatchSchema, 400: MessageSchema}, auth=jwt_auth)
+def get_jobs_batch(request, ids: str, fields: Optional[str] = None):
+    """以一次查詢取得多筆職缺，依傳入順序回傳，並列出不存在的 id"""
+    try:
+        job_ids = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        return 400, {"message": "ids must be a comma-separated list of integers"}
+    if not job_ids:
+        return 400, {"message": "ids must not be empty"}
+    max_size = getattr(settings, "JOBS_BATCH_MAX_SIZE", 100)
+    if len(job_ids) > max_size:
+        return 400, {"message": f"At most {max_size} ids can be requested at once"}
+
+    selected_fields = parse_fields(fields)
+    found = {}
+    for model in (Job, ArchivedJob):
+        # 主表找不到的 id 再到封存表查詢
+        pending = [job_id for job_id in job_ids if job_id not in found]
+        if not pending:
+            break
+        jobs = model.objects.only(*columns_for(selected_fields)) if selected_fields else model.objects.all()
+        found.update(jobs.in_bulk_by_shard(pending))
+
+    items = []
+    for job_id in job_ids:
+        job = found.get(job_id)
+        if job is not None:
+            items.append(project(job, selected_fields) if selected_fields else job)
+    return 200, {
+        "items": items,
+        "missing": [job_id for job_id in job_ids if job_id not in found],
+    }
+
+# 需在 /{job_id} 之前註冊，否則路徑會被當成 job_id 而回傳 405
+@router.post("/update-status", response={200: MessageSchema, 202: TaskSchema}, auth=jwt_auth)
+def update_job_statuses(request, background: bool = False):
+    """手動觸發更新所有職缺狀態；background=true 時加入背景工作佇列由 run_worker 執行，回傳工作供 GET /api/tasks/{id} 查詢"""
+    if background:
+        return 202, enqueue("jobs.update_statuses")
+
+    # 使用與命令相同的日誌記錄器，確保日誌一致性
+    status_logger = logging.getLogger('jobs.management.commands.update_job_status')
+    start_time = datetime.datetime.now()
+    
+    try:
+        now = timezone.now()
+        status_logger.info(f"手動API觸發更新職缺狀態，當前時間：{now}")
+        status_logger.info(f"執行環境時間：{start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # 過期、排程轉為上架（並與儲存的搜尋比對）與上架數量統計
+        expired_count, scheduled_count, active_count = statuses.update_job_statuses(now)
+        total_updated = expired_count + scheduled_count
+        
+        # 計算執行時間
+        execution_time = datetime.datetime.now() - start_time
+        
+        # 記錄到專用日誌
+        status_logger.info(f"職缺狀態更新完成 - 已過期: {expired_count}, 轉為活躍: {scheduled_count}, 執行時間: {execution_time.total_seconds():.3f}秒")
+        
+        # 一般日誌
+        logger.info(f"手動觸發更新職缺狀態: 共更新 {total_updated} 個職缺")
+        
+        return 200, {
+            "message": f"成功更新 {total_updated} 個職缺狀態：{expired_count} 個已過期，{scheduled_count} 個轉為活躍，目前共有 {active_count} 個活躍職缺"
+        }
+    except Exception as e:
+        status_logger.error(f"更新職缺狀態時發生錯誤: {str(e)}")
+        logger.error(f"更新職缺狀態時發生錯誤: {str(e)}")
+        return 200, {"message": f"更新職缺狀態時發生錯誤: {str(e)}"}
+
+@router.get("/{job_id}", response={200: JobDetailSchema, 404: MessageSchema}, auth=jwt_auth)
+def get_job(request, job_id: int, fields: Optional[str] = None):
+    selected_fields = parse_fields(fields)
+    job = None
+    for model in (Job, ArchivedJob):
+        # 主表找不到時到封存表查詢
+        jobs = model.objects.only(*columns_for(selected_fields)) if selected_fields else model.objects.all()
+        job = jobs.for_id(job_id).filter(id=job_id).first()
+        if job is not None:
+            break
+    if job is None:
+        raise Http404("No Job matches the given query.")
+    if selected_fields:
+        return project(job, selected_fields)
     return job
 
+@router.get("/{job_id}/similar", response={200: List[SimilarJobSchema], 400: MessageSchema, 404: MessageSchema}, auth=jwt_auth)
+def get_similar_jobs(request, job_id: int, limit: int = 10):
+    """與指定職缺（含封存職缺）標題、技能與描述最相似的上架中職缺，依相似度排序"""
+    max_limit = getattr(settings, "JOBS_SIMILAR_MAX_LIMIT", 50)
+    if not 1 <= limit <= max_limit:
+        return 400, {"message": f"limit must be between 1 and {max_limit}"}
+    job = Job.objects.for_id(job_id).filter(id=job_id).first() or ArchivedJob.objects.for_id(job_id).filter(id=job_id).first()
+    if job is None:
+        raise Http404("No Job matches the given query.")
+
+    ranked = similar_index.similar(job, limit)
+    # 記憶體內的索引可能還沒反映其他行程的刪除，找不到的職缺略過
+    jobs = Job.objects.only(*LIST_COLUMNS).in_bulk_by_shard([similar_id for similar_id, _ in ranked])
+    results = []
+    for similar_id, similarity in ranked:
+        if similar_id in jobs:
+            jobs[similar_id].similarity = similarity
+            results.append(jobs[similar_id])
+    return 200, results
+
 @router.put("/{job_id}", response={200: JobSchema, 400: MessageSchema, 404: MessageSchema}, auth=jwt_auth)
 def update_job(request, job_id: int, payload: JobUpdateSchema):
-    job = get_object_or_404(Job, id=job_id)
+    job = get_object_or_404(Job.objects.for_id(job_id), id=job_id)
     data = payload.dict(exclude_unset=True)
 
     if "company_name" in data:
@@ -221,64 +463,101 @@ def update_job(request, job_id: int, payload: JobUpdateSchema):
 
     for attr, value in data.items():
         setattr(job, attr, value)
+    job.version = F("version") + 1
     
-    job.save()
+    atomic_write(job.save, using=job._state.db)
     job.refresh_from_db() # 確保 status 等 property 在返回前已更新
     return job
 
+@router.patch("/{job_id}", response={200: JobSchema, 400: MessageSchema, 404: MessageSchema, 409: JobConflictSchema}, auth=jwt_auth)
+def patch_job(request, job_id: int, payload: JobPatchSchema):
+    """
+    只寫入有變更的欄位：以單一 UPDATE ... WHERE id=? AND version=? 更新並以 RETURNING 取回結果，
+    日期規則也放在 WHERE 中檢查；只有更新失敗時才再讀取一次以判斷原因。
+    """
+    data = payload.dict(exclude_unset=True)
+    version = data.pop("version")
+
+    if "company_name" in data:
+        return 400, {"message": "Company name cannot be changed."}
+    null_fields = [name for name, value in data.items() if value is None]
+    if null_fields:
+        return 400, {"message": f"Fields cannot be null: {', '.join(null_fields)}"}
+    for name in ("posting_date", "expiration_date"):
+        if name in data and timezone.is_naive(data[name]):
+            data[name] = timezone.make_aware(data[name])
+
+    if "salary_range" in data:
+        data["salary_min"], data["salary_max"], data["salary_currency"] = parse_salary_range(data["salary_range"])
+    if "description" in data:
+        # UPDATE 不經過 save()，與 save() 相同依設定壓縮
+        data["description"], data["description_compressed"] = stored_description(data["description"])
+
+    # 需要依資料庫中現有值判斷的規則，以 (條件, 錯誤訊息) 放進 WHERE
+    rules = []
+    now = timezone.now()
+    posting_date = data.get("posting_date")
+    is_scheduled = data.get("is_scheduled")
+    if is_scheduled is True:
+        if posting_date is None:
+            rules.append((Q(posting_date__gt=now), "Scheduled job posting_date must be in the future"))
+        elif posting_date <= now:
+            return 400, {"message": "Scheduled job posting_date must be in the future"}
+    elif is_scheduled is False:
+        data["posting_date"] = now
+    elif posting_date is not None:
+        # 與 PUT 相同：只有排程中的職缺能保留未來的發布日期，否則發布日期設為現在
+        if posting_date < now:
+            data["posting_date"] = now
+            data["is_scheduled"] = False
+        else:
+            data["posting_date"] = Case(When(is_scheduled=True, then=Value(posting_date)), default=Value(now))
+
+    if "posting_date" in data or "expiration_date" in data:
+        posting_value = data.get("posting_date", F("posting_date"))
+        expiration_value = data.get("expiration_date", F("expiration_date"))
+        if isinstance(posting_value, datetime.datetime) and isinstance(expiration_value, datetime.datetime):
+            if posting_value >= expiration_value:
+                return 400, {"message": "Posting date must be before expiration date."}
+        else:
+            if isinstance(posting_value, datetime.datetime):
+                posting_value = Value(posting_value, output_field=DateTimeField())
+            rules.append((LessThan(posting_value, expiration_value), "Posting date must be before expiration date."))
+
+    data["version"] = F("version") + 1
+    shard = sharding.shard_for_id(job_id)
+    status_changing = bool(set(STATUS_DEPENDENCIES) & set(data))
+
+    def apply_patch():
+        old = None
+        if status_changing:
+            # RETURNING 只能取回更新後的值；在同一個交易中先讀取原本的狀態欄位，變更紀錄才能標記狀態轉換
+            old = Job.objects.using(shard).filter(id=job_id, version=version).values(*STATUS_DEPENDENCIES).first()
+            if old is None:
+                return None
+        job = update_returning(Job, job_id, data, Q(version=version), *(condition for condition, _ in rules), using=shard)
+        if job is not None:
+            job_patched.send(sender=Job, instance=job, changed=set(data), old=old)
+        return job
+
+    job = atomic_write(apply_patch, using=shard)
+    if job is not None:
+        logger.info(f"Patched job {job.id} to version {job.version}: {', '.join(name for name in data if name != 'version')}")
+        return 200, job
+
+    # 更新失敗：讀取目前版本與各規則的結果，回傳 404 / 409 / 400
+    checks = {f"rule_{index}": ExpressionWrapper(condition, output_field=BooleanField()) for index, (condition, _) in enumerate(rules)}
+    current = get_object_or_404(Job.objects.using(shard).annotate(**checks).values("version", *checks), id=job_id)
+    if current["version"] != version:
+        return 409, {"message": "Job has been modified by another request.", "version": current["version"]}
+    for index, (_, message) in enumerate(rules):
+        if not current[f"rule_{index}"]:
+            return 400, {"message": message}
+    # 讀取前已被其他請求更新
+    return 409, {"message": "Job has been modified by another request.", "version": current["version"]}
+
 @router.delete("/{job_id}", response={204: None, 404: MessageSchema}, auth=jwt_auth)
 def delete_job(request, job_id: int):
-    job = get_object_or_404(Job, id=job_id)
+    job = get_object_or_404(Job.objects.for_id(job_id), id=job_id)
     job.delete()
     return 204, None
-
-@router.post("/update-status", response={200: MessageSchema}, auth=jwt_auth)
-def update_job_statuses(request):
-    """手動觸發更新所有職缺狀態"""
-    # 使用與命令相同的日誌記錄器，確保日誌一致性
-    status_logger = logging.getLogger('jobs.management.commands.update_job_status')
-    start_time = datetime.now()
-    
-    try:
-        now = timezone.now()
-        status_logger.info(f"手動API觸發更新職缺狀態，當前時間：{now}")
-        status_logger.info(f"執行環境時間：{start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        # 處理已到期的職缺（無論之前是什麼狀態）
-        expired_jobs = Job.objects.filter(expiration_date__lt=now)
-        expired_count = expired_jobs.update(is_active=False, is_scheduled=False)
-        
-        # 處理排程中但已到發布時間的職缺
-        scheduled_jobs = Job.objects.filter(
-            is_scheduled=True,
-            posting_date__lte=now,
-            expiration_date__gt=now
-        )
-        scheduled_count = scheduled_jobs.update(is_active=True, is_scheduled=False)
-        
-        # 確保所有活躍的職缺狀態正確
-        active_jobs = Job.objects.filter(
-            posting_date__lte=now,
-            expiration_date__gt=now,
-            is_active=True
-        )
-        active_count = active_jobs.count()
-        
-        total_updated = expired_count + scheduled_count
-        
-        # 計算執行時間
-        execution_time = datetime.now() - start_time
-        
-        # 記錄到專用日誌
-        status_logger.info(f"職缺狀態更新完成 - 已過期: {expired_count}, 轉為活躍: {scheduled_count}, 執行時間: {execution_time.total_seconds():.3f}秒")
-        
-        # 一般日誌
-        logger.info(f"手動觸發更新職缺狀態: 共更新 {total_updated} 個職缺")
-        
-        return 200, {
-            "message": f"成功更新 {total_updated} 個職缺狀態：{expired_count} 個已過期，{scheduled_count} 個轉為活躍，目前共有 {active_count} 個活躍職缺"
-        }
-    except Exception as e:
-        status_logger.error(f"更新職缺狀態時發生錯誤: {str(e)}")
-        logger.error(f"更新職缺狀態時發生錯誤: {str(e)}")
-        return 200, {"message": f"更新職缺狀態時發生錯誤: {str(e)}"}
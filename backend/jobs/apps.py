@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 class JobsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'jobs'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if getattr(settings, "JOBS_READ_MODEL", False):
+            # 在背景載入上架職缺的讀取模型，不延遲啟動；載入完成前 list_jobs 查詢資料庫
+            from .readmodel import active_jobs
+            active_jobs.load_in_background()
@@ -0,0 +1,59 @@
+from django.db import connections, transaction
+
+from . import sharding
+from .models import ArchivedJob, Job
+from .signals import jobs_bulk_changed
+
+# 兩張表欄位相同，依 model 欄位順序搬移（包含 id）
+ARCHIVE_COLUMNS = [field.column for field in Job._meta.concrete_fields]
+
+
+def archive_expired_jobs(cutoff, batch_size=1000, limit=None, on_batch=None, queryset=None):
+    """
+    把到期日早於 cutoff 的職缺分批搬到 ArchivedJob，每批在一個交易中
+    INSERT ... SELECT 後刪除，回傳搬移的總筆數。queryset 用來限定範圍（後台的批次操作），預設為所有分片的所有職缺；
+    封存的職缺留在原本的分片。
+
+    以 id 遞增的 keyset 分批，每批只鎖定少量資料列；on_batch(moved, total) 用於回報進度。
+    """
+    querysets = [queryset] if queryset is not None else [Job.objects.using(alias) for alias in sharding.databases()]
+    total = 0
+    for queryset in querysets:
+        if limit is not None and total >= limit:
+            break
+        total = _archive_from(queryset, cutoff, batch_size, limit, on_batch, total)
+    if total:
+        jobs_bulk_changed.send(sender=Job)
+    return total
+
+
+def _archive_from(queryset, cutoff, batch_size, limit, on_batch, total):
+    # 在 queryset 所在的資料庫中搬移；total 為之前的分片已搬移的筆數，回傳累計的筆數
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(quote_name(column) for column in ARCHIVE_COLUMNS)
+    insert_sql = (
+        f"INSERT INTO {quote_name(ArchivedJob._meta.db_table)} ({columns}) "
+        f"SELECT {columns} FROM {quote_name(Job._meta.db_table)} WHERE {quote_name('id')} IN "
+    )
+
+    last_id = 0
+    while limit is None or total < limit:
+        size = batch_size if limit is None else min(batch_size, limit - total)
+        with transaction.atomic(using=connection.alias):
+            ids = list(
+                queryset.filter(expiration_date__lt=cutoff, id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:size]
+            )
+            if not ids:
+                break
+            with connection.cursor() as cursor:
+                cursor.execute(insert_sql + f"({', '.join(['%s'] * len(ids))})", ids)
+            # 不經過 Collector 逐筆載入與送出 post_delete signal，直接執行 DELETE
+            Job.objects.using(connection.alias).filter(id__in=ids)._raw_delete(connection.alias)
+        total += len(ids)
+        last_id = ids[-1]
+        if on_batch:
+            on_batch(len(ids), total)
+    return total
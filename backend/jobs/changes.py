@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from .events import job_events
+from .models import ArchivedJob, Job, JobChange
+
+UPSERT = JobChange.UPSERT
+DELETE = JobChange.DELETE
+CREATED = JobChange.CREATED
+UPDATED = JobChange.UPDATED
+STATUS = JobChange.STATUS
+DELETED = JobChange.DELETED
+
+_CHUNK_SIZE = 500
+
+
+def record(operation, job_ids, now=None, event=None):
+    """
+    記錄職缺的變更，需在寫入職缺的同一個交易中呼叫，變更與紀錄一起提交或回復。event 為推送的事件類型，
+    預設 upsert 為 updated、delete 為 deleted。批次更新可能一次記錄數十萬筆，以 executemany 寫入，
+    略過逐筆建立 ORM 物件的成本。
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+    event = event or (DELETED if operation == DELETE else UPDATED)
+    changed_at = JobChange._meta.get_field("changed_at").get_db_prep_save(now or timezone.now(), connection)
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(column) for column in ("job_id", "operation", "event", "changed_at"))
+    sql = f"INSERT INTO {quote(JobChange._meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s)"
+    with connection.cursor() as cursor:
+        for start in range(0, len(job_ids), _CHUNK_SIZE):
+            cursor.executemany(sql, [(job_id, operation, event, changed_at)
+                                     for job_id in job_ids[start:start + _CHUNK_SIZE]])
+    # 同一行程的事件串流不等下一次輪詢，提交後立即讀取
+    transaction.on_commit(job_events.notify)
+
+
+def changes_since(cursor, limit):
+    """
+    游標 cursor 之後最多 limit 筆紀錄，回傳 (變更, 下一個游標, 是否還有更多)。同一頁中同一職缺只保留最後一筆；
+    upsert 附上職缺目前的內容（已封存的職缺從 ArchivedJob 讀取），職缺在之後已被刪除時略過，刪除紀錄會在後面的頁出現。
+    """
+    entries = list(
+        JobChange.objects.filter(id__gt=cursor).order_by("id")
+        .values_list("id", "job_id", "operation", "changed_at")[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return [], cursor, False
+
+    latest = {job_id: entry_id for entry_id, job_id, _, _ in entries}
+    entries = [entry for entry in entries if latest[entry[1]] == entry[0]]
+    upserts = [job_id for _, job_id, operation, _ in entries if operation == UPSERT]
+    jobs = Job.objects.in_bulk_by_shard(upserts)
+    missing = [job_id for job_id in upserts if job_id not in jobs]
+    if missing:
+        jobs.update(ArchivedJob.objects.in_bulk_by_shard(missing))
+
+    changes = []
+    for entry_id, job_id, operation, changed_at in entries:
+        job = jobs.get(job_id) if operation == UPSERT else None
+        if operation == UPSERT and job is None:
+            continue
+        changes.append({"cursor": entry_id, "operation": operation, "job_id": job_id, "changed_at": changed_at, "job": job})
+    return changes, max(latest.values()), has_more
+
+
+def compact(batch_size=10000, now=None, on_batch=None):
+    """
+    壓縮變更紀錄：刪除同一職缺之後還有較新紀錄的項目，每筆職缺只保留最新的 upsert 或 delete，
+    從游標 0 開始讀取即可取得所有職缺目前的狀態。刪除紀錄保留 JOBS_CHANGES_TOMBSTONE_DAYS 天，
+    落後超過這段時間的客戶端需要從游標 0 重新同步。
+
+    依 id 範圍分批，每批一個短交易；on_batch(deleted, total) 用於回報進度，回傳刪除的總筆數。
+    """
+    now = now or timezone.now()
+    bounds = JobChange.objects.aggregate(min_id=Min("id"), max_id=Max("id"))
+    if bounds["min_id"] is None:
+        return 0
+
+    newer = JobChange.objects.filter(job_id=OuterRef("job_id"), id__gt=OuterRef("id"))
+    tombstone_cutoff = now - timedelta(days=getattr(settings, "JOBS_CHANGES_TOMBSTONE_DAYS", 30))
+    total = 0
+    start = bounds["min_id"]
+    while start <= bounds["max_id"]:
+        end = start + batch_size
+        batch = JobChange.objects.filter(id__gte=start, id__lt=end)
+        with transaction.atomic():
+            deleted = batch.filter(Exists(newer))._raw_delete(connection.alias)
+            # 最後一筆紀錄一律保留，SQLite 才不會重複使用游標已讀過的 id
+            deleted += batch.filter(operation=DELETE, changed_at__lt=tombstone_cutoff).exclude(
+                id=bounds["max_id"])._raw_delete(connection.alias)
+        total += deleted
+        if on_batch:
+            on_batch(deleted, total)
+        start = end
+    return total
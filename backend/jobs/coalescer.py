@@ -0,0 +1,113 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class WriteCoalescer:
+    """
+    群組提交（group commit）：SQLite 同一時間只有一個寫入交易，並行的寫入請求各自開交易時會排隊等待寫入鎖，
+    每個請求都要付一次提交（fsync）的成本。這裡由行程內單一寫入執行緒把同一時間到達的寫入放進同一個交易：
+    取出佇列中所有等待的寫入，再等待最多 JOBS_WRITE_COALESCE_WINDOW_MS 毫秒收集後到的寫入
+    （最多 JOBS_WRITE_COALESCE_MAX_BATCH 筆），一次提交。
+
+    每個寫入在自己的 savepoint 中執行，失敗時只回復該筆並把例外交給呼叫端，其他寫入照常提交；
+    提交本身失敗時這一批的呼叫端都收到同一個例外。on_commit 的工作在提交後、呼叫端取得結果之前執行，
+    與各自提交時的順序相同。分片時每個分片（資料庫）各有一個寫入執行緒，各自取得自己的寫入鎖。
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                name = "jobs-write-coalescer" if self.using == DEFAULT_DB_ALIAS else f"jobs-write-coalescer-{self.using}"
+                self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+                self._thread.start()
+
+    def submit(self, function, *args, **kwargs):
+        """在寫入執行緒的群組交易中執行 function(*args, **kwargs)，等待提交後回傳結果或拋出例外"""
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((future, function, args, kwargs))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        max_batch = getattr(settings, "JOBS_WRITE_COALESCE_MAX_BATCH", 100)
+        deadline = time.monotonic() + getattr(settings, "JOBS_WRITE_COALESCE_WINDOW_MS", 2) / 1000
+        while len(batch) < max_batch:
+            # 上一批提交期間到達的寫入不需等待；佇列空了才在收集期間內等待後到的寫入
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            succeeded = []
+            try:
+                with transaction.atomic(using=self.using):
+                    for future, function, args, kwargs in batch:
+                        try:
+                            with transaction.atomic(using=self.using):
+                                succeeded.append((future, function(*args, **kwargs)))
+                        except Exception as e:
+                            future.set_exception(e)
+            except Exception as e:
+                logger.exception(f"群組提交 {len(batch)} 筆寫入失敗")
+                for future, _ in succeeded:
+                    future.set_exception(e)
+                # 連線可能已無法使用，下一批重新連線
+                close_old_connections()
+                continue
+            for future, result in succeeded:
+                future.set_result(result)
+
+
+write_coalescer = WriteCoalescer()
+_shard_coalescers = {DEFAULT_DB_ALIAS: write_coalescer}
+_shard_coalescers_lock = threading.Lock()
+
+
+def _coalescer(using):
+    coalescer = _shard_coalescers.get(using)
+    if coalescer is None:
+        with _shard_coalescers_lock:
+            coalescer = _shard_coalescers.setdefault(using, WriteCoalescer(using))
+    return coalescer
+
+
+def atomic_write(function, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    在 using 資料庫（職缺所在的分片）的交易中執行寫入並回傳結果。JOBS_WRITE_COALESCING 開啟時交給該資料庫的寫入執行緒
+    與其他並行的寫入一起提交；呼叫端已經在交易中時（例如測試或 ATOMIC_REQUESTS）直接在目前的交易中執行，
+    寫入執行緒的連線看不到未提交的資料。
+    """
+    in_transaction = connections[using].in_atomic_block or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    if getattr(settings, "JOBS_WRITE_COALESCING", False) and not in_transaction:
+        return _coalescer(using).submit(function, *args, **kwargs)
+    with transaction.atomic(using=using):
+        return function(*args, **kwargs)
@@ -0,0 +1,275 @@
+import re
+import struct
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Case, F, Func, When
+from django.db.models.query_utils import DeferredAttribute
+from django.dispatch import receiver
+
+from . import sharding
+
+# 在 SQLite 中解壓縮 description 的函式，篩選條件與全文索引的觸發器使用；回傳 UTF-8 的 BLOB，
+# 以 CAST(... AS TEXT) 轉為文字，省去在 Python 中解碼再編碼的成本
+SQL_FUNCTION = "jobs_decompress_description"
+# zlib 預設字典（zdict）的上限，超過視窗大小的部分不會被參照
+DICTIONARY_SIZE = 32 * 1024
+# 訓練字典時以連續 SEGMENT_WORDS 個單字為一段，統計出現在多少筆描述中
+SEGMENT_WORDS = 8
+COMPRESSION_LEVEL = 6
+# 壓縮內容的開頭：使用的字典 id（0 表示不使用字典），其後為 raw deflate 資料
+_HEADER = struct.Struct(">I")
+_TOKEN_RE = re.compile(r"\S+\s*")
+_CURRENT_KEY = "jobs:description-dictionary:current"
+# 其他行程訓練新字典後，最多這麼久開始使用
+_CURRENT_TTL = 300
+
+# 字典只新增不修改，載入後一直保留在行程內
+_dictionaries = {0: b""}
+
+
+def compression_enabled():
+    # 資料庫中的解壓縮函式只註冊在 SQLite；PostgreSQL 等已以 TOAST 壓縮大欄位
+    return getattr(settings, "JOBS_COMPRESS_DESCRIPTIONS", False) and connection.vendor == "sqlite"
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """
+    從描述樣本訓練 zlib 預設字典：出現在最多筆描述中的片段（以出現筆數乘以長度排序）依序放入，
+    已包含在字典中的片段略過。deflate 參照越近的位置成本越低，最常用的片段放在字典末端。
+    """
+    counts = Counter()
+    for sample in samples:
+        words = _TOKEN_RE.findall(sample)
+        counts.update({"".join(words[start:start + SEGMENT_WORDS])
+                       for start in range(max(1, len(words) - SEGMENT_WORDS + 1))})
+    chosen = []
+    text = ""
+    total = 0
+    for segment, frequency in sorted(counts.items(), key=lambda item: item[1] * len(item[0]), reverse=True):
+        if frequency < 2 or total >= size:
+            break
+        if segment in text:
+            continue
+        chosen.append(segment)
+        text += segment
+        total += len(segment.encode())
+    return "".join(reversed(chosen)).encode()[-size:]
+
+
+def create_dictionary(samples):
+    """訓練並儲存新字典，之後壓縮的描述使用這個字典；回傳 DescriptionDictionary"""
+    from .models import DescriptionDictionary
+
+    samples = list(samples)
+    dictionary = DescriptionDictionary.objects.create(data=train_dictionary(samples), sample_size=len(samples))
+    _dictionaries[dictionary.id] = bytes(dictionary.data)
+    cache.set(_CURRENT_KEY, dictionary.id, _CURRENT_TTL)
+    return dictionary
+
+
+def _current_dictionary():
+    from .models import DescriptionDictionary
+
+    dictionary_id = cache.get(_CURRENT_KEY)
+    if dictionary_id is None:
+        dictionary_id = DescriptionDictionary.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        cache.set(_CURRENT_KEY, dictionary_id, _CURRENT_TTL)
+    return dictionary_id, _dictionary(dictionary_id)
+
+
+def _dictionary(dictionary_id, raw_connection=None):
+    dictionary = _dictionaries.get(dictionary_id)
+    if dictionary is not None:
+        return dictionary
+    from .models import DescriptionDictionary
+
+    if raw_connection is not None:
+        # 在 SQLite 函式中呼叫時以同一個連線查詢（可以看到同一個交易中新增的字典）
+        table = DescriptionDictionary._meta.db_table
+        row = raw_connection.execute(f'SELECT data FROM "{table}" WHERE id = ?', (dictionary_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"description dictionary {dictionary_id} does not exist")
+        dictionary = bytes(row[0])
+    else:
+        dictionary = bytes(DescriptionDictionary.objects.get(id=dictionary_id).data)
+    _dictionaries[dictionary_id] = dictionary
+    return dictionary
+
+
+def compress(text, dictionary_id=None, dictionary=None):
+    """以字典壓縮文字，預設使用最新的字典；空字串不壓縮，回傳 None"""
+    if not text:
+        return None
+    if dictionary is None:
+        dictionary_id, dictionary = _current_dictionary()
+    if dictionary:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, 9, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, 9)
+    return _HEADER.pack(dictionary_id) + compressor.compress(text.encode()) + compressor.flush()
+
+
+def _inflate(data, raw_connection=None):
+    data = bytes(data)
+    (dictionary_id,) = _HEADER.unpack_from(data)
+    dictionary = _dictionary(dictionary_id, raw_connection)
+    decompressor = zlib.decompressobj(-15, zdict=dictionary) if dictionary else zlib.decompressobj(-15)
+    return decompressor.decompress(data[_HEADER.size:]) + decompressor.flush()
+
+
+def decompress(data):
+    return _inflate(data).decode()
+
+
+def stored_description(text):
+    """寫入資料庫的 (description, description_compressed)：開啟壓縮時內文只存在壓縮欄位"""
+    compressed = compress(text) if compression_enabled() else None
+    return ("" if compressed is not None else text), compressed
+
+
+def description_text():
+    """
+    description 的內文（SQL 表達式），篩選與 values() / values_list() 使用。未壓縮的資料列直接讀取欄位，
+    只有壓縮的資料列呼叫 Python 的解壓縮函式。
+    """
+    if connection.vendor != "sqlite":
+        return F("description")
+    return Case(
+        When(description_compressed__isnull=True, then=F("description")),
+        default=Func(F("description_compressed"), function=SQL_FUNCTION,
+                     template="CAST(%(function)s(%(expressions)s) AS TEXT)"),
+        output_field=models.TextField(),
+    )
+
+
+def text_columns(fields):
+    """把欄位清單中的 description 換成 annotate(description_text=description_text()) 的名稱"""
+    return tuple("description_text" if name == "description" else name for name in fields)
+
+
+def recent_descriptions(model, limit):
+    """最近 limit 筆職缺的描述內文，作為訓練字典的樣本"""
+    return (model.objects.order_by("-id").annotate(description_text=description_text())
+            .values_list("description_text", flat=True)[:limit])
+
+
+def compress_existing(model, batch_size=1000, on_batch=None):
+    """
+    以最新的字典分批壓縮 model 中尚未壓縮的描述（依序處理每個分片），回傳 (筆數, 壓縮前位元組, 壓縮後位元組)。
+    以 id 遞增的 keyset 分批，每批在一個交易中以原生 UPDATE 寫入，不送出 signal（內文不變）；
+    讀取後被修改（version 不同）的職缺略過，由那次寫入依設定壓縮。on_batch(筆數, 累計筆數) 用於回報進度。
+    """
+    dictionary_id, dictionary = _current_dictionary()
+    total = before = after = 0
+    for alias in sharding.databases():
+        table = connections[alias].ops.quote_name(model._meta.db_table)
+        sql = (f"UPDATE {table} SET description = '', description_compressed = %s "
+               f"WHERE id = %s AND version = %s AND description_compressed IS NULL")
+        last_id = 0
+        while True:
+            with transaction.atomic(using=alias):
+                rows = list(
+                    model.objects.using(alias).filter(id__gt=last_id, description_compressed__isnull=True)
+                    .exclude(description="").order_by("id").values_list("id", "version", "description")[:batch_size]
+                )
+                if not rows:
+                    break
+                updates = []
+                for job_id, version, text in rows:
+                    compressed = compress(text, dictionary_id, dictionary)
+                    updates.append((compressed, job_id, version))
+                    before += len(text.encode())
+                    after += len(compressed)
+                with connections[alias].cursor() as cursor:
+                    cursor.executemany(sql, updates)
+            total += len(rows)
+            last_id = rows[-1][0]
+            if on_batch:
+                on_batch(len(rows), total)
+    return total, before, after
+
+
+def decompress_existing(model, batch_size=1000, on_batch=None):
+    """把 model 中壓縮的描述（所有分片）還原到 description 欄位，回傳還原的筆數；關閉壓縮或改用其他資料庫前執行"""
+    total = 0
+    for alias in sharding.databases():
+        table = connections[alias].ops.quote_name(model._meta.db_table)
+        while True:
+            with transaction.atomic(using=alias):
+                ids = list(model.objects.using(alias).filter(description_compressed__isnull=False)
+                           .order_by("id").values_list("id", flat=True)[:batch_size])
+                if not ids:
+                    break
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        f"UPDATE {table} SET description = CAST({SQL_FUNCTION}(description_compressed) AS TEXT), "
+                        f"description_compressed = NULL WHERE id IN ({', '.join(['%s'] * len(ids))})", ids,
+                    )
+            total += len(ids)
+            if on_batch:
+                on_batch(len(ids), total)
+    return total
+
+
+@receiver(connection_created)
+def register_functions(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    # 全文索引的觸發器呼叫這個函式，沒有註冊它的連線（sqlite3 CLI 等）無法寫入職缺資料表
+    # 字典只存在 default，分片的連線改以 default 的連線查詢字典
+    raw_connection = connection.connection if connection.alias == DEFAULT_DB_ALIAS else None
+    connection.connection.create_function(
+        SQL_FUNCTION, 1, lambda data: None if data is None else _inflate(data, raw_connection), deterministic=True,
+    )
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """
+    資料列的內容存在壓縮欄位時，第一次讀取屬性才解壓縮並快取在 instance 上；
+    只輸出其他欄位的 instance 不需要解壓縮。指定新的值時清除壓縮內容，儲存時依設定重新壓縮。
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        data = instance.__dict__
+        name = self.field.attname
+        compressed_name = self.field.compressed_attname
+        if name not in data or compressed_name not in data:
+            # 被 defer / only 排除時與 Django 相同在讀取時查詢，兩個欄位一起讀取
+            instance.refresh_from_db(fields=[name, compressed_name])
+        if data[compressed_name] is not None and data[name] == "":
+            data[name] = decompress(data[compressed_name])
+        return data[name]
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+        instance.__dict__[self.field.compressed_attname] = None
+
+
+class CompressedTextField(models.TextField):
+    """
+    內容可以壓縮存放在 <name>_compressed（BinaryField）的文字欄位：壓縮欄位不為 NULL 時本欄位存空字串。
+    資料庫 schema 與 TextField 相同。
+    """
+
+    descriptor_class = CompressedTextDescriptor
+
+    @property
+    def compressed_attname(self):
+        return f"{self.attname}_compressed"
+
+    def pre_save(self, model_instance, add):
+        if model_instance.__dict__.get(self.compressed_attname) is not None:
+            return ""
+        return super().pre_save(model_instance, add)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        # migration 中記錄為 TextField：只改變 Python 端的讀寫，不需要 AlterField 重建資料表
+        return name, "django.db.models.TextField", args, kwargs
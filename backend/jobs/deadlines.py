@@ -0,0 +1,164 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+# 每秒最多檢查約數千次：SQLite 每執行這麼多個虛擬機指令呼叫一次進度回呼，成本可忽略
+_SQLITE_PROGRESS_STEPS = 10000
+# PostgreSQL 的 query_canceled 與 MySQL 的 ER_QUERY_TIMEOUT
+_TIMEOUT_CODES = {"57014", 3024}
+_METRIC_KEY = "jobs:deadline:exceeded:{}"
+# 目前區塊的期限（time.monotonic() 的值），平行查詢分片的執行緒以 apply_deadline 套用
+_current_deadline = ContextVar("jobs_query_deadline", default=None)
+
+
+class QueryDeadlineExceeded(Exception):
+    """查詢超過操作的時間預算，API 回傳 503"""
+
+    def __init__(self, operation, budget):
+        super().__init__(f"{operation} exceeded its {budget:g}s query deadline")
+        self.operation = operation
+        self.budget = budget
+
+
+def budget_for(operation, user=None):
+    """
+    操作的查詢時間預算（秒），None 表示不限制。預算設定在 JOBS_QUERY_DEADLINES；
+    staff 使用 JOBS_QUERY_DEADLINES_STAFF 中的值（預設不限制），後台匯出等需要完整結果的查詢不被中斷。
+    """
+    budgets = getattr(settings, "JOBS_QUERY_DEADLINES", {})
+    if user is not None and getattr(user, "is_staff", False):
+        budgets = getattr(settings, "JOBS_QUERY_DEADLINES_STAFF", {})
+    return budgets.get(operation)
+
+
+def exceeded_counts():
+    """各操作超過時間預算的次數（存在快取中，與快取後端的範圍相同）"""
+    operations = set(getattr(settings, "JOBS_QUERY_DEADLINES", {})) | set(getattr(settings, "JOBS_QUERY_DEADLINES_STAFF", {}))
+    counts = cache.get_many([_METRIC_KEY.format(operation) for operation in operations])
+    return {operation: counts.get(_METRIC_KEY.format(operation), 0) for operation in sorted(operations)}
+
+
+def _record_exceeded(operation, budget):
+    key = _METRIC_KEY.format(operation)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:  # 其他行程剛好清除了快取
+        cache.set(key, 1, timeout=None)
+    logger.warning(f"{operation} 查詢超過 {budget:g} 秒的時間預算，已中斷")
+
+
+def _is_timeout(error):
+    # SQLite 被進度回呼中斷時訊息為 "interrupted"；PostgreSQL（psycopg 3 / psycopg2）與 MySQL 以錯誤碼判斷
+    if str(error) == "interrupted":
+        return True
+    cause = error.__cause__
+    codes = (getattr(cause, "sqlstate", None), getattr(cause, "pgcode", None), *getattr(cause, "args", ())[:1])
+    return any(code in _TIMEOUT_CODES for code in codes)
+
+
+@contextmanager
+def _sqlite_deadline(connection, deadline):
+    # 巢狀的預算取最早到期者；進度回呼回傳 True 時 SQLite 中斷目前的語句並拋出 "interrupted"
+    deadlines = connection.__dict__.setdefault("_query_deadlines", [])
+    deadlines.append(min([deadline, *deadlines]))
+    if len(deadlines) == 1:
+        connection.connection.set_progress_handler(lambda: time.monotonic() > deadlines[-1], _SQLITE_PROGRESS_STEPS)
+    try:
+        yield
+    finally:
+        deadlines.pop()
+        if not deadlines and connection.connection is not None:
+            connection.connection.set_progress_handler(None, _SQLITE_PROGRESS_STEPS)
+
+
+@contextmanager
+def _statement_timeout(connection, budget):
+    # 其他資料庫以每個語句的逾時時間限制，設定在連線上，結束後恢復原本的值
+    if connection.vendor == "postgresql":
+        setting, show = "statement_timeout", "SHOW statement_timeout"
+    elif connection.vendor == "mysql":
+        setting, show = "max_execution_time", "SELECT @@SESSION.max_execution_time"
+    else:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(show)
+        previous = cursor.fetchone()[0]
+        cursor.execute(f"SET SESSION {setting} = %s", [max(1, int(budget * 1000))])
+    try:
+        yield
+    finally:
+        if connection.is_usable():
+            with connection.cursor() as cursor:
+                cursor.execute(f"SET SESSION {setting} = %s", [previous])
+
+
+@contextmanager
+def query_deadline(operation, budget, using="default"):
+    """
+    限制區塊內資料庫查詢的總時間為 budget 秒，超過時中斷執行中的語句並拋出 QueryDeadlineExceeded，
+    計入 exceeded_counts()。budget 為 None 時不限制。SQLite 以連線的進度回呼檢查整個區塊的期限，
+    PostgreSQL / MySQL 以每個語句的逾時時間限制。
+    """
+    if not budget:
+        yield
+        return
+    connection = connections[using]
+    connection.ensure_connection()
+    deadline = min(filter(None, (time.monotonic() + budget, _current_deadline.get())))
+    limit = _sqlite_deadline(connection, deadline) if connection.vendor == "sqlite" else _statement_timeout(connection, budget)
+    token = _current_deadline.set(deadline)
+    try:
+        with limit:
+            yield
+    except OperationalError as e:
+        if not _is_timeout(e):
+            raise
+        _record_exceeded(operation, budget)
+        raise QueryDeadlineExceeded(operation, budget) from e
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline():
+    """目前執行緒所在 query_deadline 區塊的期限，不限制時為 None"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def apply_deadline(deadline, using="default"):
+    """
+    在目前執行緒的 using 連線上套用其他執行緒取得的期限（current_deadline()），用於平行查詢各分片；
+    逾時時拋出的 OperationalError 由呼叫端外層的 query_deadline 記錄並轉換為 QueryDeadlineExceeded。
+    """
+    if deadline is None:
+        yield
+        return
+    connection = connections[using]
+    connection.ensure_connection()
+    if connection.vendor == "sqlite":
+        limit = _sqlite_deadline(connection, deadline)
+    else:
+        limit = _statement_timeout(connection, max(deadline - time.monotonic(), 0.001))
+    with limit:
+        yield
+
+
+def with_query_deadline(operation):
+    """API view 的裝飾器：依登入的使用者套用 operation 的時間預算，放在分頁等裝飾器外層才會包含實際執行的查詢"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with query_deadline(operation, budget_for(operation, getattr(request, "auth", None))):
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
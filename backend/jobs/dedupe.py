@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import JobFingerprint, JobFingerprintBand
+
+logger = logging.getLogger(__name__)
+
+# 寫入職缺時變更這些欄位需要重新計算簽章（公司不同的職缺不視為重複，到期的職缺不比對）
+DEDUPE_FIELDS = ("title", "description", "company_name", "expiration_date")
+
+# 簽章長度為 BANDS * ROWS。LSH 把簽章切成 BANDS 段，任一段完全相同的同公司職缺成為候選：
+# 相似度 0.8 的職缺成為候選的機率約 99%，0.5 約 32%，候選再以整個簽章估計的相似度確認
+BANDS = 12
+ROWS = 5
+SHINGLE_SIZE = 3
+# 每個 LSH 桶最多保留的職缺數。同公司大量共用樣板文字的職缺會落在同一桶，桶滿後新的職缺不再加入該桶
+# （仍在其他段的桶中），每次寫入比對的候選數量因此有上限，與資料量無關
+BUCKET_SIZE = 32
+
+_TOKEN_RE = re.compile(r"\w+")
+# 小於 2**32 的最大質數；a、b、x 都小於 2**32，a * x + b 不會超過 uint64
+_PRIME = 4294967291
+_random = np.random.RandomState(20240601)
+_A = _random.randint(1, _PRIME, size=(BANDS * ROWS, 1), dtype=np.uint64)
+_B = _random.randint(0, _PRIME, size=(BANDS * ROWS, 1), dtype=np.uint64)
+# 每次向量運算的職缺數，限制 (簽章長度 x shingle 數) 暫存矩陣的大小
+_SIGNATURE_CHUNK = 256
+_CHUNK_SIZE = 500
+
+
+def shingles(title, description):
+    """title 與 description 小寫後每 SHINGLE_SIZE 個連續單字為一個 shingle"""
+    tokens = _TOKEN_RE.findall(f"{title} {description}".lower())
+    if len(tokens) <= SHINGLE_SIZE:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[index:index + SHINGLE_SIZE]) for index in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def signatures(texts):
+    """
+    每筆 (title, description) 的 MinHash 簽章（uint32 陣列）：BANDS * ROWS 個雜湊函式各自在 shingle 上的最小值。
+    兩個簽章相同位置相等的比例是 shingle 集合 Jaccard 相似度的估計值。整批以向量運算計算。
+    """
+    texts = list(texts)
+    result = np.empty((len(texts), BANDS * ROWS), dtype=np.uint32)
+    for start in range(0, len(texts), _SIGNATURE_CHUNK):
+        hashes, offsets = [], []
+        for title, description in texts[start:start + _SIGNATURE_CHUNK]:
+            offsets.append(len(hashes))
+            # crc32 在各行程間結果相同，簽章可以存進資料庫
+            hashes.extend(zlib.crc32(shingle.encode()) for shingle in shingles(title, description))
+        permuted = (_A * np.array(hashes, dtype=np.uint64) + _B) % _PRIME
+        result[start:start + len(offsets)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return result
+
+
+def similarity(first, second):
+    return float(np.count_nonzero(first == second)) / len(first)
+
+
+def band_keys(company_name, signature):
+    """職缺在 LSH 索引中的鍵：公司名稱（忽略大小寫與多餘空白）加上簽章每一段的 64 位元雜湊值"""
+    company = " ".join((company_name or "").lower().split()).encode()
+    return [
+        int.from_bytes(hashlib.blake2b(
+            company + b"\0" + bytes([band]) + signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8,
+        ).digest(), "big", signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def _lookup(keys, now):
+    # 索引中擁有這些鍵且尚未到期的職缺：鍵 -> [(職缺 id, 簽章)]，與簽章一起以 JOIN 在同一個查詢取得
+    keys = sorted(keys)
+    candidates = {}
+    signatures = {}
+    for start in range(0, len(keys), _CHUNK_SIZE):
+        bands = JobFingerprintBand.objects.filter(
+            key__in=keys[start:start + _CHUNK_SIZE], fingerprint__expiration_date__gt=now,
+        ).values_list("key", "fingerprint_id", "fingerprint__signature")
+        for key, job_id, signature in bands:
+            if job_id not in signatures:
+                signatures[job_id] = np.frombuffer(bytes(signature), dtype=np.uint32)
+            candidates.setdefault(key, []).append((job_id, signatures[job_id]))
+    return candidates
+
+
+def _best_match(signature, keys, candidates, exclude=None):
+    # 相似度達門檻的候選中最相似的一筆，相同時取 id 較小者；所有候選的相似度以一次向量運算計算
+    entries = {}
+    for key in keys:
+        entries.update(candidates.get(key, ()))
+    entries.pop(exclude, None)
+    if not entries:
+        return None
+    job_ids = np.fromiter(entries, dtype=np.int64, count=len(entries))
+    scores = np.count_nonzero(np.stack(list(entries.values())) == signature, axis=1) / len(signature)
+    best = np.lexsort((job_ids, -scores))[0]
+    if scores[best] < getattr(settings, "JOBS_DUPLICATE_THRESHOLD", 0.8):
+        return None
+    return int(job_ids[best])
+
+
+def find_duplicate(title, description, company_name, now=None, exclude=None):
+    """同公司、尚未到期且與這組 title / description 相似度達 JOBS_DUPLICATE_THRESHOLD 的職缺 id，沒有則為 None"""
+    now = now or timezone.now()
+    signature = signatures([(title, description)])[0]
+    keys = band_keys(company_name, signature)
+    return _best_match(signature, keys, _lookup(keys, now), exclude=exclude)
+
+
+def index_jobs(jobs, now=None):
+    """
+    計算職缺的簽章並寫入 LSH 索引，回傳 {職缺 id: 重複的較早職缺 id}。jobs 為
+    (id, title, description, company_name, expiration_date) 的序列；已在索引中的職缺重新計算，
+    已到期的職缺只從索引移除。同一批中較晚的職缺也會與較早的比對。
+
+    每筆職缺只查詢自己的 BANDS 個鍵，每個鍵最多 BUCKET_SIZE 個候選，不與所有職缺比較，成本與資料量無關。
+    """
+    now = now or timezone.now()
+    jobs = list(jobs)
+    remove([job[0] for job in jobs])
+    jobs = [job for job in jobs if job[4] > now]
+    if not jobs:
+        return {}
+
+    job_signatures = signatures([(job[1], job[2]) for job in jobs])
+    job_keys = [band_keys(job[3], signature) for job, signature in zip(jobs, job_signatures)]
+    candidates = _lookup(set().union(*job_keys), now)
+
+    duplicates = {}
+    rows = []
+    for job, signature, keys in zip(jobs, job_signatures, job_keys):
+        duplicate_of = _best_match(signature, keys, candidates, exclude=job[0])
+        if duplicate_of is not None:
+            duplicates[job[0]] = duplicate_of
+            continue
+        for key in keys:
+            bucket = candidates.setdefault(key, [])
+            if len(bucket) < BUCKET_SIZE:
+                bucket.append((job[0], signature))
+                rows.append((job[0], key))
+
+    JobFingerprint.objects.bulk_create(
+        [JobFingerprint(job_id=job[0], signature=signature.tobytes(), expiration_date=job[4],
+                        duplicate_of=duplicates.get(job[0]))
+         for job, signature in zip(jobs, job_signatures)],
+        batch_size=_CHUNK_SIZE,
+    )
+    # 重複刊登只記錄簽章不寫入 LSH 索引：之後相似的職缺會與原本的職缺比對，同一桶的候選數量不隨重複刊登增加。
+    # 每筆職缺最多 BANDS 列，以 executemany 寫入，略過逐筆建立 ORM 物件的成本
+    quote = connection.ops.quote_name
+    sql = f"INSERT INTO {quote(JobFingerprintBand._meta.db_table)} ({quote('fingerprint_id')}, {quote('key')}) VALUES (%s, %s)"
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), _CHUNK_SIZE * BANDS):
+            cursor.executemany(sql, rows[start:start + _CHUNK_SIZE * BANDS])
+    if duplicates:
+        logger.info(f"{len(jobs)} 筆職缺中有 {len(duplicates)} 筆與同公司既有職缺重複")
+    return duplicates
+
+
+def remove(job_ids):
+    job_ids = list(job_ids)
+    for start in range(0, len(job_ids), _CHUNK_SIZE):
+        chunk = job_ids[start:start + _CHUNK_SIZE]
+        JobFingerprintBand.objects.filter(fingerprint_id__in=chunk)._raw_delete(connection.alias)
+        JobFingerprint.objects.filter(job_id__in=chunk)._raw_delete(connection.alias)
+
+
+def prune(now):
+    """移除已到期職缺的簽章，回傳移除的數量；到期的職缺不再參與比對"""
+    job_ids = list(JobFingerprint.objects.filter(expiration_date__lte=now).values_list("job_id", flat=True))
+    remove(job_ids)
+    return len(job_ids)
+
+
+def clear():
+    JobFingerprintBand.objects.all()._raw_delete(connection.alias)
+    JobFingerprint.objects.all()._raw_delete(connection.alias)
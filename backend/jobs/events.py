@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+
+from .models import ArchivedJob, Job, JobChange
+
+logger = logging.getLogger(__name__)
+
+# 事件附上的職缺欄位：足以計算狀態與依公司篩選，不讀取 description 等大欄位
+EVENT_FIELDS = ("id", "title", "company_name", "posting_date", "expiration_date", "is_active", "is_scheduled")
+EVENT_STATUSES = ("active", "expired", "scheduled", "inactive")
+
+# 每次讀取變更紀錄的筆數；客戶端收到 retry 後斷線多久重新連線（毫秒）
+_BATCH_SIZE = 500
+_RETRY_MS = 3000
+
+
+def latest_cursor():
+    return JobChange.objects.aggregate(last=Max("id"))["last"] or 0
+
+
+def load_events(after, until=None, limit=_BATCH_SIZE):
+    """
+    變更紀錄 id 在 (after, until] 的事件，依 id 排序，回傳 (事件, 下一個游標, 是否還有更多)。
+    upsert 附上職缺目前的標題、公司與狀態（已封存的職缺從 ArchivedJob 讀取）；職缺之後已被刪除時略過，
+    刪除事件會在後面出現。
+    """
+    entries = JobChange.objects.filter(id__gt=after)
+    if until is not None:
+        entries = entries.filter(id__lte=until)
+    entries = list(entries.order_by("id").values_list("id", "job_id", "operation", "event", "changed_at")[:limit])
+    if not entries:
+        return [], after, False
+
+    upserts = {job_id for _, job_id, operation, _, _ in entries if operation == JobChange.UPSERT}
+    jobs = Job.objects.only(*EVENT_FIELDS).in_bulk_by_shard(upserts)
+    missing = upserts - set(jobs)
+    if missing:
+        jobs.update(ArchivedJob.objects.only(*EVENT_FIELDS).in_bulk_by_shard(missing))
+
+    events = []
+    for entry_id, job_id, operation, event, changed_at in entries:
+        job = jobs.get(job_id) if operation == JobChange.UPSERT else None
+        if operation == JobChange.UPSERT and job is None:
+            continue
+        events.append({
+            "id": entry_id,
+            "event": event,
+            "job_id": job_id,
+            "changed_at": changed_at.isoformat(),
+            "title": job.title if job else None,
+            "company_name": job.company_name if job else None,
+            "status": job.status.lower() if job else None,
+        })
+    return events, entries[-1][0], len(entries) == limit
+
+
+def format_event(event):
+    """SSE 格式：id 為變更紀錄的游標，瀏覽器重新連線時以 Last-Event-ID 送回"""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+class Subscription:
+    """一個串流連線：篩選條件與待送出事件的佇列。事件由廣播器放入，連線本身不查詢資料庫"""
+
+    def __init__(self, companies=None, statuses=None):
+        self.companies = companies
+        self.statuses = statuses
+        self.queue = asyncio.Queue(maxsize=getattr(settings, "JOBS_EVENTS_QUEUE_SIZE", 1000))
+        self.overflowed = False
+
+    def matches(self, event):
+        # 刪除事件沒有職缺內容可供篩選，一律送出，客戶端忽略不認得的 id
+        if event["event"] == JobChange.DELETED:
+            return True
+        if self.companies and event["company_name"].lower() not in self.companies:
+            return False
+        return not self.statuses or event["status"] in self.statuses
+
+    def push(self, event):
+        if self.overflowed or not self.matches(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 讀取太慢的連線不再放入事件，送完佇列後結束，客戶端以 Last-Event-ID 重新連線從變更紀錄補讀
+            self.overflowed = True
+
+
+class JobEventBroadcaster:
+    """
+    行程內唯一的事件來源。有訂閱者時由單一背景 task 以游標輪詢 JobChange（每次一個主鍵範圍查詢，
+    同一行程的寫入提交後立即喚醒），把新事件分送到所有訂閱者的佇列：查詢次數與連線數無關，
+    閒置的連線只是一個等待中的佇列。其他行程（update_job_status 排程、其他 worker）的寫入同樣經由變更紀錄取得。
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._cursor = None
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+
+    def _running(self, loop):
+        return self._task is not None and not self._task.done() and self._loop is loop
+
+    async def subscribe(self, companies=None, statuses=None):
+        """加入訂閱者，回傳 (訂閱, 游標)；游標之後的事件都會放入佇列，之前的事件由 stream() 從變更紀錄補讀"""
+        loop = asyncio.get_running_loop()
+        if not self._running(loop):
+            cursor = await sync_to_async(latest_cursor)()
+            if not self._running(loop):  # 等待查詢時其他連線可能已經啟動
+                self._subscribers = set()
+                self._loop, self._cursor, self._wakeup = loop, cursor, asyncio.Event()
+                self._task = loop.create_task(self._run())
+        subscription = Subscription(companies, statuses)
+        self._subscribers.add(subscription)
+        return subscription, self._cursor
+
+    def unsubscribe(self, subscription):
+        self._subscribers.discard(subscription)
+
+    def notify(self):
+        """職缺寫入提交後呼叫（可在任何執行緒），喚醒背景 task 立即讀取；沒有訂閱者時不做任何事"""
+        loop, wakeup = self._loop, self._wakeup
+        if wakeup is None or loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            pass
+
+    async def _run(self):
+        interval = getattr(settings, "JOBS_EVENTS_POLL_INTERVAL", 1.0)
+        # 沒有訂閱者時結束，不再查詢；下一個訂閱者從當時最新的游標重新開始
+        while self._subscribers:
+            self._wakeup.clear()
+            has_more = False
+            try:
+                events, cursor, has_more = await sync_to_async(load_events)(self._cursor)
+                self._cursor = cursor
+                for event in events:
+                    for subscription in list(self._subscribers):
+                        subscription.push(event)
+            except Exception:
+                logger.exception("讀取職缺變更紀錄失敗")
+            if not has_more:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def stream(self, subscription, cursor, last_event_id=None):
+        """
+        SSE 回應內容。有 Last-Event-ID 時先從變更紀錄補送 (last_event_id, cursor] 的事件，
+        之後送出佇列中的即時事件；閒置時定期送出註解，避免代理伺服器關閉連線。
+        """
+        heartbeat = getattr(settings, "JOBS_EVENTS_HEARTBEAT_SECONDS", 15)
+        try:
+            yield f"retry: {_RETRY_MS}\n\n"
+            after = last_event_id
+            while after is not None and after < cursor:
+                events, after, has_more = await sync_to_async(load_events)(after, until=cursor)
+                for event in events:
+                    if subscription.matches(event):
+                        yield format_event(event)
+                if not has_more:
+                    break
+            while not (subscription.overflowed and subscription.queue.empty()):
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+# 每個行程一個廣播器，所有 SSE 連線共用
+job_events = JobEventBroadcaster()
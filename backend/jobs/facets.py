@@ -0,0 +1,298 @@
+import hashlib
+import json
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import EmptyResultSet
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Case, CharField, Q, Value, When
+from django.utils import timezone
+
+from .filters import filter_jobs, includes_archive
+from . import sharding
+from .models import ArchivedJob, Job
+from .search import SEARCH_COLUMNS
+from .schemas import STATUS_DEPENDENCIES
+
+# 依出現次數回傳前 N 名的欄位
+TOP_FACETS = ("location", "company_name", "required_skills")
+STATUSES = ("active", "expired", "scheduled", "inactive")
+
+# 每個篩選參數比對的欄位；單筆寫入只變更無關欄位時，快取的統計仍然正確
+FILTER_FIELDS = {
+    "title": ("title",),
+    "description": ("description",),
+    "company_name": ("company_name",),
+    "location": ("location",),
+    "salary_range": ("salary_range",),
+    "required_skills": ("required_skills",),
+    "status": STATUS_DEPENDENCIES,
+    "salary_min_gte": ("salary_min",),
+    "salary_max_lte": ("salary_max",),
+    "salary_currency": ("salary_currency",),
+    "q": SEARCH_COLUMNS,
+    "fuzzy": (),
+}
+# 無法在 Python 中判斷的篩選（全文索引與 trigram 相似度）：單筆寫入可能影響結果時刪除快取，不增量更新
+SQL_ONLY_FILTERS = {"q", "fuzzy"}
+FACET_FIELDS = ("location", "company_name", "required_skills", *STATUS_DEPENDENCIES)
+# 計算單筆職缺對統計的影響需要的欄位
+VALUE_FIELDS = tuple(dict.fromkeys([*FACET_FIELDS, *(field for fields in FILTER_FIELDS.values() for field in fields)]))
+
+_GENERATION_KEY = "jobs:facets:generation"
+
+
+def status_expression(now):
+    """與 Job.status property 相同的判斷，在 SQL 中計算（小寫）"""
+    return Case(
+        When(Q(is_scheduled=True, posting_date__gt=now), then=Value("scheduled")),
+        When(expiration_date__lt=now, then=Value("expired")),
+        When(Q(is_active=True, posting_date__lte=now), then=Value("active")),
+        default=Value("inactive"),
+        output_field=CharField(),
+    )
+
+
+def facet_source(filters, now, using=DEFAULT_DB_ALIAS):
+    """套用 list_jobs 篩選後的資料列（using 分片中的），只 SELECT 統計需要的欄位；status=expired 時包含封存表"""
+    columns = ("facet_status", "location", "company_name", "required_skills")
+    models = (Job, ArchivedJob) if includes_archive(filters.get("status")) else (Job,)
+    parts = [
+        filter_jobs(model.objects.using(using), now=now, **filters)
+        .order_by()
+        .annotate(facet_status=status_expression(now))
+        .values(*columns)
+        for model in models
+    ]
+    source = parts[0]
+    for part in parts[1:]:
+        source = source.union(part, all=True)
+    return source
+
+
+def unnest_skills_sql(source_alias, connection=connection):
+    # 把 JSON 陣列展開成一列一個技能的表函式；不支援的資料庫回傳 None，改在 Python 中計算
+    if connection.vendor == "sqlite":
+        return f"json_each({source_alias}.required_skills) AS skill", "skill.value"
+    if connection.vendor == "postgresql":
+        return f"jsonb_array_elements_text({source_alias}.required_skills) AS skill(value)", "skill.value"
+    return None
+
+
+def compute_counts(filters, now, using=DEFAULT_DB_ALIAS):
+    """
+    以單一 SQL 敘述計算 using 分片中篩選結果的各狀態、地點、公司與技能的完整計數。
+    篩選後的資料列放在 CTE 中只掃描一次，各項統計再對它分組。
+    """
+    connection = connections[using]
+    counts = {"status": dict.fromkeys(STATUSES, 0), **{field: {} for field in TOP_FACETS}}
+    try:
+        source_sql, params = facet_source(filters, now, using).query.sql_with_params()
+    except EmptyResultSet:
+        return counts  # 條件不可能符合（例如 trigram 索引中沒有包含 title 的值）
+    quote_name = connection.ops.quote_name
+    source = quote_name("facet_source")
+
+    selects = [f"SELECT 'status', facet_status, COUNT(*) FROM {source} GROUP BY facet_status"]
+    for field in ("location", "company_name"):
+        selects.append(f"SELECT '{field}', {quote_name(field)}, COUNT(*) FROM {source} GROUP BY {quote_name(field)}")
+    skills_sql = unnest_skills_sql(source, connection)
+    if skills_sql:
+        table_function, value = skills_sql
+        selects.append(f"SELECT 'required_skills', {value}, COUNT(*) FROM {source}, {table_function} GROUP BY {value}")
+
+    sql = f"WITH {source} AS ({source_sql}) " + " UNION ALL ".join(selects)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    for facet, value, count in rows:
+        counts[facet][value] = count
+    if not skills_sql:
+        counts["required_skills"] = dict(Counter(
+            skill
+            for skills in facet_source(filters, now, using).values_list("required_skills", flat=True)
+            for skill in skills
+        ))
+    return counts
+
+
+def sharded_counts(filters, now):
+    """所有分片的計數：各分片平行計算後相加"""
+    parts = sharding.scatter(lambda alias: compute_counts(filters, now, alias))
+    counts = parts[0]
+    for part in parts[1:]:
+        for facet, values in part.items():
+            for value, count in values.items():
+                counts[facet][value] = counts[facet].get(value, 0) + count
+    return counts
+
+
+def _top(counts, limit):
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [{"value": value, "count": count} for value, count in ranked[:limit]]
+
+
+def _normalize(filters):
+    # fuzzy=False 與未指定相同；0 是有效的薪資條件，不能以 value not in (False, ...) 排除
+    return {name: value for name, value in filters.items() if value not in (None, "") and value is not False}
+
+
+def _shared_cache():
+    # 世代編號放在所有行程共用的快取（settings.CACHES 的 shared），其他行程的批次變更也會讓本行程的統計失效
+    return caches["shared"] if "shared" in settings.CACHES else cache
+
+
+def _generation():
+    return _shared_cache().get_or_set(_GENERATION_KEY, 0, None)
+
+
+def _registry_key(generation):
+    return f"jobs:facets:{generation}:keys"
+
+
+def get_facets(filters, limit):
+    """
+    回傳篩選結果的總數、各狀態數量與地點、公司、技能的前 limit 名。
+
+    完整計數快取 JOBS_FACETS_CACHE_TTL 秒，單筆寫入時由 record_change() 增量更新，
+    批次寫入時由 invalidate() 讓所有行程的快取失效。default 為各行程的記憶體快取時，
+    其他 web 行程的單筆寫入要到快取到期後才會反映。
+    """
+    filters = _normalize(filters)
+    generation = _generation()
+    digest = hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    key = f"jobs:facets:{generation}:{digest}"
+    entry = cache.get(key)
+    now = timezone.now()
+    if entry is None or entry["expires_at"] <= now:
+        ttl = getattr(settings, "JOBS_FACETS_CACHE_TTL", 300)
+        entry = {
+            "filters": filters,
+            "counts": sharded_counts(filters, now),
+            "expires_at": now + timedelta(seconds=ttl),
+        }
+        cache.set(key, entry, ttl)
+        # 記錄目前有哪些快取，寫入時才知道要更新哪些
+        registry_key = _registry_key(generation)
+        keys = [k for k in cache.get(registry_key, []) if k != key]
+        keys.append(key)
+        cache.set(registry_key, keys[-getattr(settings, "JOBS_FACETS_MAX_ENTRIES", 100):], None)
+
+    counts = entry["counts"]
+    return {
+        "count": sum(counts["status"].values()),
+        "status": counts["status"],
+        **{field: _top(counts[field], limit) for field in TOP_FACETS},
+    }
+
+
+def job_values(job):
+    """單筆職缺中影響統計的欄位值；未載入（deferred）的欄位不包含在內"""
+    deferred = job.get_deferred_fields()
+    values = {}
+    for name in VALUE_FIELDS:
+        if name not in deferred:
+            value = job._meta.get_field(name).to_python(getattr(job, name))
+            if name in ("posting_date", "expiration_date") and value is not None and timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            values[name] = value
+    return values
+
+
+def _contains(value, search):
+    return search.lower() in (value or "").lower()
+
+
+def matches(values, filters, now):
+    """與 filter_jobs 相同的篩選條件（q 與 fuzzy 除外），在 Python 中判斷單筆職缺是否符合"""
+    for name in ("title", "description", "company_name", "location", "salary_range"):
+        if filters.get(name) and not _contains(values[name], filters[name]):
+            return False
+    if filters.get("required_skills"):
+        skills = json.dumps(values["required_skills"])
+        if not all(_contains(skills, skill.strip()) for skill in filters["required_skills"].split(",") if skill.strip()):
+            return False
+    if filters.get("salary_min_gte") is not None and (values["salary_min"] is None or values["salary_min"] < filters["salary_min_gte"]):
+        return False
+    if filters.get("salary_max_lte") is not None and (values["salary_max"] is None or values["salary_max"] > filters["salary_max_lte"]):
+        return False
+    if filters.get("salary_currency") and values["salary_currency"] != filters["salary_currency"].upper():
+        return False
+
+    status = (filters.get("status") or "").lower()
+    if status == "active":
+        return (values["is_active"] and not values["is_scheduled"]
+                and values["posting_date"] <= now < values["expiration_date"])
+    if status == "expired":
+        return values["expiration_date"] < now
+    if status == "scheduled":
+        return values["is_scheduled"] and values["posting_date"] > now
+    return True
+
+
+def job_status(values, now):
+    return Job(**{name: values[name] for name in STATUS_DEPENDENCIES}).status.lower()
+
+
+def _apply(counts, values, sign, now):
+    status = job_status(values, now)
+    counts["status"][status] = counts["status"].get(status, 0) + sign
+    for field, keys in (("location", [values["location"]]), ("company_name", [values["company_name"]]),
+                        ("required_skills", values["required_skills"] or [])):
+        for key in keys:
+            count = counts[field].get(key, 0) + sign
+            if count > 0:
+                counts[field][key] = count
+            else:
+                counts[field].pop(key, None)
+
+
+def record_change(model, old=None, new=None, changed=None):
+    """
+    單筆職缺寫入後增量更新快取中的統計。old / new 是寫入前後的 job_values()（新增時 old 為 None，
+    刪除時 new 為 None）。只知道變更的欄位名稱 changed 時，受影響的快取直接刪除。
+    """
+    relevant = set(FACET_FIELDS)
+    complete = set(VALUE_FIELDS)
+    if changed is None and any(values is not None and set(values) != complete for values in (old, new)):
+        invalidate()  # 欄位不完整，無法計算差異
+        return
+
+    now = timezone.now()
+    for key in cache.get(_registry_key(_generation()), []):
+        entry = cache.get(key)
+        if entry is None:
+            continue
+        filters = entry["filters"]
+        if model is ArchivedJob and not includes_archive(filters.get("status")):
+            continue
+        if changed is not None:
+            fields = relevant.union(*(FILTER_FIELDS[name] for name in filters))
+            if fields.intersection(changed):
+                cache.delete(key)
+            continue
+        remaining = (entry["expires_at"] - now).total_seconds()
+        if remaining <= 0:
+            continue
+        if SQL_ONLY_FILTERS.intersection(filters):
+            # matches() 只檢查其他條件，符合時這次寫入才可能影響統計
+            if any(values is not None and matches(values, filters, now) for values in (old, new)):
+                cache.delete(key)
+            continue
+        if old is not None and matches(old, filters, now):
+            _apply(entry["counts"], old, -1, now)
+        if new is not None and matches(new, filters, now):
+            _apply(entry["counts"], new, 1, now)
+        cache.set(key, entry, remaining)
+
+
+def invalidate():
+    """批次變更職缺資料後呼叫，讓所有行程的統計快取失效"""
+    shared = _shared_cache()
+    try:
+        shared.incr(_GENERATION_KEY)
+    except ValueError:
+        shared.add(_GENERATION_KEY, 1, None)
@@ -0,0 +1,49 @@
+from ninja.errors import HttpError
+
+from .schemas import JOB_FIELDS, JobListSchema, STATUS_DEPENDENCIES
+
+
+def parse_fields(fields):
+    """解析 ?fields=id,title,...；未指定時回傳 None，欄位必須是 JobSchema 的欄位。"""
+    if fields is None:
+        return None
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in JOB_FIELDS]
+    if not requested or unknown:
+        raise HttpError(400, f"Invalid fields: {', '.join(unknown) or fields!r}. Allowed fields: {', '.join(JOB_FIELDS)}")
+    return requested
+
+
+def columns_for(fields):
+    """輸出這些欄位需要 SELECT 的資料庫欄位；status 需要它依賴的日期與旗標欄位。"""
+    columns = [name for name in fields if name != "status"]
+    if "status" in fields:
+        columns.extend(name for name in STATUS_DEPENDENCIES if name not in columns)
+    return columns
+
+
+# 列表預設輸出 JobListSchema，不需要載入 description 等大欄位
+LIST_COLUMNS = columns_for(JobListSchema.model_fields)
+
+
+def project(job, fields):
+    return {name: getattr(job, name) for name in fields}
+
+
+class FieldsetQuerySet:
+    """
+    分頁切片後才把每筆職缺轉成只含指定欄位的 dict 的 queryset 包裝；
+    queryset 應已用 only(*columns_for(fields)) 限制 SELECT 的欄位。
+    """
+
+    def __init__(self, queryset, fields):
+        self.queryset = queryset
+        self.fields = fields
+
+    def __len__(self):
+        return self.queryset.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [project(job, self.fields) for job in self.queryset[key]]
+        return project(self.queryset[key], self.fields)
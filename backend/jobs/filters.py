@@ -0,0 +1,82 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search, trigram
+from .compression import description_text
+
+# list_jobs 可用的篩選參數
+FILTER_PARAMS = (
+    "title", "description", "company_name", "location", "salary_range", "required_skills", "status",
+    "salary_min_gte", "salary_max_lte", "salary_currency",
+)
+
+
+def filter_jobs(queryset, title=None, description=None, company_name=None, location=None,
+                salary_range=None, required_skills=None, status=None, salary_min_gte=None,
+                salary_max_lte=None, salary_currency=None, now=None, fuzzy=False, q=None):
+    """
+    套用 list_jobs 的搜尋與狀態篩選，Job 與 ArchivedJob 的 queryset 都可使用。
+
+    title、company_name、location 以 trigram 索引比對（結果與 icontains 相同）；fuzzy=True 時
+    也包含拼字相近的值，並加上 search_score 欄位供依相似度排序。q 為關鍵字查詢，以全文索引篩選
+    並加上 BM25 相關性分數 search_rank。
+    """
+    scores = []
+    for field, value in (("title", title), ("company_name", company_name), ("location", location)):
+        if not value:
+            continue
+        if fuzzy:
+            condition, score = trigram.fuzzy_filter(field, value)
+            scores.append(score)
+        else:
+            condition = trigram.substring_filter(field, value)
+        queryset = queryset.filter(condition)
+    if scores:
+        queryset = queryset.annotate(search_score=sum(scores[1:], scores[0]))
+    if q:
+        queryset = search.keyword_search(queryset, q)
+    if description:
+        # 壓縮存放的描述需要解壓縮後比對
+        queryset = queryset.alias(description_text=description_text()).filter(description_text__icontains=description)
+    if salary_range:
+        queryset = queryset.filter(salary_range__icontains=salary_range)
+    # 薪資範圍使用 salary_min / salary_max 索引，不需解析 salary_range 字串
+    if salary_min_gte is not None:
+        queryset = queryset.filter(salary_min__gte=salary_min_gte)
+    if salary_max_lte is not None:
+        queryset = queryset.filter(salary_max__lte=salary_max_lte)
+    if salary_currency:
+        queryset = queryset.filter(salary_currency=salary_currency.upper())
+    if required_skills:
+        skills = [skill.strip() for skill in required_skills.split(',') if skill.strip()]
+        query = Q()
+        for skill in skills:
+            query &= Q(required_skills__icontains=skill)
+        if query:
+            queryset = queryset.filter(query)
+
+    if status:
+        now = now or timezone.now()
+        if status.lower() == "active":
+            # 活躍職位：is_active=True + 過了發布日期(或未設定) + 未過期
+            queryset = queryset.filter(
+                Q(is_active=True) &
+                Q(posting_date__lte=now) &
+                Q(expiration_date__gt=now) &
+                Q(is_scheduled=False)  # 排程職位不能是活躍的
+            )
+        elif status.lower() == "expired":
+            # 過期職位：過期日期已過
+            queryset = queryset.filter(expiration_date__lt=now)
+        elif status.lower() == "scheduled":
+            # 排程職位：is_scheduled=True + 發布日期在未來
+            queryset = queryset.filter(
+                Q(is_scheduled=True) &
+                Q(posting_date__gt=now)
+            )
+    return queryset
+
+
+def includes_archive(status):
+    # 封存表只有過期職缺，只有查詢過期職缺時需要一併查詢
+    return bool(status) and status.lower() == "expired"
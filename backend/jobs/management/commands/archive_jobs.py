@@ -0,0 +1,46 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from jobs.archive import archive_expired_jobs
+from jobs.models import ArchivedJob, Job
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '將過期職缺分批搬移到封存表（ArchivedJob），讓 Job 資料表只保留上架中的職缺'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=getattr(settings, 'JOBS_ARCHIVE_AFTER_DAYS', 30),
+            help='只封存到期超過 N 天的職缺，0 表示所有已過期職缺（預設為 JOBS_ARCHIVE_AFTER_DAYS）',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='每個交易搬移的筆數')
+        parser.add_argument('--limit', type=int, help='本次最多搬移的筆數')
+        parser.add_argument('--silent', action='store_true', help='不輸出每批的進度')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0 or options['batch_size'] <= 0:
+            raise CommandError('--older-than 不可為負數，--batch-size 必須大於 0')
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        logger.info(f"開始封存到期日早於 {cutoff} 的職缺")
+
+        def report(moved, total):
+            if not options['silent']:
+                self.stdout.write(f'  已封存 {total} 筆')
+
+        start_time = time.perf_counter()
+        archived = archive_expired_jobs(cutoff, batch_size=options['batch_size'], limit=options['limit'], on_batch=report)
+        elapsed = time.perf_counter() - start_time
+
+        message = (f'已封存 {archived} 筆過期職缺，耗時 {elapsed:.2f} 秒；'
+                   f'目前 Job {Job.objects.count()} 筆，ArchivedJob {ArchivedJob.objects.count()} 筆')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,110 @@
+import random
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from jobs import facets
+from jobs.management.commands.seed_jobs import LOCATIONS, ROLES, SKILLS, JobGenerator
+from jobs.models import Job, SavedSearch, SavedSearchMatch
+from jobs.percolator import job_keys, match_key, percolate, trigram_frequencies
+
+
+def random_filters(rng, companies):
+    """模擬使用者儲存的搜尋：以技能、職稱或公司為主，大多再限定地點或薪資"""
+    roll = rng.random()
+    if roll < 0.5:
+        filters = {"required_skills": ",".join(rng.sample(SKILLS, rng.choice((1, 1, 2))))}
+    elif roll < 0.85:
+        filters = {"title": rng.choice(ROLES)}
+    else:
+        filters = {"company_name": rng.choice(companies)}
+    if rng.random() < 0.8:
+        filters["location"] = rng.choice(LOCATIONS)
+    if rng.random() < 0.3:
+        filters["salary_min_gte"] = 1000 * rng.randrange(40, 150, 10)
+    if rng.random() < 0.3:
+        filters["status"] = "active"
+    return filters
+
+
+class Command(BaseCommand):
+    help = '建立大量模擬的儲存搜尋並測量新職缺上架時反向索引比對的吞吐量（在交易中執行，結束後全部回復）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--searches', type=int, default=100000, help='儲存的搜尋數量')
+        parser.add_argument('--jobs', type=int, default=1000, help='模擬上架的職缺數量')
+        parser.add_argument('--batch-size', type=int, default=100, help='每次比對的職缺數量')
+        parser.add_argument('--naive-jobs', type=int, default=20, help='以逐一執行每個搜尋的方式比對的職缺數量（對照組）')
+        parser.add_argument('--seed', type=int, default=42, help='模擬資料的亂數種子')
+
+    def handle(self, *args, **options):
+        if options['searches'] <= 0 or options['jobs'] <= 0 or options['batch_size'] <= 0:
+            raise CommandError('--searches、--jobs 與 --batch-size 必須大於 0')
+
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        generator = JobGenerator(options['seed'], now, expired_ratio=0, scheduled_ratio=0)
+
+        user = get_user_model().objects.create(username=f"percolator-benchmark-{rng.getrandbits(32)}")
+        all_filters = [random_filters(rng, generator.companies) for _ in range(options['searches'])]
+        start_time = time.perf_counter()
+        frequencies = trigram_frequencies()
+        keys = [match_key(filters, frequencies) for filters in all_filters]
+        SavedSearch.objects.bulk_create(
+            (SavedSearch(user=user, name=f"search {index}", filters=filters, match_key=key)
+             for index, (filters, key) in enumerate(zip(all_filters, keys))),
+            batch_size=1000,
+        )
+        self.stdout.write(f'建立 {len(all_filters)} 個儲存的搜尋，耗時 {time.perf_counter() - start_time:.2f} 秒')
+
+        first_id = (Job.objects.aggregate(last=Max('id'))['last'] or 0) + 1_000_000
+        jobs = []
+        while len(jobs) < options['jobs']:
+            for values in generator.batch(min(10000, options['jobs'] - len(jobs))):
+                jobs.append(Job(id=first_id + len(jobs), **dict(zip(JobGenerator.FIELDS, values))))
+
+        key_counts = Counter(keys)
+        candidates = sum(
+            sum(key_counts[key] for key in job_keys(values, facets.job_status(values, now)))
+            for values in map(facets.job_values, jobs)
+        )
+
+        start_time = time.perf_counter()
+        matched = 0
+        for start in range(0, len(jobs), options['batch_size']):
+            matched += percolate(jobs[start:start + options['batch_size']], now=now)
+        elapsed = time.perf_counter() - start_time
+        recorded = SavedSearchMatch.objects.filter(search__user=user).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'反向索引：{len(jobs)} 筆職缺耗時 {elapsed:.2f} 秒（{len(jobs) / elapsed:.0f} 筆/秒），'
+            f'平均每筆 {candidates / len(jobs):.0f} 個候選搜尋（共 {len(all_filters)} 個），'
+            f'記錄 {recorded} 筆符合'
+        ))
+
+        # 對照組：不使用反向索引，對每筆職缺檢查所有儲存的搜尋（已載入記憶體，不含查詢成本）
+        naive_jobs = jobs[:options['naive_jobs']]
+        if naive_jobs:
+            start_time = time.perf_counter()
+            naive_matched = sum(
+                facets.matches(values, filters, now)
+                for values in map(facets.job_values, naive_jobs) for filters in all_filters
+            )
+            naive_elapsed = time.perf_counter() - start_time
+            indexed_matched = SavedSearchMatch.objects.filter(
+                search__user=user, job_id__in=[job.id for job in naive_jobs],
+            ).count()
+            self.stdout.write(
+                f'逐一比對：{len(naive_jobs)} 筆職缺耗時 {naive_elapsed:.2f} 秒'
+                f'（{len(naive_jobs) / naive_elapsed:.1f} 筆/秒），{naive_matched} 筆符合'
+                f'（反向索引 {indexed_matched} 筆）'
+            )
@@ -0,0 +1,98 @@
+import random
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from ninja_jwt.tokens import AccessToken
+
+from jobs.management.commands.loadtest import InProcessTransport, percentile
+from jobs.management.commands.seed_jobs import LOCATIONS, ROLES, SKILLS
+from jobs.readmodel import active_jobs
+
+ORDER_TERMS = ["", "posting_date", "-posting_date", "expiration_date", "-expiration_date"]
+FIELD_TERMS = ["", "", "id,title,company_name,status", "id,salary_min,salary_max,salary_currency,required_skills"]
+
+
+def random_query(rng, companies):
+    """模擬列表頁的上架職缺查詢：0 到 2 個篩選條件、排序與前幾頁"""
+    params = {"status": "active", "page": rng.choice((1, 1, 1, 2, 3, 5))}
+    filters = {
+        "title": lambda: rng.choice(ROLES).split()[-1],
+        "company_name": lambda: rng.choice(companies),
+        "location": lambda: rng.choice(LOCATIONS),
+        "required_skills": lambda: ",".join(rng.sample(SKILLS, rng.choice((1, 1, 2)))),
+        "salary_min_gte": lambda: 1000 * rng.randrange(40, 150, 10),
+        "salary_currency": lambda: "usd",
+    }
+    for name in rng.sample(list(filters), rng.randint(0, 2)):
+        params[name] = filters[name]()
+    for name, terms in (("order_by", ORDER_TERMS), ("fields", FIELD_TERMS)):
+        value = rng.choice(terms)
+        if value:
+            params[name] = value
+    return urlencode(params)
+
+
+class Command(BaseCommand):
+    help = ('載入上架職缺讀取模型，回報每筆職缺的記憶體用量，並以相同的 GET /api/jobs 查詢比較'
+            '讀取模型與資料庫的延遲及輸出是否一致（唯讀，不修改職缺）')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200, help='查詢次數')
+        parser.add_argument('--seed', type=int, default=42, help='查詢條件的亂數種子')
+        parser.add_argument('--username', default='loadtest', help='送出請求的使用者（不存在時建立）')
+
+    def handle(self, *args, **options):
+        if options['queries'] <= 0:
+            raise CommandError('--queries 必須大於 0')
+
+        start_time = time.perf_counter()
+        index = active_jobs.load()
+        load_time = time.perf_counter() - start_time
+        count = len(index)
+        if not count:
+            raise CommandError('沒有上架中的職缺，請先執行 seed_jobs')
+        self.stdout.write(
+            f'載入讀取模型：{count} 筆上架職缺，{index.nbytes() / 1024 / 1024:.1f} MB'
+            f'（每筆 {index.nbytes() / count:.0f} bytes），耗時 {load_time:.2f} 秒'
+        )
+
+        user, _ = get_user_model().objects.get_or_create(username=options['username'])
+        transport = InProcessTransport()
+        token = str(AccessToken.for_user(user))
+        rng = random.Random(options['seed'])
+        names = index.tables["company_name"].values
+        companies = rng.sample(names, min(50, len(names)))
+        latencies = {False: [], True: []}
+
+        def fetch(query, enabled):
+            with override_settings(JOBS_READ_MODEL=enabled):
+                request_start = time.perf_counter()
+                status, body = transport.request("GET", f"/jobs?{query}", token=token)
+                latencies[enabled].append((time.perf_counter() - request_start) * 1000)
+            if status != 200:
+                raise CommandError(f'查詢失敗（HTTP {status}）：{query}')
+            return body
+
+        mismatches = []
+        for _ in range(options['queries']):
+            query = random_query(rng, companies)
+            if fetch(query, False) != fetch(query, True):
+                # 兩次請求之間可能剛好有職缺到期，再比較一次確認不是時間差造成
+                if fetch(query, True) != fetch(query, False):
+                    mismatches.append(query)
+        transport.close()
+        active_jobs.clear()
+
+        for enabled, label in ((False, '資料庫'), (True, '讀取模型')):
+            values = sorted(latencies[enabled])
+            self.stdout.write(f'{label}：p50 {percentile(values, 0.5):.2f} ms，p95 {percentile(values, 0.95):.2f} ms，'
+                              f'p99 {percentile(values, 0.99):.2f} ms')
+        speedup = percentile(sorted(latencies[False]), 0.5) / percentile(sorted(latencies[True]), 0.5)
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} 個查詢的輸出與資料庫不同，例如：{mismatches[0]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["queries"]} 個查詢的輸出與資料庫相同，p50 延遲加速 {speedup:.1f} 倍'
+        ))
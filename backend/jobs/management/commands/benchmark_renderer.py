@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ninja.renderers import JSONRenderer
+
+from job_platform.renderers import FastJSONRenderer, orjson
+from jobs.management.commands.seed_jobs import JobGenerator
+from jobs.models import Job
+from jobs.schemas import JobListSchema, JobSchema
+
+
+def time_per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+class Command(BaseCommand):
+    help = '比較 ninja 內建 JSONRenderer 與 FastJSONRenderer 序列化一頁職缺的成本'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=10, help='每頁職缺數量')
+        parser.add_argument('--iterations', type=int, default=5000, help='每種 renderer 的重複次數')
+        parser.add_argument('--seed', type=int, default=42, help='模擬資料的亂數種子')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        iterations = options['iterations']
+        generator = JobGenerator(options['seed'], timezone.now())
+        jobs = [
+            Job(id=index + 1, **dict(zip(JobGenerator.FIELDS, values)))
+            for index, values in enumerate(generator.batch(page_size))
+        ]
+        # 與 API 實際送進 renderer 的資料結構相同：分頁外框 + schema dump 結果
+        payloads = {
+            'list page': {
+                'items': [JobListSchema.from_orm(job).model_dump() for job in jobs],
+                'count': 123456,
+            },
+            'job detail': JobSchema.from_orm(jobs[0]).model_dump(),
+        }
+        renderers = [
+            ('ninja JSONRenderer', JSONRenderer()),
+            ('FastJSONRenderer', FastJSONRenderer()),
+            (f"FastJSONRenderer compact ({'orjson' if orjson else 'json'})", FastJSONRenderer(compact=True)),
+        ]
+
+        for name, data in payloads.items():
+            self.stdout.write(f'{name}（{page_size if name == "list page" else 1} 筆）：')
+            baseline_bytes = baseline_cost = None
+            for label, renderer in renderers:
+                def render():
+                    return renderer.render(None, data, response_status=200)
+                output = render()
+                if isinstance(output, str):
+                    output = output.encode()
+                cost = time_per_call(render, iterations)
+                if baseline_bytes is None:
+                    baseline_bytes, baseline_cost = output, cost
+                    note = ''
+                else:
+                    note = '，輸出相同' if output == baseline_bytes else f'，輸出不同（{len(output)} vs {len(baseline_bytes)} bytes）'
+                self.stdout.write(f'  {label:<36}{cost:>9.1f} µs  x{baseline_cost / cost:.2f}{note}')
@@ -0,0 +1,52 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from jobs.management.commands.loadtest import percentile
+from jobs.management.commands.seed_jobs import JobGenerator
+from jobs.similar import VECTOR_FIELDS, VectorIndex
+
+
+class Command(BaseCommand):
+    help = '以模擬資料測量相似職缺向量索引的建立時間、記憶體用量與查詢延遲（不需要資料庫）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000, help='上架中職缺數量')
+        parser.add_argument('--queries', type=int, default=1000, help='查詢次數')
+        parser.add_argument('--limit', type=int, default=10, help='每次查詢回傳的筆數')
+        parser.add_argument('--seed', type=int, default=42, help='模擬資料的亂數種子')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        if count <= 0 or options['queries'] <= 0 or options['limit'] <= 0:
+            raise CommandError('--count、--queries 與 --limit 必須大於 0')
+
+        now = timezone.now()
+        generator = JobGenerator(options['seed'], now, expired_ratio=0, scheduled_ratio=0)
+        positions = [JobGenerator.FIELDS.index(name) for name in VECTOR_FIELDS]
+        jobs = []
+        while len(jobs) < count:
+            for values in generator.batch(min(10000, count - len(jobs))):
+                jobs.append((len(jobs) + 1, *(values[position] for position in positions)))
+
+        start_time = time.perf_counter()
+        index = VectorIndex.build(jobs, getattr(settings, 'JOBS_SIMILAR_DIMENSIONS', 256), count)
+        build_time = time.perf_counter() - start_time
+        megabytes = index.matrix.nbytes / 1024 / 1024
+        self.stdout.write(f'建立索引：{count} 筆職缺，{index.dimensions} 維，矩陣 {megabytes:.1f} MB，耗時 {build_time:.2f} 秒')
+
+        rng = random.Random(options['seed'])
+        latencies = []
+        for _ in range(options['queries']):
+            job_id = rng.randint(1, count)
+            start_time = time.perf_counter()
+            index.top_k(index.matrix[index.rows[job_id]], options['limit'], now, exclude=job_id)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+        latencies.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'查詢 {len(latencies)} 次（前 {options["limit"]} 名）：p50 {percentile(latencies, 0.5):.2f} ms，'
+            f'p95 {percentile(latencies, 0.95):.2f} ms，p99 {percentile(latencies, 0.99):.2f} ms'
+        ))
@@ -0,0 +1,131 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from ninja_jwt.tokens import AccessToken
+
+from jobs import sharding
+from jobs.management.commands.loadtest import InProcessTransport, percentile
+from jobs.management.commands.seed_jobs import LOCATIONS, ROLES, SKILLS
+from jobs.models import Job
+
+COMPANY_PREFIX = "Write Benchmark"
+VOCABULARY = sorted({word.lower() for phrase in ROLES + SKILLS + LOCATIONS for word in phrase.split()})
+
+
+class Command(BaseCommand):
+    help = ('以多個並行的寫入者對 POST /api/jobs 與 PUT /api/jobs/{id} 施加突發寫入，比較逐筆提交與'
+            'JOBS_WRITE_COALESCING 群組提交的吞吐量與延遲；建立的職缺在每次測試後刪除')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=64, help='並行的寫入者數量')
+        parser.add_argument('--requests', type=int, default=10, help='每個寫入者送出的請求數')
+        parser.add_argument('--update-ratio', type=float, default=0.3, help='修改自己建立的職缺（PUT）的比例')
+        parser.add_argument('--seed', type=int, default=42, help='亂數種子')
+        parser.add_argument('--username', default='loadtest', help='送出請求的使用者（不存在時建立）')
+
+    def handle(self, *args, **options):
+        if options['writers'] <= 0 or options['requests'] <= 0:
+            raise CommandError('--writers 與 --requests 必須大於 0')
+        if not 0 <= options['update_ratio'] < 1:
+            raise CommandError('--update-ratio 必須介於 0 與 1 之間')
+
+        user, _ = get_user_model().objects.get_or_create(username=options['username'])
+        token = str(AccessToken.for_user(user))
+        results = {}
+        # 兩種模式送出相同的請求；每次結束後刪除建立的職缺，第二次的新增不會被判定為第一次的重複刊登
+        for enabled, label in ((False, '逐筆提交'), (True, '群組提交')):
+            try:
+                with override_settings(JOBS_WRITE_COALESCING=enabled):
+                    results[enabled] = self.run_writers(token, options)
+            finally:
+                for alias in sharding.databases():
+                    Job.objects.using(alias).filter(company_name__startswith=COMPANY_PREFIX).delete()
+            self.report(label, results[enabled])
+
+        speedup = results[True]['goodput'] / results[False]['goodput']
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["writers"]} 個並行寫入者：群組提交每秒成功的寫入為逐筆提交的 {speedup:.1f} 倍，'
+            f'錯誤 {results[False]["errors"]} -> {results[True]["errors"]} 筆，'
+            f'p99 {results[False]["p99"]:.0f} ms -> {results[True]["p99"]:.0f} ms'
+        ))
+
+    def run_writers(self, token, options):
+        latencies = []
+        statuses = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['writers'] + 1)
+
+        def writer(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            transport = InProcessTransport()
+            own_ids = []
+            try:
+                barrier.wait()
+                for _ in range(options['requests']):
+                    if own_ids and rng.random() < options['update_ratio']:
+                        method, path = "PUT", f"/jobs/{rng.choice(own_ids)}"
+                        payload = {"title": f"{rng.choice(ROLES)} {rng.randint(1, 10 ** 6)}"}
+                    else:
+                        method, path, payload = "POST", "/jobs", self.job_payload(rng, index)
+                    start = time.perf_counter()
+                    status, body = transport.request(method, path, payload, token=token)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    if method == "POST" and status == 201:
+                        own_ids.append(json.loads(body)["id"])
+                    with lock:
+                        latencies.append(elapsed)
+                        statuses[f"{method} {status}"] += 1
+            finally:
+                transport.close()
+
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        close_old_connections()
+
+        latencies.sort()
+        succeeded = sum(count for name, count in statuses.items() if name.split()[1].startswith("2"))
+        return {
+            "throughput": len(latencies) / elapsed,
+            "goodput": succeeded / elapsed,
+            "errors": len(latencies) - succeeded,
+            "elapsed": elapsed,
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "statuses": statuses,
+        }
+
+    def job_payload(self, rng, index):
+        # 每個寫入者一家公司，description 為隨機單字，不會被判定為同公司的重複刊登
+        now = timezone.now()
+        return {
+            "title": rng.choice(ROLES),
+            "description": " ".join(rng.choices(VOCABULARY, k=40)),
+            "company_name": f"{COMPANY_PREFIX} {index}",
+            "location": rng.choice(LOCATIONS),
+            "salary_range": f"{rng.randint(40, 150)}k-{rng.randint(151, 250)}k USD",
+            "expiration_date": (now + timedelta(days=rng.randint(7, 60))).isoformat(),
+            "required_skills": rng.sample(SKILLS, 2),
+        }
+
+    def report(self, label, result):
+        statuses = "，".join(f"{name}: {count}" for name, count in sorted(result['statuses'].items()))
+        self.stdout.write(
+            f'{label}：{result["throughput"]:.1f} 次/秒，成功 {result["goodput"]:.1f} 次/秒（{result["elapsed"]:.2f} 秒），'
+            f'p50 {result["p50"]:.1f} ms，p95 {result["p95"]:.1f} ms，p99 {result["p99"]:.1f} ms；{statuses}'
+        )
@@ -0,0 +1,23 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.similar import similar_index
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '重建相似職缺的 TF-IDF 向量索引並存到 JOBS_SIMILAR_INDEX_PATH，API 行程啟動後直接讀取'
+
+    def handle(self, *args, **options):
+        start_time = time.perf_counter()
+        similar_index.build()
+        path = getattr(settings, 'JOBS_SIMILAR_INDEX_PATH', None)
+        location = f'，已存到 {path}' if path else '（未設定 JOBS_SIMILAR_INDEX_PATH，不會存檔）'
+        message = (f'已建立相似職缺索引：{similar_index.index.size} 筆職缺{location}，'
+                   f'耗時 {time.perf_counter() - start_time:.2f} 秒')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
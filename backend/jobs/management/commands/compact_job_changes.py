@@ -0,0 +1,33 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.changes import compact
+from jobs.models import JobChange
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('壓縮職缺變更紀錄：每筆職缺只保留最新的一筆，刪除紀錄保留 JOBS_CHANGES_TOMBSTONE_DAYS 天，'
+            '讓紀錄大小與職缺數量成正比而不隨寫入次數成長')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='每個交易處理的紀錄 id 範圍大小')
+        parser.add_argument('--silent', action='store_true', help='不輸出每批的進度')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size 必須大於 0')
+
+        def report(deleted, total):
+            if not options['silent']:
+                self.stdout.write(f'  已刪除 {total} 筆')
+
+        start_time = time.perf_counter()
+        deleted = compact(batch_size=options['batch_size'], on_batch=report)
+        message = (f'已壓縮職缺變更紀錄，刪除 {deleted} 筆，剩餘 {JobChange.objects.count()} 筆，'
+                   f'耗時 {time.perf_counter() - start_time:.2f} 秒')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,68 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from jobs import compression, sharding
+from jobs.models import ArchivedJob, DescriptionDictionary, Job
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('以從現有描述訓練的 zlib 字典分批壓縮 Job 與 ArchivedJob 尚未壓縮的描述（需開啟 JOBS_COMPRESS_DESCRIPTIONS），'
+            '或以 --decompress 全部還原為未壓縮的文字')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--train', action='store_true', help='壓縮前訓練新字典（還沒有字典時一定會訓練）')
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=getattr(settings, 'JOBS_DESCRIPTION_DICTIONARY_SAMPLE', 5000),
+            help='訓練字典抽樣的最近職缺筆數（預設為 JOBS_DESCRIPTION_DICTIONARY_SAMPLE）',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='每個交易處理的筆數')
+        parser.add_argument('--decompress', action='store_true', help='把壓縮的描述還原到 description 欄位')
+        parser.add_argument('--vacuum', action='store_true', help='結束後執行 VACUUM，把釋放的空間還給檔案系統')
+        parser.add_argument('--silent', action='store_true', help='不輸出每批的進度')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0 or options['sample'] <= 0:
+            raise CommandError('--batch-size 與 --sample 必須大於 0')
+        if connection.vendor != 'sqlite':
+            raise CommandError('描述壓縮只支援 SQLite')
+        if not options['decompress'] and not compression.compression_enabled():
+            raise CommandError('請先設定 JOBS_COMPRESS_DESCRIPTIONS=True，之後寫入的描述才會以相同方式壓縮')
+
+        def report(done, total):
+            if not options['silent']:
+                self.stdout.write(f'  已處理 {total} 筆')
+
+        start_time = time.perf_counter()
+        if options['decompress']:
+            restored = sum(compression.decompress_existing(model, batch_size=options['batch_size'], on_batch=report)
+                           for model in (Job, ArchivedJob))
+            message = f'已還原 {restored} 筆壓縮的描述，耗時 {time.perf_counter() - start_time:.2f} 秒'
+        else:
+            if options['train'] or not DescriptionDictionary.objects.exists():
+                dictionary = compression.create_dictionary(compression.recent_descriptions(Job, options['sample']))
+                self.stdout.write(f'  以 {dictionary.sample_size} 筆描述訓練字典 #{dictionary.id}（{len(dictionary.data)} bytes）')
+            compressed = before = after = 0
+            for model in (Job, ArchivedJob):
+                count, model_before, model_after = compression.compress_existing(
+                    model, batch_size=options['batch_size'], on_batch=report)
+                compressed += count
+                before += model_before
+                after += model_after
+            ratio = before / after if after else 0
+            message = (f'已壓縮 {compressed} 筆描述：{before / 2 ** 20:.1f} MB -> {after / 2 ** 20:.1f} MB'
+                       f'（{ratio:.1f} 倍），耗時 {time.perf_counter() - start_time:.2f} 秒')
+
+        if options['vacuum']:
+            for alias in sharding.databases():
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('VACUUM')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,67 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from jobs import changes, dedupe, sharding
+from jobs.compression import description_text, text_columns
+from jobs.models import Job
+from jobs.signals import jobs_bulk_changed
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('重建重複刊登偵測的 MinHash / LSH 索引：依 id 順序串流掃描一次尚未到期的職缺，'
+            '與同公司較早的職缺相似者標記為重複，可選擇直接刪除')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='每批讀取與寫入索引的職缺數量')
+        parser.add_argument('--delete', action='store_true', help='刪除標記為重複的職缺（保留最早的一筆）')
+        parser.add_argument('--silent', action='store_true', help='不輸出每批的進度')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size 必須大於 0')
+
+        now = timezone.now()
+        start_time = time.perf_counter()
+        dedupe.clear()
+        scanned = flagged = 0
+        # 同一家公司的職缺都在同一個分片，依序掃描每個分片；指紋索引在 default 中共用
+        for alias in sharding.databases():
+            last_id = 0
+            while True:
+                # 以 id 範圍分批（keyset），記憶體用量固定，也不會長時間持有讀取游標
+                batch = list(
+                    Job.objects.using(alias).filter(id__gt=last_id, expiration_date__gt=now)
+                    .order_by("id")
+                    .annotate(description_text=description_text())
+                    .values_list("id", *text_columns(dedupe.DEDUPE_FIELDS))[:batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                with transaction.atomic():
+                    duplicates = dedupe.index_jobs(batch, now=now)
+                    if options['delete'] and duplicates:
+                        # 直接執行 DELETE，不逐筆送出 post_delete signal；結束後以 jobs_bulk_changed 通知
+                        with transaction.atomic(using=alias):
+                            Job.objects.using(alias).filter(id__in=list(duplicates))._raw_delete(alias)
+                        dedupe.remove(duplicates)
+                        changes.record(changes.DELETE, duplicates, now=now)
+                scanned += len(batch)
+                flagged += len(duplicates)
+                if not options['silent']:
+                    self.stdout.write(f'  已掃描 {scanned} 筆，{flagged} 筆重複')
+
+        if options['delete'] and flagged:
+            jobs_bulk_changed.send(sender=Job)
+        action = '刪除' if options['delete'] else '標記'
+        message = (f'已掃描 {scanned} 筆尚未到期的職缺，{action} {flagged} 筆同公司重複刊登，'
+                   f'耗時 {time.perf_counter() - start_time:.2f} 秒')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,342 @@
+import http.client
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIX = "login=2,list=60,detail=25,create=5,update=6,status=2"
+OPERATIONS = ("login", "list", "detail", "create", "update", "status")
+
+TITLE_TERMS = ["Engineer", "Developer", "Senior", "Data", "Manager", "Python", "Backend", "Intern"]
+LOCATION_TERMS = ["Remote", "Taipei", "New York", "London", "Berlin", "Tokyo"]
+SKILL_TERMS = ["Python", "Django", "React", "AWS", "SQL", "Docker", "Go"]
+STATUS_TERMS = ["active", "expired", "scheduled"]
+ORDER_TERMS = ["posting_date", "-posting_date", "expiration_date", "-expiration_date"]
+
+
+def parse_mix(value):
+    """解析 `list=60,detail=25` 形式的操作比例設定。"""
+    weights = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(f"未知的操作 '{name}'，可用操作：{', '.join(OPERATIONS)}")
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            raise CommandError(f"操作 '{name}' 的權重必須是數字")
+    if not weights or sum(weights.values()) <= 0:
+        raise CommandError("--mix 至少需要一個權重大於 0 的操作")
+    return weights
+
+
+def percentile(sorted_values, fraction):
+    """最近秩（nearest-rank）百分位數；sorted_values 必須已排序。"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class InProcessTransport:
+    """透過 Django 測試 Client 走完整的 WSGI handler、middleware 與 URLconf。"""
+
+    def __init__(self, host="localhost", prefix="/api"):
+        from django.test import Client
+
+        self.client = Client(HTTP_HOST=host)
+        self.prefix = prefix
+
+    def request(self, method, path, payload=None, token=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        body = json.dumps(payload) if payload is not None else None
+        response = self.client.generic(
+            method, self.prefix + path, data=body or "", content_type="application/json", **headers
+        )
+        return response.status_code, response.content
+
+    def close(self):
+        connections.close_all()
+
+
+class HTTPTransport:
+    """對正在運行的伺服器發送請求，每個 worker 保持一條 keep-alive 連線。"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise CommandError("--url 必須以 http:// 或 https:// 開頭")
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=30)
+        self.prefix = parts.path.rstrip("/")
+
+    def request(self, method, path, payload=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        body = json.dumps(payload) if payload is not None else None
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            # 連線中斷時重新建立，該次請求算作錯誤
+            self.connection.close()
+            return 0, b""
+
+    def close(self):
+        self.connection.close()
+
+
+class RateLimiter:
+    """全域固定速率排程：每個請求預約一個時間槽，超前時就等待。"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            slot = max(self.next_slot, time.perf_counter())
+            self.next_slot = slot + self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, operation, elapsed, ok):
+        with self.lock:
+            self.latencies[operation].append(elapsed)
+            if not ok:
+                self.errors[operation] += 1
+
+
+class Worker:
+    def __init__(self, index, transport, options, weights, stats, limiter, deadline, budget):
+        self.rng = random.Random(options["seed"] + index)
+        self.transport = transport
+        self.username = options["username"]
+        self.password = options["password"]
+        self.operations = list(weights)
+        self.weights = list(weights.values())
+        self.stats = stats
+        self.limiter = limiter
+        self.deadline = deadline
+        self.budget = budget
+        self.token = None
+        self.known_ids = []
+        self.own_ids = []
+
+    def call(self, operation, method, path, payload=None, expected=(200,)):
+        self.limiter.wait()
+        start = time.perf_counter()
+        status, body = self.transport.request(method, path, payload, self.token)
+        elapsed = time.perf_counter() - start
+        self.stats.record(operation, elapsed, status in expected)
+        if status not in expected:
+            return None
+        try:
+            return json.loads(body) if body else {}
+        except ValueError:
+            return None
+
+    def login(self):
+        result = self.call("login", "POST", "/auth/login", {"username": self.username, "password": self.password})
+        if result:
+            self.token = result.get("access")
+
+    def list_jobs(self):
+        rng = self.rng
+        params = {"page": rng.randint(1, 3)}
+        filters = {
+            "title": TITLE_TERMS,
+            "location": LOCATION_TERMS,
+            "required_skills": SKILL_TERMS,
+            "status": STATUS_TERMS,
+            "order_by": ORDER_TERMS,
+        }
+        for name in rng.sample(list(filters), rng.randint(0, 2)):
+            params[name] = rng.choice(filters[name])
+        result = self.call("list", "GET", f"/jobs?{urlencode(params)}", expected=(200, 404))
+        if result and result.get("items"):
+            self.known_ids = [item["id"] for item in result["items"]]
+
+    def detail(self):
+        if not self.known_ids:
+            return self.list_jobs()
+        self.call("detail", "GET", f"/jobs/{self.rng.choice(self.known_ids)}")
+
+    def create(self):
+        rng = self.rng
+        now = timezone.now()
+        payload = {
+            "title": f"{rng.choice(TITLE_TERMS)} {rng.choice(['Engineer', 'Developer', 'Analyst'])}",
+            "description": "Created by the load generator.",
+            "location": rng.choice(LOCATION_TERMS),
+            "salary_range": f"{rng.randint(40, 150)}k-{rng.randint(151, 250)}k USD",
+            "company_name": f"Load Test {rng.randint(1, 50)}",
+            "expiration_date": (now + timedelta(days=rng.randint(7, 60))).isoformat(),
+            "required_skills": rng.sample(SKILL_TERMS, rng.randint(1, 3)),
+        }
+        result = self.call("create", "POST", "/jobs", payload, expected=(201,))
+        if result:
+            self.own_ids.append(result["id"])
+
+    def update(self):
+        # 只更新自己建立的職缺，避免改動既有資料
+        if not self.own_ids:
+            return self.create()
+        job_id = self.rng.choice(self.own_ids)
+        self.call("update", "PUT", f"/jobs/{job_id}", {"title": f"Updated {self.rng.randint(1, 10**6)}"})
+
+    def status(self):
+        self.call("status", "POST", "/jobs/update-status")
+
+    def run(self):
+        handlers = {
+            "login": self.login,
+            "list": self.list_jobs,
+            "detail": self.detail,
+            "create": self.create,
+            "update": self.update,
+            "status": self.status,
+        }
+        try:
+            self.login()
+            while time.perf_counter() < self.deadline and self.budget.take():
+                handlers[self.rng.choices(self.operations, weights=self.weights)[0]]()
+        finally:
+            self.transport.close()
+
+
+class RequestBudget:
+    """限制總請求數；limit 為 None 時只受時間限制。"""
+
+    def __init__(self, limit):
+        self.remaining = limit
+        self.lock = threading.Lock()
+
+    def take(self):
+        if self.remaining is None:
+            return True
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class Command(BaseCommand):
+    help = '對職缺 API 進行負載測試，回報各操作的吞吐量、延遲百分位數與錯誤率'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='目標伺服器 API 根路徑，例如 http://localhost:8000/api；未指定時在行程內透過 WSGI 執行')
+        parser.add_argument('--host', default='localhost', help='（僅行程內模式）請求使用的 Host 標頭，需符合 ALLOWED_HOSTS')
+        parser.add_argument('--username', default='loadtest', help='登入使用者名稱')
+        parser.add_argument('--password', default='loadtest-password', help='登入密碼')
+        parser.add_argument('--create-user', action='store_true', help='（僅行程內模式）使用者不存在時自動建立')
+        parser.add_argument('--concurrency', type=int, default=4, help='同時執行的 worker 數量')
+        parser.add_argument('--duration', type=float, default=10.0, help='測試持續秒數')
+        parser.add_argument('--requests', type=int, help='總請求數上限（達到即停止）')
+        parser.add_argument('--rate', type=float, help='目標總請求速率（次/秒），未指定時全速執行')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'操作比例，預設 {DEFAULT_MIX}')
+        parser.add_argument('--seed', type=int, default=1, help='亂數種子')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] <= 0:
+            raise CommandError('--concurrency 必須大於 0')
+        if options['rate'] is not None and options['rate'] <= 0:
+            raise CommandError('--rate 必須大於 0')
+        weights = parse_mix(options['mix'])
+
+        if options['url']:
+            def make_transport():
+                return HTTPTransport(options['url'])
+            target = options['url']
+        else:
+            if options['create_user']:
+                self.ensure_user(options['username'], options['password'])
+            def make_transport():
+                return InProcessTransport(host=options['host'])
+            target = 'in-process WSGI'
+
+        stats = Stats()
+        limiter = RateLimiter(options['rate'])
+        budget = RequestBudget(options['requests'])
+        self.stdout.write(
+            f"負載測試開始：{target}，concurrency={options['concurrency']}，"
+            f"duration={options['duration']}s，rate={options['rate'] or '不限'}"
+        )
+        start = time.perf_counter()
+        deadline = start + options['duration']
+        workers = [
+            Worker(index, make_transport(), options, weights, stats, limiter, deadline, budget)
+            for index in range(options['concurrency'])
+        ]
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            for future in [executor.submit(worker.run) for worker in workers]:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        report = self.report(stats, elapsed)
+        logger.info(f"負載測試完成：{target}，耗時 {elapsed:.2f} 秒")
+        self.stdout.write(report)
+
+    def ensure_user(self, username, password):
+        User = get_user_model()
+        user, created = User.objects.get_or_create(username=username)
+        if created or not user.check_password(password):
+            user.set_password(password)
+            user.save()
+
+    def report(self, stats, elapsed):
+        header = f"{'operation':<10}{'count':>8}{'errors':>8}{'err%':>8}{'rps':>10}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}{'maxms':>10}"
+        lines = [header, "-" * len(header)]
+        total_count = total_errors = 0
+        all_latencies = []
+        for operation in OPERATIONS:
+            latencies = sorted(stats.latencies.get(operation, []))
+            if not latencies:
+                continue
+            errors = stats.errors.get(operation, 0)
+            total_count += len(latencies)
+            total_errors += errors
+            all_latencies.extend(latencies)
+            lines.append(self.format_row(operation, latencies, errors, elapsed))
+        all_latencies.sort()
+        lines.append("-" * len(header))
+        lines.append(self.format_row("total", all_latencies, total_errors, elapsed))
+        return "\n".join(lines)
+
+    def format_row(self, name, latencies, errors, elapsed):
+        count = len(latencies)
+        error_rate = errors / count * 100 if count else 0
+        rps = count / elapsed if elapsed else 0
+        p50, p95, p99 = (percentile(latencies, fraction) * 1000 for fraction in (0.50, 0.95, 0.99))
+        maximum = latencies[-1] * 1000 if latencies else 0
+        return f"{name:<10}{count:>8}{errors:>8}{error_rate:>7.1f}%{rps:>10.1f}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}{maximum:>10.2f}"
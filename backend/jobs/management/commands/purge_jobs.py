@@ -0,0 +1,83 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from jobs import sharding
+from jobs.models import ArchivedJob, Job
+from jobs.purge import checkpoint_wal, database_size, purge_expired, vacuum
+
+logger = logging.getLogger(__name__)
+
+
+def format_bytes(size):
+    return f'{size / 1024 / 1024:.1f} MB'
+
+
+class Command(BaseCommand):
+    help = '依保存期限分批永久刪除過期職缺（含封存表），可選擇之後執行 VACUUM 縮小資料庫檔案'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=getattr(settings, 'JOBS_RETENTION_DAYS', 365),
+            help='到期超過 N 天的職缺會被刪除（預設為 JOBS_RETENTION_DAYS）',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'JOBS_PURGE_BATCH_SIZE', 500),
+            help='每批刪除的 id 範圍大小',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=getattr(settings, 'JOBS_PURGE_PAUSE', 0.05),
+            help='每批之間暫停的秒數，讓其他寫入可以取得資料庫鎖',
+        )
+        parser.add_argument(
+            '--vacuum',
+            choices=['full', 'incremental'],
+            help='刪除後回收空間（僅 SQLite）：full 執行 VACUUM，incremental 執行 PRAGMA incremental_vacuum',
+        )
+        parser.add_argument('--silent', action='store_true', help='不輸出每批的進度')
+
+    def handle(self, *args, **options):
+        if options['retention_days'] < 0 or options['batch_size'] <= 0 or options['pause'] < 0:
+            raise CommandError('--retention-days 與 --pause 不可為負數，--batch-size 必須大於 0')
+        if options['vacuum'] and connection.vendor != 'sqlite':
+            raise CommandError('--vacuum 只支援 SQLite')
+
+        cutoff = timezone.now() - timedelta(days=options['retention_days'])
+        logger.info(f"開始刪除到期日早於 {cutoff} 的職缺")
+        start_time = time.perf_counter()
+
+        total = 0
+        for model in (ArchivedJob, Job):
+            def report(deleted, deleted_total, next_id, max_id, name=model.__name__):
+                if not options['silent'] and deleted:
+                    self.stdout.write(f'  {name}: 已刪除 {deleted_total} 筆（id < {min(next_id, max_id + 1)} / {max_id}）')
+
+            deleted = purge_expired(model, cutoff, batch_size=options['batch_size'], pause=options['pause'], on_batch=report)
+            logger.info(f"{model.__name__} 刪除 {deleted} 筆")
+            total += deleted
+        for alias in sharding.databases():
+            checkpoint_wal('TRUNCATE', using=alias)
+
+        message = f'已刪除 {total} 筆超過保存期限的職缺，耗時 {time.perf_counter() - start_time:.2f} 秒'
+        if options['vacuum']:
+            # 每個分片是各自的資料庫檔案，分別回收
+            for alias in sharding.databases():
+                size_before, free_before = database_size(alias)
+                action = vacuum(options['vacuum'], alias)
+                size_after, _ = database_size(alias)
+                prefix = f'{alias} ' if sharding.is_sharded() else ''
+                message += (f'；{prefix}{action}：{format_bytes(size_before)}（可回收 {format_bytes(free_before)}）'
+                            f' -> {format_bytes(size_after)}')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
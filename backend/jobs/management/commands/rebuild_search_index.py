@@ -0,0 +1,30 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.percolator import rekey_saved_searches
+from jobs.trigram import SEARCH_FIELDS, rebuild_terms
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('重建 title / company_name / location 的 trigram 搜尋索引：補上缺少的值並刪除不再使用的值；'
+            '並依目前的職缺統計重新選擇儲存搜尋的反向索引鍵')
+
+    def handle(self, *args, **options):
+        start_time = time.perf_counter()
+        total_added = total_removed = 0
+        for field in SEARCH_FIELDS:
+            added, removed = rebuild_terms(field)
+            total_added += added
+            total_removed += removed
+            self.stdout.write(f'  {field}: 新增 {added} 個值，刪除 {removed} 個值')
+        rekeyed = rekey_saved_searches()
+        self.stdout.write(f'  儲存的搜尋：{rekeyed} 個更換反向索引鍵')
+
+        message = (f'已重建搜尋索引（新增 {total_added} 個值，刪除 {total_removed} 個值），'
+                   f'耗時 {time.perf_counter() - start_time:.2f} 秒')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
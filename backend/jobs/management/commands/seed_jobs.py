@@ -0,0 +1,322 @@
+import functools
+import itertools
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from jobs import changes, dedupe, trigram
+from jobs.signals import jobs_bulk_changed
+from jobs.models import ArchivedJob, Job
+
+logger = logging.getLogger(__name__)
+
+COMPANY_PREFIXES = [
+    "Tech", "Cloud", "Data", "Quantum", "Blue", "Green", "Bright", "Future", "Nova", "Alpha",
+    "Pixel", "Atlas", "Vertex", "Summit", "Orbit", "Pioneer", "Silver", "Rapid", "Smart", "Open",
+]
+COMPANY_ROOTS = [
+    "Works", "Labs", "Systems", "Solutions", "Dynamics", "Networks", "Logic", "Soft", "Forge", "Bridge",
+    "Stack", "Wave", "Point", "Scale", "Base", "Flow", "Mind", "Core", "Grid", "Path",
+]
+COMPANY_SUFFIXES = ["Inc.", "Corp.", "Ltd.", "Co.", "Group", "GmbH", "LLC"]
+
+LOCATIONS = [
+    "Remote", "Taipei", "New York", "San Francisco", "London", "Berlin", "Tokyo", "Singapore",
+    "Austin", "Seattle", "Toronto", "Sydney", "Paris", "Amsterdam", "Boston", "Taichung",
+    "Kaohsiung", "Hsinchu", "Hong Kong", "Seoul", "Chicago", "Los Angeles", "Dublin", "Zurich",
+    "Stockholm", "Bangalore", "Tel Aviv", "Madrid", "Lisbon", "Warsaw",
+]
+
+SKILLS = [
+    "Python", "JavaScript", "SQL", "Django", "React", "AWS", "Docker", "TypeScript", "Java", "Go",
+    "Kubernetes", "Vue", "PostgreSQL", "Linux", "Git", "REST", "GraphQL", "Node.js", "C++", "Rust",
+    "Terraform", "Redis", "Kafka", "Spark", "Pandas", "Machine Learning", "TensorFlow", "PyTorch",
+    "Figma", "Agile", "Scrum", "CI/CD", "Azure", "GCP", "Swift", "Kotlin", "Flutter", "C#", ".NET",
+    "Spring", "Ruby", "Rails", "PHP", "Laravel", "Elasticsearch", "MongoDB", "Airflow", "dbt",
+    "Tableau", "Excel", "Jira", "Selenium", "Cypress", "Ansible", "Nginx", "RabbitMQ", "gRPC",
+    "Scala", "Haskell", "Elixir",
+]
+
+SENIORITIES = ["", "Junior", "Senior", "Staff", "Principal", "Lead", "Intern"]
+SENIORITY_WEIGHTS = [40, 15, 25, 6, 3, 8, 3]
+ROLES = [
+    "Software Engineer", "Backend Developer", "Frontend Developer", "Full Stack Developer",
+    "Data Scientist", "Data Engineer", "DevOps Engineer", "Site Reliability Engineer",
+    "Product Manager", "QA Engineer", "Mobile Developer", "Machine Learning Engineer",
+    "Security Engineer", "UX Designer", "Engineering Manager", "Solutions Architect",
+    "Database Administrator", "Technical Writer", "Support Engineer", "Platform Engineer",
+]
+
+SENTENCES = [
+    "You will design, build and maintain services used by millions of users.",
+    "Work closely with product, design and operations to ship features quickly.",
+    "We value clean code, thorough reviews and pragmatic testing.",
+    "Experience with distributed systems and high traffic APIs is a plus.",
+    "You will mentor other engineers and help shape our technical roadmap.",
+    "Our stack runs on containers orchestrated in the cloud.",
+    "Participate in an on-call rotation with a healthy escalation policy.",
+    "We offer flexible working hours, remote options and a learning budget.",
+    "Own features end to end, from discovery to monitoring in production.",
+    "Improve observability, performance and reliability of our platform.",
+    "Collaborate with data teams to build analytics pipelines.",
+    "Strong communication skills and a growth mindset are essential.",
+    "Help us migrate legacy components to a modern architecture.",
+    "Write documentation that makes onboarding painless for new teammates.",
+    "Contribute to open source projects that our products depend on.",
+    "Analyse user feedback and turn it into actionable improvements.",
+]
+
+
+def zipf_cum_weights(n, exponent=1.1):
+    """回傳 Zipf 分佈的累積權重，讓少數值佔大多數，接近真實資料的偏態。"""
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def build_companies(rng, count):
+    names = [
+        f"{prefix}{root} {suffix}"
+        for prefix in COMPANY_PREFIXES
+        for root in COMPANY_ROOTS
+        for suffix in COMPANY_SUFFIXES
+    ]
+    rng.shuffle(names)
+    return names[:count]
+
+
+class JobGenerator:
+    """以固定亂數種子產生具偏態分佈的職缺資料，相同 seed 與 reference 會得到相同結果。"""
+
+    # batch() 回傳的 tuple 欄位順序
+    FIELDS = (
+        "title", "description", "location", "salary_range", "salary_min", "salary_max", "salary_currency", "company_name",
+        "posting_date", "expiration_date", "required_skills", "is_active", "is_scheduled",
+    )
+
+    def __init__(self, seed, reference, companies=500, expired_ratio=0.6, scheduled_ratio=0.05):
+        self.rng = random.Random(seed)
+        self.reference = reference
+        self.companies = build_companies(self.rng, companies)
+        self.company_weights = zipf_cum_weights(len(self.companies))
+        self.location_weights = zipf_cum_weights(len(LOCATIONS), exponent=1.3)
+        self.skill_weights = zipf_cum_weights(len(SKILLS), exponent=1.0)
+        self.role_weights = zipf_cum_weights(len(ROLES), exponent=0.8)
+        self.expired_ratio = expired_ratio
+        self.scheduled_ratio = scheduled_ratio
+
+    def salary(self, low, span, style):
+        """回傳 (salary_range, salary_min, salary_max, salary_currency)，與 parse_salary_range 的結果一致"""
+        high = low + span
+        if style < 0.6:
+            return f"{low}k-{high}k USD", low * 1000, high * 1000, "USD"
+        if style < 0.9:
+            return f"${low * 1000:,} - ${high * 1000:,}", low * 1000, high * 1000, "USD"
+        return f"{low}k", low * 1000, low * 1000, ""
+
+    def dates(self, roll, offset, duration, flag):
+        reference = self.reference
+        if roll < self.scheduled_ratio:
+            posting_date = reference + timedelta(minutes=60 + offset % (60 * 24 * 30))
+            return posting_date, posting_date + timedelta(days=14 + duration % 77), False, True
+        if roll < self.scheduled_ratio + self.expired_ratio:
+            expiration_date = reference - timedelta(minutes=1 + offset % (60 * 24 * 720))
+            # 大部分過期職缺已經被狀態更新排程處理過
+            return expiration_date - timedelta(days=7 + duration % 84), expiration_date, flag < 0.1, False
+        # 活躍職缺的發布時間集中在最近幾天（指數分佈）
+        posting_date = reference - timedelta(minutes=1 + int(self.rng.expovariate(1 / (60 * 24 * 10))))
+        expiration_date = reference + timedelta(minutes=60 + offset % (60 * 24 * 90))
+        return posting_date, expiration_date, flag < 0.97, False
+
+    def batch(self, size):
+        """一次產生 size 筆職缺（依 FIELDS 順序的 tuple），以整批抽樣降低逐筆呼叫亂數函式的成本。"""
+        rng = self.rng
+        random = rng.random
+        seniorities = rng.choices(SENIORITIES, weights=SENIORITY_WEIGHTS, k=size)
+        roles = rng.choices(ROLES, cum_weights=self.role_weights, k=size)
+        locations = rng.choices(LOCATIONS, cum_weights=self.location_weights, k=size)
+        companies = rng.choices(self.companies, cum_weights=self.company_weights, k=size)
+        jobs = []
+        for index in range(size):
+            # 技能數量與描述長度都是長尾分佈：大部分很短，少數很長
+            skill_count = min(len(SKILLS), 1 + int(rng.expovariate(1 / 2.5)))
+            sentences = max(1, min(int(rng.lognormvariate(1.6, 0.7)), 60))
+            posting_date, expiration_date, is_active, is_scheduled = self.dates(
+                random(), rng.getrandbits(32), rng.getrandbits(16), random(),
+            )
+            jobs.append((
+                f"{seniorities[index]} {roles[index]}".strip(),
+                " ".join(rng.choices(SENTENCES, k=sentences)),
+                locations[index],
+                *self.salary(30 + 5 * rng.randrange(34), 10 + 5 * rng.randrange(14), random()),
+                companies[index],
+                posting_date,
+                expiration_date,
+                list(dict.fromkeys(rng.choices(SKILLS, cum_weights=self.skill_weights, k=skill_count))),
+                is_active,
+                is_scheduled,
+            ))
+        return jobs
+
+
+def column_adapter(field):
+    """回傳欄位值轉成資料庫參數的函式；常見欄位型別走捷徑以省去逐筆的 ORM 轉換。"""
+    internal_type = field.get_internal_type()
+    if internal_type == "DateTimeField":
+        if connection.vendor == "sqlite" and settings.USE_TZ:
+            # 產生器的時間都已是 UTC，直接去掉時區即等同 SQLite 儲存格式
+            return lambda value: str(value.replace(tzinfo=None))
+        return connection.ops.adapt_datetimefield_value
+    if internal_type == "JSONField":
+        return functools.partial(connection.ops.adapt_json_value, encoder=field.encoder)
+    if internal_type in ("CharField", "TextField", "BooleanField", "PositiveIntegerField"):
+        return None
+    return functools.partial(field.get_db_prep_save, connection=connection)
+
+
+class relaxed_sqlite_pragmas:
+    """載入期間暫時放寬 SQLite 的同步與日誌設定，結束後還原。"""
+
+    PRAGMAS = {
+        "synchronous": "OFF",
+        "temp_store": "MEMORY",
+        "cache_size": "-262144",
+    }
+
+    def __enter__(self):
+        self.previous = {}
+        # PRAGMA synchronous 不能在交易中修改（例如測試環境），此時維持原設定
+        if connection.vendor != "sqlite" or connection.in_atomic_block:
+            return self
+        with connection.cursor() as cursor:
+            for name, value in self.PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}")
+                self.previous[name] = cursor.fetchone()[0]
+                cursor.execute(f"PRAGMA {name} = {value}")
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.previous:
+            return False
+        with connection.cursor() as cursor:
+            for name, value in self.previous.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        return False
+
+
+class Command(BaseCommand):
+    help = '產生大量模擬職缺資料（可重現），用於本機壓測與效能驗證'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='要產生的職缺數量')
+        parser.add_argument('--seed', type=int, default=42, help='亂數種子，相同種子產生相同資料')
+        parser.add_argument('--batch-size', type=int, default=5000, help='每批寫入的筆數')
+        parser.add_argument('--companies', type=int, default=500, help='公司數量（依 Zipf 分佈出現）')
+        parser.add_argument('--expired-ratio', type=float, default=0.6, help='已過期職缺比例')
+        parser.add_argument('--scheduled-ratio', type=float, default=0.05, help='排程中職缺比例')
+        parser.add_argument(
+            '--reference-date',
+            help='產生日期時使用的基準時間（ISO 格式），預設為目前時間取整點',
+        )
+        parser.add_argument('--clear', action='store_true', help='寫入前先清空職缺與封存職缺資料表')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        batch_size = options['batch_size']
+        if count < 0 or batch_size <= 0:
+            raise CommandError('--count 不可為負數，--batch-size 必須大於 0')
+        if options['expired_ratio'] + options['scheduled_ratio'] > 1:
+            raise CommandError('--expired-ratio 與 --scheduled-ratio 的總和不可超過 1')
+
+        if options['reference_date']:
+            try:
+                reference = datetime.fromisoformat(options['reference_date'].replace("Z", "+00:00"))
+            except ValueError:
+                raise CommandError('--reference-date 必須是 ISO 格式')
+            if reference.tzinfo is None:
+                reference = timezone.make_aware(reference)
+            reference = reference.astimezone(dt_timezone.utc)
+        else:
+            reference = timezone.now().astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+        generator = JobGenerator(
+            options['seed'],
+            reference,
+            companies=options['companies'],
+            expired_ratio=options['expired_ratio'],
+            scheduled_ratio=options['scheduled_ratio'],
+        )
+
+        start_time = time.perf_counter()
+        with relaxed_sqlite_pragmas():
+            if options['clear']:
+                # 直接執行 DELETE，不逐筆載入職缺送出 post_delete signal；變更紀錄的讀取端需要知道職缺已刪除
+                changes.record(changes.DELETE, Job.objects.values_list("id", flat=True).iterator())
+                changes.record(changes.DELETE, ArchivedJob.objects.values_list("id", flat=True).iterator())
+                Job.objects.all()._raw_delete(connection.alias)
+                ArchivedJob.objects.all()._raw_delete(connection.alias)
+                dedupe.clear()
+            inserted = self.insert(generator, count, batch_size)
+        jobs_bulk_changed.send(sender=Job)
+        elapsed = time.perf_counter() - start_time
+
+        rate = inserted / elapsed if elapsed else 0
+        message = (f'已產生 {inserted} 筆職缺（{self.duplicates} 筆標記為同公司重複刊登），'
+                   f'耗時 {elapsed:.2f} 秒（{rate:,.0f} 筆/秒）')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def insert(self, generator, count, batch_size):
+        """以 executemany 分批寫入，略過 ORM 物件建立的成本。"""
+        fields_by_name = {field.attname: field for field in Job._meta.concrete_fields if not field.primary_key}
+        generated = [fields_by_name.pop(name) for name in generator.FIELDS]
+        # 產生器沒有提供的欄位一律使用欄位預設值
+        remaining = list(fields_by_name.values())
+        default_values = [field.get_db_prep_save(field.get_default(), connection) for field in remaining]
+        adapters = [
+            (index, adapter)
+            for index, adapter in enumerate(column_adapter(field) for field in generated)
+            if adapter is not None
+        ]
+
+        fields = generated + remaining
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        placeholders = ", ".join(["%s"] * len(fields))
+        sql = f"INSERT INTO {connection.ops.quote_name(Job._meta.db_table)} ({columns}) VALUES ({placeholders})"
+
+        # 原生 INSERT 不會送出 post_save，搜尋欄位的新值在同一交易中加入 trigram 索引
+        search_positions = {field: generator.FIELDS.index(field) for field in trigram.SEARCH_FIELDS}
+        indexed = {field: set() for field in trigram.SEARCH_FIELDS}
+
+        inserted = self.duplicates = 0
+        while inserted < count:
+            size = min(batch_size, count - inserted)
+            rows = []
+            terms = {field: set() for field in trigram.SEARCH_FIELDS}
+            for job in generator.batch(size):
+                for field, position in search_positions.items():
+                    terms[field].add(job[position])
+                row = list(job)
+                for index, adapter in adapters:
+                    row[index] = adapter(row[index])
+                row.extend(default_values)
+                rows.append(row)
+            with transaction.atomic():
+                last_id = Job.objects.aggregate(last=Max("id"))["last"] or 0
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+                for field, values in terms.items():
+                    trigram.ensure_terms(field, values - indexed[field])
+                    indexed[field] |= values
+                # 寫入後讀回 id，計算重複刊登的簽章；批次寫入只記錄重複，不拒絕
+                new_jobs = list(Job.objects.filter(id__gt=last_id).order_by("id").values_list("id", *dedupe.DEDUPE_FIELDS))
+                self.duplicates += len(dedupe.index_jobs(new_jobs))
+                changes.record(changes.UPSERT, [job[0] for job in new_jobs], event=changes.CREATED)
+            inserted += size
+            self.stdout.write(f'  已寫入 {inserted}/{count}')
+        return inserted
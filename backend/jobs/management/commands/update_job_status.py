@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from jobs.models import Job
+from jobs.statuses import update_job_statuses
 import logging
 from datetime import datetime
 
@@ -25,26 +25,8 @@ class Command(BaseCommand):
         logger.info(f"開始更新職缺狀態，當前時間：{now}")
         logger.info(f"執行環境時間：{start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # 處理已到期的職缺（無論之前是什麼狀態）
-        expired_jobs = Job.objects.filter(expiration_date__lt=now)
-        expired_count = expired_jobs.update(is_active=False, is_scheduled=False)
-        
-        # 處理排程中但已到發布時間的職缺
-        scheduled_jobs = Job.objects.filter(
-            is_scheduled=True,
-            posting_date__lte=now,
-            expiration_date__gt=now
-        )
-        scheduled_count = scheduled_jobs.update(is_active=True, is_scheduled=False)
-        
-        # 確保所有活躍的職缺狀態正確
-        active_jobs = Job.objects.filter(
-            posting_date__lte=now,
-            expiration_date__gt=now,
-            is_active=True
-        )
-        active_count = active_jobs.count()
-        
+        # 過期、排程轉為上架（並與儲存的搜尋比對）與上架數量統計
+        expired_count, scheduled_count, active_count = update_job_statuses(now)
         total_updated = expired_count + scheduled_count
         
         success_message = f'成功更新 {total_updated} 個職缺狀態：\n' \
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('location', models.CharField(max_length=255)),
+                ('salary_range', models.CharField(max_length=255)),
+                ('company_name', models.CharField(max_length=255)),
+                ('posting_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expiration_date', models.DateTimeField()),
+                ('required_skills', models.JSONField(default=list)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_scheduled', models.BooleanField(default=False)),
+                ('version', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'ordering': ['-posting_date'],
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SEARCH_FIELDS = ('title', 'company_name', 'location')
+
+
+def trigrams(value):
+    lowered = value.lower()
+    return {lowered[index:index + 3] for index in range(len(lowered) - 2)}
+
+
+def populate_search_terms(apps, schema_editor):
+    # 既有職缺與封存職缺的相異值建立 trigram 索引（與 jobs.trigram.ensure_terms 相同）
+    SearchTerm = apps.get_model('jobs', 'SearchTerm')
+    SearchTrigram = apps.get_model('jobs', 'SearchTrigram')
+    # 在執行 migrate 的資料庫（分片）中建立，不經過路由
+    db_alias = schema_editor.connection.alias
+    for field in SEARCH_FIELDS:
+        values = set()
+        for model_name in ('Job', 'ArchivedJob'):
+            model = apps.get_model('jobs', model_name)
+            values.update(model.objects.using(db_alias).order_by().values_list(field, flat=True).distinct())
+        values.discard('')
+        SearchTerm.objects.using(db_alias).bulk_create(
+            [SearchTerm(field=field, value=value, trigram_count=len(trigrams(value))) for value in values],
+            batch_size=500,
+        )
+        SearchTrigram.objects.using(db_alias).bulk_create(
+            [SearchTrigram(term_id=term_id, field=field, trigram=trigram)
+             for term_id, value in SearchTerm.objects.using(db_alias).filter(field=field).values_list('id', 'value').iterator()
+             for trigram in trigrams(value)],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_salary_columns'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedjob',
+            name='company_name',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='archivedjob',
+            name='location',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='archivedjob',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='company_name',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='location',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=255)),
+                ('trigram_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'value'), name='unique_search_term')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20)),
+                ('trigram', models.CharField(max_length=3)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='jobs.searchterm')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['field', 'trigram'], name='jobs_trigram_lookup')],
+                'constraints': [models.UniqueConstraint(fields=('term', 'trigram'), name='unique_search_trigram')],
+            },
+        ),
+        migrations.RunPython(populate_search_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+TABLES = ('jobs_job', 'jobs_archivedjob')
+COLUMNS = 'title, description, required_skills'
+
+
+def create_search_index(apps, schema_editor):
+    # SQLite FTS5 全文索引（外部內容表），由觸發器與職缺資料表同步，包含原生 SQL 的寫入
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        index = f'{table}_search'
+        for sql in (
+            f"CREATE VIRTUAL TABLE {index} USING fts5({COLUMNS}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {index}(rowid, {COLUMNS}) VALUES (new.id, new.title, new.description, new.required_skills); END",
+            f"CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {COLUMNS}) "
+            f"VALUES ('delete', old.id, old.title, old.description, old.required_skills); END",
+            f"CREATE TRIGGER {index}_update AFTER UPDATE OF {COLUMNS} ON {table} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {COLUMNS}) "
+            f"VALUES ('delete', old.id, old.title, old.description, old.required_skills); "
+            f"INSERT INTO {index}(rowid, {COLUMNS}) VALUES (new.id, new.title, new.description, new.required_skills); END",
+            f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+        ):
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        index = f'{table}_search'
+        for name in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {index}_{name}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {index}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_search_trigrams'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
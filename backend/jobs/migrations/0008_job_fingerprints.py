@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_saved_searches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobFingerprint',
+            fields=[
+                ('job_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('signature', models.BinaryField()),
+                ('expiration_date', models.DateTimeField(db_index=True)),
+                ('duplicate_of', models.BigIntegerField(blank=True, db_index=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JobFingerprintBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='jobs.jobfingerprint')),
+            ],
+        ),
+    ]
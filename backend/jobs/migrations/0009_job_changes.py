@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_changes(apps, schema_editor):
+    # 每筆既有職缺（含封存）記錄一筆 upsert，從游標 0 讀取即可取得完整資料
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    JobChange = apps.get_model('jobs', 'JobChange')
+    changed_at = JobChange._meta.get_field('changed_at').get_db_prep_save(django.utils.timezone.now(), connection)
+    for model_name in ('Job', 'ArchivedJob'):
+        table = quote(apps.get_model('jobs', model_name)._meta.db_table)
+        schema_editor.execute(
+            f"INSERT INTO {quote(JobChange._meta.db_table)} (job_id, operation, changed_at) "
+            f"SELECT id, 'upsert', %s FROM {table} ORDER BY id",
+            [changed_at],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_job_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('job_id', models.BigIntegerField()),
+                ('operation', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job_id', 'id'], name='jobs_change_job_latest')],
+            },
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_job_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobchange',
+            name='event',
+            field=models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('status', 'Status'), ('deleted', 'Deleted')], default='updated', max_length=7),
+        ),
+        # 既有的刪除紀錄
+        migrations.RunSQL(
+            "UPDATE jobs_jobchange SET event = 'deleted' WHERE operation = 'delete'",
+            migrations.RunSQL.noop,
+        ),
+    ]
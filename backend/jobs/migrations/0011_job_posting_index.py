@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0010_job_change_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedjob',
+            index=models.Index(fields=['posting_date', 'id'], name='jobs_archivedjob_posting'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['posting_date', 'id'], name='jobs_job_posting'),
+        ),
+    ]
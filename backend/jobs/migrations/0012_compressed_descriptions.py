@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:23
+
+from django.db import migrations, models
+
+TABLES = ('jobs_job', 'jobs_archivedjob')
+COLUMNS = 'title, description, required_skills'
+
+
+def text(alias):
+    # 與 jobs.compression.description_text() 相同：壓縮的資料列以連線上註冊的函式解壓縮。
+    # 只有 Django 的連線註冊這個函式，其他程式寫入職缺資料表時觸發器會失敗（見 README）
+    return (f'CASE WHEN {alias}.description_compressed IS NULL THEN {alias}.description '
+            f'ELSE CAST(jobs_decompress_description({alias}.description_compressed) AS TEXT) END')
+
+
+def create_triggers(schema_editor, table, new_text, old_text, update_columns=COLUMNS, update_condition=''):
+    index = f'{table}_search'
+    for name in ('insert', 'delete', 'update'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {index}_{name}')
+    for sql in (
+        f"CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {index}(rowid, {COLUMNS}) VALUES (new.id, new.title, {new_text}, new.required_skills); END",
+        f"CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {COLUMNS}) "
+        f"VALUES ('delete', old.id, old.title, {old_text}, old.required_skills); END",
+        f"CREATE TRIGGER {index}_update AFTER UPDATE OF {update_columns} ON {table}{update_condition} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {COLUMNS}) "
+        f"VALUES ('delete', old.id, old.title, {old_text}, old.required_skills); "
+        f"INSERT INTO {index}(rowid, {COLUMNS}) VALUES (new.id, new.title, {new_text}, new.required_skills); END",
+    ):
+        schema_editor.execute(sql)
+
+
+def index_description_text(apps, schema_editor):
+    # 全文索引的觸發器改為索引解壓縮後的內文；只壓縮或解壓縮（內文不變）時不重新索引
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    condition = (f' WHEN old.title IS NOT new.title OR old.required_skills IS NOT new.required_skills '
+                 f'OR {text("old")} IS NOT {text("new")}')
+    for table in TABLES:
+        create_triggers(schema_editor, table, text('new'), text('old'), f'{COLUMNS}, description_compressed', condition)
+
+
+def index_description_column(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES:
+        # 先把壓縮的內文還原到 description 欄位，再移除壓縮欄位
+        schema_editor.execute(f'UPDATE {table} SET description = CAST(jobs_decompress_description(description_compressed) AS TEXT), '
+                              f'description_compressed = NULL WHERE description_compressed IS NOT NULL')
+        create_triggers(schema_editor, table, 'new.description', 'old.description')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0011_job_posting_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DescriptionDictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('sample_size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='archivedjob',
+            options={'base_manager_name': 'objects', 'ordering': ['-posting_date']},
+        ),
+        migrations.AlterModelOptions(
+            name='job',
+            options={'base_manager_name': 'objects', 'ordering': ['-posting_date']},
+        ),
+        migrations.AddField(
+            model_name='archivedjob',
+            name='description_compressed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='description_compressed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(index_description_text, index_description_column),
+    ]
@@ -1,25 +1,106 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .compression import CompressedTextField, compress, compression_enabled
+from .salary import parse_salary_range
+from . import sharding
+
 # Create your models here.
 
-class Job(models.Model):
-    title = models.CharField(max_length=255)
-    description = models.TextField()
-    location = models.CharField(max_length=255)
-    salary_range = models.CharField(max_length=255)  # 根據需求，未來可以改為 JSONField 或獨立的 SalaryRange 模型
-    company_name = models.CharField(max_length=255)
+class JobQuerySet(models.QuerySet):
+    """
+    description 與 description_compressed 一起載入或延遲，讀取 description 時不需要再查詢壓縮欄位。
+    設定 JOBS_SHARD_DATABASES 時職缺依公司名稱分散在多個資料庫：create() 寫入公司的分片，
+    依 id 查詢以 for_id() / in_bulk_by_shard()，列表以 across_shards() 合併所有分片。
+    """
+
+    def create(self, **kwargs):
+        if self._db is None and sharding.is_sharded() and self.model is Job:
+            return super(JobQuerySet, self.using(sharding.shard_for_company(kwargs.get("company_name")))).create(**kwargs)
+        return super().create(**kwargs)
+
+    def for_id(self, job_id):
+        """限定在 id 所在的分片查詢"""
+        return self.using(sharding.shard_for_id(job_id))
+
+    def in_bulk_by_shard(self, ids):
+        """與 in_bulk() 相同，但依 id 到各自的分片查詢"""
+        found = {}
+        for alias, group in sharding.group_by_shard(ids).items():
+            found.update(self.using(alias).in_bulk(group))
+        return found
+
+    def across_shards(self):
+        """在所有分片執行並依排序合併的 ShardedQuerySet；不分片時回傳自己"""
+        if not sharding.is_sharded():
+            return self
+        return sharding.ShardedQuerySet(self)
+
+    def only(self, *fields):
+        if "description" in fields:
+            fields = (*fields, "description_compressed")
+        return super().only(*fields)
+
+    def defer(self, *fields):
+        if "description" in fields:
+            fields = (*fields, "description_compressed")
+        return super().defer(*fields)
+
+
+class JobBase(models.Model):
+    """Job 與 ArchivedJob 共用的欄位，兩張表的 schema 必須完全相同"""
+    title = models.CharField(max_length=255, db_index=True)
+    description = CompressedTextField()
+    # JOBS_COMPRESS_DESCRIPTIONS 開啟時 description 以字典壓縮存在這裡（description 欄位為空字串），讀取時才解壓縮
+    description_compressed = models.BinaryField(null=True, blank=True)
+    location = models.CharField(max_length=255, db_index=True)
+    salary_range = models.CharField(max_length=255)  # 原始字串，供顯示使用
+    # 由 salary_range 解析出的年薪範圍，儲存時自動更新，供範圍篩選使用
+    salary_min = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    salary_max = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    salary_currency = models.CharField(max_length=3, blank=True, default="")
+    company_name = models.CharField(max_length=255, db_index=True)
     posting_date = models.DateTimeField(default=timezone.now)
     expiration_date = models.DateTimeField()
     required_skills = models.JSONField(default=list)  # 使用 JSONField 來儲存技能列表
     is_active = models.BooleanField(default=True)
     is_scheduled = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=1)  # 樂觀鎖版本號，每次更新 +1
+
+    objects = JobQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 保留讀取時的欄位值，寫入後用來計算統計快取的增量
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.salary_min, self.salary_max, self.salary_currency = parse_salary_range(self.salary_range)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "salary_range" in update_fields:
+            kwargs["update_fields"] = update_fields = {*update_fields, "salary_min", "salary_max", "salary_currency"}
+        # 新的或修改過的 description 尚未壓縮（讀取後未修改的內容保留原本的壓縮資料）
+        data = self.__dict__
+        if "description" in data and data.get("description_compressed") is None and compression_enabled():
+            self.description_compressed = compress(data["description"])
+        if update_fields is not None and "description" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "description_compressed"}
+        super().save(*args, **kwargs)
+
     class Meta:
+        abstract = True
+        base_manager_name = 'objects'
         ordering = ['-posting_date']
+        indexes = [
+            # 列表與後台依發布日期排序，同一時間再依 id 排序，分頁時沿索引讀取不需要排序整張表
+            models.Index(fields=['posting_date', 'id'], name='%(app_label)s_%(class)s_posting'),
+        ]
 
     @property
     def status(self):
@@ -44,3 +125,145 @@ class Job(models.Model):
             return "Active"
         else:
             return "Inactive" # 其他情況，例如 is_active=False 但未過期
+
+
+class Job(JobBase):
+    """上架中的職缺（熱資料）"""
+
+
+class ArchivedJob(JobBase):
+    """
+    已封存的過期職缺（冷資料），由 archive_jobs 指令從 Job 搬移過來，保留原本的 id。
+    """
+
+
+class DescriptionDictionary(models.Model):
+    """
+    壓縮 description 用的 zlib 預設字典，由 compress_job_descriptions 從現有的職缺描述訓練。
+    壓縮內容記錄使用的字典 id；字典只新增不修改，之後訓練新字典時舊的壓縮內容仍可解壓縮。
+    """
+    data = models.BinaryField()
+    sample_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Dictionary {self.id} ({len(self.data)} bytes)"
+
+
+class SearchTerm(models.Model):
+    """
+    Job / ArchivedJob 的 title、company_name、location 出現過的相異值，
+    以 SearchTrigram 建立 trigram 索引，供子字串與模糊搜尋先找出符合的值，再以欄位索引找職缺。
+    """
+    field = models.CharField(max_length=20)
+    value = models.CharField(max_length=255)
+    trigram_count = models.PositiveIntegerField(default=0)  # 相似度計算用
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'value'], name='unique_search_term'),
+        ]
+
+    def __str__(self):
+        return f"{self.field}: {self.value}"
+
+
+class SearchTrigram(models.Model):
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='trigrams')
+    field = models.CharField(max_length=20)  # 與 term.field 相同，讓查詢可以直接使用 (field, trigram) 索引
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'trigram'], name='unique_search_trigram'),
+        ]
+        indexes = [
+            models.Index(fields=['field', 'trigram'], name='jobs_trigram_lookup'),
+        ]
+
+
+class SavedSearch(models.Model):
+    """
+    使用者儲存的 list_jobs 篩選條件，新職缺上架時通知。match_key 是反向索引的鍵：
+    符合這組條件的職缺一定包含的一個 trigram（或只有狀態條件），由 percolator 計算。
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=255)
+    filters = models.JSONField(default=dict)
+    match_key = models.CharField(max_length=64, db_index=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        from .percolator import match_key
+
+        self.match_key = match_key(self.filters)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "filters" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "match_key"}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+class SavedSearchMatch(models.Model):
+    """新上架職缺符合儲存的搜尋時記錄一筆，delivered_at 為空表示尚未通知"""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    # 職缺之後可能被封存或刪除，只記錄 id
+    job_id = models.BigIntegerField()
+    matched_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-matched_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'job_id'], name='unique_saved_search_match'),
+        ]
+        indexes = [
+            models.Index(fields=['search', 'delivered_at'], name='jobs_saved_search_pending'),
+        ]
+
+
+class JobFingerprint(models.Model):
+    """
+    尚未到期職缺 title + description 的 MinHash 簽章，用於偵測同公司的重複刊登（jobs.dedupe）。
+    duplicate_of 為寫入時找到的較早相似職缺，沒有則為空。
+    """
+    job_id = models.BigIntegerField(primary_key=True)
+    signature = models.BinaryField()
+    expiration_date = models.DateTimeField(db_index=True)
+    duplicate_of = models.BigIntegerField(null=True, blank=True, db_index=True)
+
+
+class JobFingerprintBand(models.Model):
+    """LSH 索引：公司名稱與簽章每一段的雜湊值，任一段相同的職缺互為候選"""
+    fingerprint = models.ForeignKey(JobFingerprint, on_delete=models.CASCADE, related_name='bands')
+    key = models.BigIntegerField(db_index=True)
+
+
+class JobChange(models.Model):
+    """
+    職缺的變更紀錄（只新增不修改），id 即為 GET /api/jobs/changes 的游標。與職缺的寫入在同一個交易中新增，
+    compact_job_changes 只保留每筆職缺最新的一筆。
+    """
+    UPSERT = "upsert"
+    DELETE = "delete"
+    OPERATION_CHOICES = [(UPSERT, "Upsert"), (DELETE, "Delete")]
+    # GET /api/jobs/events 推送的事件類型；status 為狀態轉換（排程轉為上架、到期等）
+    CREATED = "created"
+    UPDATED = "updated"
+    STATUS = "status"
+    DELETED = "deleted"
+    EVENT_CHOICES = [(CREATED, "Created"), (UPDATED, "Updated"), (STATUS, "Status"), (DELETED, "Deleted")]
+
+    id = models.BigAutoField(primary_key=True)
+    job_id = models.BigIntegerField()
+    operation = models.CharField(max_length=6, choices=OPERATION_CHOICES)
+    event = models.CharField(max_length=7, choices=EVENT_CHOICES, default=UPDATED)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # 壓縮時判斷同一職缺是否有較新的紀錄
+            models.Index(fields=['job_id', 'id'], name='jobs_change_job_latest'),
+        ]
@@ -0,0 +1,177 @@
+import json
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import facets
+from .compression import description_text, text_columns
+from .models import Job, SavedSearch, SavedSearchMatch
+from .trigram import trigrams
+
+logger = logging.getLogger(__name__)
+
+# 儲存的搜尋可使用的篩選條件，與 list_jobs 相同（q 與 fuzzy 只影響排序既有職缺，不支援）
+SAVED_FILTERS = (
+    "title", "description", "company_name", "location", "salary_range", "required_skills", "status",
+    "salary_min_gte", "salary_max_lte", "salary_currency",
+)
+# 新職缺上架（新增或排程到期轉為上架）時的狀態，儲存的搜尋只能指定這些狀態
+NOTIFY_STATUSES = ("active", "scheduled")
+# 選擇反向索引鍵時欄位的優先順序：技能與標題最能區分職缺，描述最長、候選最多
+KEY_FIELDS = ("required_skills", "title", "company_name", "location", "salary_range", "description")
+
+_FREQUENCIES_KEY = "jobs:percolator:frequencies"
+# 沒有職缺統計時的備案：英文字母依常見程度排序，由少見字母組成的 trigram 通常出現在較少職缺中
+_LETTER_RANK = {char: rank for rank, char in enumerate("etaoinshrdlcumwfgypbvkjxqz")}
+_CHUNK_SIZE = 500
+
+
+def _rarity(gram):
+    return sum(_LETTER_RANK.get(char, 0) for char in gram)
+
+
+def _text_conditions(filters, field):
+    value = filters.get(field)
+    if not value:
+        return []
+    if field == "required_skills":
+        return [skill.strip() for skill in value.split(",") if skill.strip()]
+    return [value]
+
+
+def trigram_frequencies():
+    """
+    最近 JOBS_PERCOLATOR_SAMPLE_SIZE 筆職缺中，各欄位每個 trigram 出現的職缺數（"欄位:trigram" → 次數），
+    快取 JOBS_PERCOLATOR_STATS_TTL 秒。只用來挑選反向索引鍵，統計過時不影響比對結果。
+    """
+    frequencies = cache.get(_FREQUENCIES_KEY)
+    if frequencies is None:
+        frequencies = Counter()
+        sample = (Job.objects.order_by("-id").annotate(description_text=description_text())
+                  .values_list(*text_columns(KEY_FIELDS))[:getattr(settings, "JOBS_PERCOLATOR_SAMPLE_SIZE", 5000)])
+        for row in sample.iterator():
+            values = dict(zip(KEY_FIELDS, row))
+            for field in KEY_FIELDS:
+                frequencies.update(f"{field}:{gram}" for gram in trigrams(_field_text(values, field)))
+        frequencies = dict(frequencies)
+        cache.set(_FREQUENCIES_KEY, frequencies, getattr(settings, "JOBS_PERCOLATOR_STATS_TTL", 3600))
+    return frequencies
+
+
+def match_key(filters, frequencies=None):
+    """
+    儲存搜尋的反向索引鍵 "狀態:欄位:trigram"。子字串條件的每個 trigram 都一定出現在符合的職缺中，
+    取所有子字串條件中出現在最少職缺的 trigram（統計相同時取字母較少見者），候選搜尋因此最少；
+    沒有子字串條件時為 "狀態:*"。未指定狀態時狀態為 "*"。
+    """
+    if frequencies is None:
+        frequencies = trigram_frequencies()
+    status = (filters.get("status") or "*").lower()
+    best = None
+    for position, field in enumerate(KEY_FIELDS):
+        for value in _text_conditions(filters, field):
+            for gram in trigrams(value):
+                rank = (frequencies.get(f"{field}:{gram}", 0), -_rarity(gram), position, gram)
+                if best is None or rank < best[0]:
+                    best = (rank, field, gram)
+    if best is None:
+        return f"{status}:*"
+    return f"{status}:{best[1]}:{best[2]}"
+
+
+def rekey_saved_searches(batch_size=1000):
+    """依目前的職缺統計重新選擇所有儲存搜尋的反向索引鍵，回傳變更的數量"""
+    cache.delete(_FREQUENCIES_KEY)
+    frequencies = trigram_frequencies()
+    changed = []
+    for search in SavedSearch.objects.only("id", "filters", "match_key").iterator(chunk_size=batch_size):
+        key = match_key(search.filters, frequencies)
+        if key != search.match_key:
+            search.match_key = key
+            changed.append(search)
+    with transaction.atomic():
+        SavedSearch.objects.bulk_update(changed, ["match_key"], batch_size=batch_size)
+    return len(changed)
+
+
+def _field_text(values, field):
+    # filter_jobs 以 icontains 比對的文字；required_skills 比對的是 JSON 陣列字串
+    if field == "required_skills":
+        return json.dumps(values[field] or [])
+    return values[field] or ""
+
+
+def job_keys(values, status):
+    """上架的職缺可能符合的所有反向索引鍵"""
+    keys = set()
+    for prefix in (status, "*"):
+        keys.add(f"{prefix}:*")
+        for field in KEY_FIELDS:
+            keys.update(f"{prefix}:{field}:{gram}" for gram in trigrams(_field_text(values, field)))
+    return keys
+
+
+def percolate(jobs, now=None):
+    """
+    把剛上架的職缺與儲存的搜尋比對並記錄符合的結果，回傳符合的 (搜尋, 職缺) 數量。
+
+    不重新執行每個儲存的搜尋：先以職缺的反向索引鍵找出候選搜尋，只對候選搜尋以
+    facets.matches()（與 filter_jobs 相同的條件）驗證。
+    """
+    now = now or timezone.now()
+    events = []
+    for job in jobs:
+        values = facets.job_values(job)
+        status = facets.job_status(values, now)
+        if status in NOTIFY_STATUSES:
+            events.append((job.id, values, status, job_keys(values, status)))
+    if not events:
+        return 0
+
+    keys = sorted(set().union(*(event[3] for event in events)))
+    candidates = {}
+    for start in range(0, len(keys), _CHUNK_SIZE):
+        searches = SavedSearch.objects.filter(match_key__in=keys[start:start + _CHUNK_SIZE])
+        for search_id, key, filters in searches.values_list("id", "match_key", "filters"):
+            candidates.setdefault(key, []).append((search_id, filters))
+
+    matches = []
+    for job_id, values, status, keys in events:
+        for key in keys.intersection(candidates):
+            for search_id, filters in candidates[key]:
+                if facets.matches(values, filters, now):
+                    matches.append((search_id, job_id))
+    _record(matches, now)
+    logger.debug(f"{len(events)} 筆上架職缺比對 {sum(len(searches) for searches in candidates.values())} 個候選搜尋，"
+                 f"{len(matches)} 筆符合")
+    return len(matches)
+
+
+def _record(matches, now):
+    """
+    以 executemany 寫入符合的結果，熱門職缺可能一次符合數千個搜尋，略過逐筆建立 ORM 物件的成本。
+    同一職缺再次上架（例如修改狀態）時，已記錄過的比對由唯一限制略過。
+    """
+    if not matches:
+        return
+    table = connection.ops.quote_name(SavedSearchMatch._meta.db_table)
+    matched_at = SavedSearchMatch._meta.get_field("matched_at").get_db_prep_save(now, connection)
+    sql = (f"INSERT INTO {table} (search_id, job_id, matched_at) VALUES (%s, %s, %s) "
+           f"ON CONFLICT (search_id, job_id) DO NOTHING")
+    with connection.cursor() as cursor:
+        for start in range(0, len(matches), _CHUNK_SIZE):
+            cursor.executemany(sql, [(*match, matched_at) for match in matches[start:start + _CHUNK_SIZE]])
+
+
+def percolate_ids(job_ids, now=None):
+    """依 id 分批載入職缺後比對，用於批次更新狀態（例如排程職缺轉為上架）之後"""
+    job_ids = list(job_ids)
+    total = 0
+    for start in range(0, len(job_ids), _CHUNK_SIZE):
+        jobs = Job.objects.only(*facets.VALUE_FIELDS).in_bulk_by_shard(job_ids[start:start + _CHUNK_SIZE])
+        total += percolate(jobs.values(), now=now)
+    return total
@@ -0,0 +1,91 @@
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max, Min
+
+from . import changes, sharding
+from .signals import jobs_bulk_changed
+
+
+def purge_expired(model, cutoff, batch_size=500, pause=0.0, on_batch=None):
+    """
+    依 id 範圍分批刪除到期日早於 cutoff 的資料列，每批一個短交易，批次之間暫停 pause 秒，
+    讓其他寫入有機會取得 SQLite 的寫入鎖，也避免單一交易讓 WAL 大幅成長。
+
+    on_batch(deleted, total, next_id, max_id) 用於回報進度，回傳刪除的總筆數。分片時依序處理每個分片，
+    total 為所有分片累計的筆數。
+    """
+    total = 0
+    for alias in sharding.databases():
+        total = _purge_from(model, alias, cutoff, batch_size, pause, on_batch, total)
+    if total:
+        jobs_bulk_changed.send(sender=model)
+    return total
+
+
+def _purge_from(model, alias, cutoff, batch_size, pause, on_batch, total):
+    expired = model._base_manager.using(alias).filter(expiration_date__lt=cutoff)
+    bounds = expired.aggregate(min_id=Min("id"), max_id=Max("id"))
+    if bounds["min_id"] is None:
+        return total
+
+    start = bounds["min_id"]
+    while start <= bounds["max_id"]:
+        end = start + batch_size
+        # 不經過 Collector 逐筆載入與送出 post_delete signal，直接執行 DELETE；刪除紀錄（default）在同一個交易中寫入
+        with sharding.atomic(alias):
+            ids = list(expired.filter(id__gte=start, id__lt=end).values_list("id", flat=True))
+            deleted = model._base_manager.using(alias).filter(id__in=ids)._raw_delete(alias) if ids else 0
+            changes.record(changes.DELETE, ids)
+        total += deleted
+        checkpoint_wal(using=alias)
+        if on_batch:
+            on_batch(deleted, total, end, bounds["max_id"])
+        start = end
+        if deleted and pause and start <= bounds["max_id"]:
+            time.sleep(pause)
+    return total
+
+
+def checkpoint_wal(mode="PASSIVE", using=DEFAULT_DB_ALIAS):
+    # WAL 模式下把已提交的頁寫回主檔，避免 -wal 檔持續成長；其他模式不需處理
+    connection = connections[using]
+    if connection.vendor != "sqlite" or sqlite_pragma("journal_mode", using) != "wal":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA wal_checkpoint({mode})")
+
+
+def sqlite_pragma(name, using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+def database_size(using=DEFAULT_DB_ALIAS):
+    """SQLite 資料庫檔案大小與可回收的空閒空間（bytes）"""
+    page_size = sqlite_pragma("page_size", using)
+    return sqlite_pragma("page_count", using) * page_size, sqlite_pragma("freelist_count", using) * page_size
+
+
+# PRAGMA auto_vacuum 的值
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def vacuum(mode, using=DEFAULT_DB_ALIAS):
+    """
+    回收刪除後的空間讓檔案實際縮小。mode 為 "full"（VACUUM 重建整個檔案）或
+    "incremental"（只釋放空閒頁；資料庫尚未啟用 auto_vacuum=INCREMENTAL 時，
+    會先設定並執行一次 VACUUM 才能生效）。回傳實際執行的動作說明。
+    """
+    with connections[using].cursor() as cursor:
+        if mode == "incremental":
+            if sqlite_pragma("auto_vacuum", using) == AUTO_VACUUM_INCREMENTAL:
+                cursor.execute("PRAGMA incremental_vacuum")
+                cursor.fetchall()  # 每釋放一頁回傳一列，需讀完才會執行完畢
+                return "PRAGMA incremental_vacuum"
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cursor.execute("VACUUM")
+            return "PRAGMA auto_vacuum = INCREMENTAL + VACUUM"
+        cursor.execute("VACUUM")
+        return "VACUUM"
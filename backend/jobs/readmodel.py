@@ -0,0 +1,340 @@
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .events import latest_cursor
+from .models import Job, JobChange
+
+logger = logging.getLogger(__name__)
+
+# 以相異值表保存的文字欄位（職缺只存 int32 編號），以及 required_skills 以 tuple 為值
+TEXT_FIELDS = ("title", "company_name", "location", "salary_range", "salary_currency", "required_skills")
+# 讀取模型可以輸出的欄位（?fields= 超出這些欄位時改查資料庫）
+READ_MODEL_FIELDS = frozenset((
+    "id", "title", "company_name", "location", "salary_range", "salary_min", "salary_max", "salary_currency",
+    "posting_date", "expiration_date", "required_skills", "is_active", "is_scheduled", "status",
+))
+# 可排序的欄位；同一時間的職缺依 id 排序，與 list_jobs 的資料庫查詢相同
+SORT_FIELDS = ("posting_date", "expiration_date")
+
+_COLUMNS = ("id", "posting_date", "expiration_date", "salary_min", "salary_max", *TEXT_FIELDS)
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_CHUNK_SIZE = 5000
+_ID_CHUNK_SIZE = 500
+
+
+def _micros(value):
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _datetime(micros):
+    return _EPOCH + timedelta(microseconds=int(micros))
+
+
+class ValueTable:
+    """欄位的相異值：每個值只保存一次，另存小寫的比對文字；篩選時只比對相異值，再以編號向量運算選出職缺"""
+
+    __slots__ = ("values", "codes", "texts")
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+        self.texts = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            # required_skills 與 filter_jobs 相同，比對的是 JSON 陣列字串
+            text = json.dumps(list(value)) if isinstance(value, tuple) else value
+            self.texts.append(sys.intern(text.lower()))
+        return code
+
+    def containing(self, search):
+        search = search.lower()
+        return np.array([code for code, text in enumerate(self.texts) if search in text], dtype=np.int32)
+
+    def nbytes(self):
+        return sum(sys.getsizeof(value) for value in self.values) + sum(sys.getsizeof(text) for text in self.texts)
+
+
+class ActiveJobs:
+    """
+    上架中職缺的欄位陣列。每列一筆職缺：id、日期（UTC 微秒）、薪資（float64，NULL 為 NaN），
+    文字欄位為 ValueTable 的 int32 編號。orders 為依 (排序欄位, id) 排序的列號，查詢時不需要再排序；
+    orders["id"] 依 id 排序，以二分搜尋從職缺 id 找到列號，不另外保存 id 對照表。
+
+    寫入過的列不再修改：更新是移除舊列（alive 設為 False）再新增一列，查詢取得的列號在輸出前
+    不會被其他執行緒改成別的職缺。移除的列在重新載入時回收。
+    """
+
+    def __init__(self, capacity):
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.posting = np.zeros(capacity, dtype=np.int64)
+        self.expiration = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.salary_min = np.full(capacity, np.nan)
+        self.salary_max = np.full(capacity, np.nan)
+        self.codes = {field: np.zeros(capacity, dtype=np.int32) for field in TEXT_FIELDS}
+        self.tables = {field: ValueTable() for field in TEXT_FIELDS}
+        self.orders = {field: np.zeros(0, dtype=np.int32) for field in ("id", *SORT_FIELDS)}
+        self.size = 0
+
+    def __len__(self):
+        return len(self.orders["id"])
+
+    def _sort_keys(self, field):
+        return {"id": self.ids, "posting_date": self.posting, "expiration_date": self.expiration}[field]
+
+    def rows_for(self, job_ids):
+        """職缺 id 目前所在的列號，不在讀取模型中的 id 略過"""
+        order = self.orders["id"]
+        if not len(order):
+            return order
+        job_ids = np.asarray(job_ids, dtype=np.int64)
+        sorted_ids = self.ids[order]
+        positions = np.minimum(np.searchsorted(sorted_ids, job_ids), len(order) - 1)
+        return order[positions[sorted_ids[positions] == job_ids]]
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        for name, fill in (("ids", -1), ("posting", 0), ("expiration", 0), ("alive", False),
+                           ("salary_min", np.nan), ("salary_max", np.nan)):
+            values = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=values.dtype)
+            grown[:len(values)] = values
+            setattr(self, name, grown)
+        for field, values in self.codes.items():
+            grown = np.zeros(capacity, dtype=np.int32)
+            grown[:len(values)] = values
+            self.codes[field] = grown
+
+    def _set_row(self, row, job):
+        job_id, posting_date, expiration_date, salary_min, salary_max, *texts = job
+        self.ids[row] = job_id
+        self.alive[row] = True
+        self.posting[row] = _micros(posting_date)
+        self.expiration[row] = _micros(expiration_date)
+        self.salary_min[row] = np.nan if salary_min is None else salary_min
+        self.salary_max[row] = np.nan if salary_max is None else salary_max
+        for field, value in zip(TEXT_FIELDS, texts):
+            self.codes[field][row] = self.tables[field].code(tuple(value) if field == "required_skills" else value)
+
+    def apply(self, removed, jobs):
+        """
+        移除 removed 中的職缺 id，再寫入 jobs（依 _COLUMNS 順序的 tuple）。排序只在變動的列上調整：
+        一次移除所有舊位置，新列排序後以 searchsorted 找到插入位置，不重新排序整個陣列。
+        """
+        rows = self.rows_for(removed) if len(removed) else ()
+        if len(rows):
+            self.alive[rows] = False
+            for field, order in self.orders.items():
+                self.orders[field] = order[self.alive[order]]
+
+        if not jobs:
+            return
+        while self.size + len(jobs) > len(self.ids):
+            self._grow()
+        added = np.arange(self.size, self.size + len(jobs), dtype=np.int32)
+        for row, job in zip(added.tolist(), jobs):
+            self._set_row(row, job)
+        self.size += len(jobs)
+        for field, order in self.orders.items():
+            keys = self._sort_keys(field)
+            added = added[np.lexsort((self.ids[added], keys[added]))]
+            sorted_keys = keys[order]
+            positions = np.searchsorted(sorted_keys, keys[added], side="left")
+            ends = np.searchsorted(sorted_keys, keys[added], side="right")
+            # 排序欄位相同的職缺依 id 排序：只在相同值的範圍內再比較 id
+            for index in np.flatnonzero(ends > positions):
+                start, end = positions[index], ends[index]
+                positions[index] = start + np.searchsorted(self.ids[order[start:end]], self.ids[added[index]])
+            self.orders[field] = np.insert(order, positions, added)
+
+    @classmethod
+    def build(cls, jobs, capacity):
+        index = cls(max(capacity, 1))
+        index.apply((), list(jobs))
+        return index
+
+    def select(self, filters, now):
+        """符合篩選條件的列（布林遮罩），條件與 filter_jobs 的 status=active 查詢相同"""
+        size = self.size
+        timestamp = _micros(now)
+        mask = self.alive[:size] & (self.posting[:size] <= timestamp) & (self.expiration[:size] > timestamp)
+        for field in ("title", "company_name", "location", "salary_range"):
+            if filters.get(field):
+                mask &= np.isin(self.codes[field][:size], self.tables[field].containing(filters[field]))
+        if filters.get("required_skills"):
+            for skill in filters["required_skills"].split(","):
+                if skill.strip():
+                    mask &= np.isin(self.codes["required_skills"][:size], self.tables["required_skills"].containing(skill.strip()))
+        if filters.get("salary_min_gte") is not None:
+            mask &= self.salary_min[:size] >= filters["salary_min_gte"]
+        if filters.get("salary_max_lte") is not None:
+            mask &= self.salary_max[:size] <= filters["salary_max_lte"]
+        if filters.get("salary_currency"):
+            code = self.tables["salary_currency"].codes.get(filters["salary_currency"].upper())
+            mask &= self.codes["salary_currency"][:size] == (-1 if code is None else code)
+        return mask
+
+    def ordered(self, mask, field, descending):
+        order = self.orders[field]
+        rows = order[mask[order]]
+        return rows[::-1] if descending else rows
+
+    def job(self, row):
+        tables = self.tables
+        salary_min, salary_max = self.salary_min[row], self.salary_max[row]
+        return Job(
+            id=int(self.ids[row]),
+            posting_date=_datetime(self.posting[row]),
+            expiration_date=_datetime(self.expiration[row]),
+            salary_min=None if np.isnan(salary_min) else int(salary_min),
+            salary_max=None if np.isnan(salary_max) else int(salary_max),
+            is_active=True,
+            is_scheduled=False,
+            **{field: tables[field].values[self.codes[field][row]] for field in TEXT_FIELDS if field != "required_skills"},
+            required_skills=list(tables["required_skills"].values[self.codes["required_skills"][row]]),
+        )
+
+    def nbytes(self):
+        """欄位陣列、排序與相異值表佔用的記憶體"""
+        arrays = [self.ids, self.posting, self.expiration, self.alive, self.salary_min, self.salary_max,
+                  *self.codes.values(), *self.orders.values()]
+        return sum(array.nbytes for array in arrays) + sum(table.nbytes() for table in self.tables.values())
+
+
+class ReadModelResult:
+    """list_jobs 分頁使用的結果：count() 為符合的筆數，切片時才把該頁的列轉成 Job"""
+
+    def __init__(self, index, rows):
+        self.index = index
+        self.rows = rows
+
+    def count(self):
+        return len(self.rows)
+
+    __len__ = count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.index.job(row) for row in self.rows[key]]
+        return self.index.job(self.rows[key])
+
+
+class ActiveJobsReadModel:
+    """
+    list_jobs 查詢上架中職缺（status=active）時使用的記憶體內讀取模型，每個行程一份，
+    JOBS_READ_MODEL 啟用時在 JobsConfig.ready() 於背景執行緒載入，載入完成前查詢資料庫。
+
+    每次查詢前以游標讀取之後的 JobChange（一個主鍵範圍查詢，通常沒有資料），重新讀取變更的職缺，
+    本行程與其他行程（update_job_status 排程等）的寫入都會反映在下一次查詢。落後超過
+    JOBS_READ_MODEL_MAX_LAG 筆時在背景重新載入，期間改查資料庫。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.cursor = None
+        self.loaded_at = None
+        self.loading = False
+
+    def load(self):
+        start_time = time.perf_counter()
+        now = timezone.now()
+        # 先取得游標再讀取職缺，讀取期間的寫入會在下一次查詢時重新套用
+        cursor = latest_cursor()
+        jobs = Job.objects.filter(is_active=True, is_scheduled=False, expiration_date__gt=now).order_by()
+        index = ActiveJobs.build(jobs.values_list(*_COLUMNS).iterator(chunk_size=_CHUNK_SIZE), jobs.count())
+        with self.lock:
+            self.index = index
+            self.cursor = cursor
+            self.loaded_at = time.monotonic()
+        logger.info(f"載入上架職缺讀取模型：{len(index)} 筆職缺，{index.nbytes() / 1024 / 1024:.1f} MB，"
+                    f"耗時 {time.perf_counter() - start_time:.3f} 秒")
+        return index
+
+    def load_in_background(self):
+        with self.lock:
+            if self.loading:
+                return
+            self.loading = True
+
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"載入上架職缺讀取模型時發生錯誤: {str(e)}")
+            finally:
+                connections.close_all()
+                with self.lock:
+                    self.loading = False
+
+        threading.Thread(target=run, name="active-jobs", daemon=True).start()
+
+    def _catch_up(self, now):
+        # 套用游標之後的變更；落後太多時回傳 False，改在背景重新載入
+        max_lag = getattr(settings, "JOBS_READ_MODEL_MAX_LAG", 5000)
+        entries = list(
+            JobChange.objects.filter(id__gt=self.cursor).order_by("id").values_list("id", "job_id")[:max_lag + 1]
+        )
+        if not entries:
+            return True
+        if len(entries) > max_lag:
+            return False
+        job_ids = sorted({job_id for _, job_id in entries})
+        jobs = []
+        for start in range(0, len(job_ids), _ID_CHUNK_SIZE):
+            jobs += Job.objects.filter(
+                id__in=job_ids[start:start + _ID_CHUNK_SIZE], is_active=True, is_scheduled=False,
+                expiration_date__gt=now,
+            ).values_list(*_COLUMNS)
+        self.index.apply(job_ids, jobs)
+        self.cursor = entries[-1][0]
+        return True
+
+    def query(self, filters, order_by, now):
+        """
+        以讀取模型回答 list_jobs，回傳 ReadModelResult；條件超出讀取模型能力（非 status=active、
+        description / q / fuzzy、尚未載入或落後太多）時回傳 None，由呼叫端查詢資料庫。
+        """
+        if (filters.get("status") or "").lower() != "active" or filters.get("description") \
+                or filters.get("q") or filters.get("fuzzy"):
+            return None
+        # 與 list_jobs 相同：不支援的 order_by 使用預設排序（發布日期新到舊）
+        field, descending = "posting_date", True
+        if order_by in [f"{prefix}{name}" for name in SORT_FIELDS for prefix in ("", "-")]:
+            field, descending = order_by.lstrip("-"), order_by.startswith("-")
+
+        with self.lock:
+            if self.index is None:
+                return None
+            index = self.index
+            caught_up = self._catch_up(now)
+            if caught_up:
+                rows = index.ordered(index.select(filters, now), field, descending)
+        # 落後太多，或更新留下的舊列超過使用中的列時重新載入
+        if not caught_up or index.size > 2 * len(index) + _CHUNK_SIZE:
+            self.load_in_background()
+        return ReadModelResult(index, rows) if caught_up else None
+
+    def clear(self):
+        with self.lock:
+            self.index = None
+            self.cursor = None
+            self.loaded_at = None
+
+
+# 每個行程共用一份讀取模型
+active_jobs = ActiveJobsReadModel()
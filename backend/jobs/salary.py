@@ -0,0 +1,59 @@
+import re
+
+# 金額數字與單位，例如 100k、$50,000、1.2M、4萬
+_AMOUNT_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kKmM萬]?)")
+_MULTIPLIERS = {"": 1, "k": 1_000, "K": 1_000, "m": 1_000_000, "M": 1_000_000, "萬": 10_000}
+
+# 依序比對，先比對較長的代碼與符號（例如 NT$ 要在 $ 之前）
+_CURRENCIES = [
+    (re.compile(r"\b(USD|EUR|GBP|JPY|TWD|NTD|HKD|SGD|CAD|AUD|CNY|RMB)\b", re.IGNORECASE), None),
+    (re.compile(r"NT\$|新台幣|台幣"), "TWD"),
+    (re.compile(r"HK\$"), "HKD"),
+    (re.compile(r"S\$"), "SGD"),
+    (re.compile(r"€"), "EUR"),
+    (re.compile(r"£"), "GBP"),
+    (re.compile(r"[¥￥]"), "JPY"),
+    (re.compile(r"\$"), "USD"),
+]
+_CURRENCY_ALIASES = {"NTD": "TWD", "RMB": "CNY"}
+
+# 月薪換算為年薪，讓不同寫法的薪資可以比較
+_MONTHLY_RE = re.compile(r"/\s*(month|mo|月)|per\s+month|monthly|月薪", re.IGNORECASE)
+
+
+def parse_currency(text):
+    for pattern, currency in _CURRENCIES:
+        match = pattern.search(text)
+        if match:
+            code = currency or match.group(1).upper()
+            return _CURRENCY_ALIASES.get(code, code)
+    return ""
+
+
+def parse_salary_range(text):
+    """
+    把自由格式的薪資字串（例如 "100k-150k USD"、"$50,000 - $70,000 / year"、"NT$40,000-60,000/月"）
+    解析為 (salary_min, salary_max, salary_currency)。金額為年薪整數，無法解析時為 None。
+    """
+    if not text:
+        return None, None, ""
+    amounts = []
+    for number, unit in _AMOUNT_RE.findall(text)[:2]:
+        try:
+            amounts.append((float(number.replace(",", "")), unit))
+        except ValueError:
+            return None, None, ""
+    # 沒有單位也沒有貨幣的小數字（例如 "3 years"）不是薪資
+    currency = parse_currency(text)
+    if not amounts or (not currency and not any(unit for _, unit in amounts) and max(value for value, _ in amounts) < 1000):
+        return None, None, ""
+
+    # "100-150k" 這類寫法單位只出現在後面，套用到前一個數字
+    if len(amounts) == 2 and not amounts[0][1] and amounts[1][1] and amounts[0][0] <= amounts[1][0]:
+        amounts[0] = (amounts[0][0], amounts[1][1])
+    values = [value * _MULTIPLIERS[unit] for value, unit in amounts]
+    if _MONTHLY_RE.search(text):
+        values = [value * 12 for value in values]
+
+    low, high = min(values), max(values)
+    return int(low), int(high), currency
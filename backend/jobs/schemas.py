@@ -1,5 +1,7 @@
 from ninja import Schema, ModelSchema
-from typing import List, Optional, Any
+from pydantic import Discriminator, RootModel, Tag, model_serializer
+from typing import Dict, List, Optional, Any, Union
+from typing_extensions import Annotated
 from datetime import datetime
 from .models import Job
 
@@ -9,6 +11,9 @@ class JobSchema(Schema):
     description: str
     location: str
     salary_range: str
+    salary_min: Optional[int] = None
+    salary_max: Optional[int] = None
+    salary_currency: str = ""
     company_name: str
     posting_date: datetime
     expiration_date: datetime
@@ -16,6 +21,7 @@ class JobSchema(Schema):
     is_active: bool
     is_scheduled: bool
     status: str
+    version: int
 
 class JobCreateSchema(Schema):
     title: str
@@ -49,6 +55,13 @@ class JobUpdateSchema(Schema):
     is_scheduled: Optional[bool] = None
     posting_date: Optional[datetime] = None
 
+class JobPatchSchema(JobUpdateSchema):
+    version: int  # 客戶端讀到的版本號，與資料庫不一致時回傳 409
+
+class JobConflictSchema(Schema):
+    message: str
+    version: int  # 目前資料庫中的版本號
+
 class JobListSchema(Schema):
     id: int
     title: str
@@ -59,6 +72,59 @@ class JobListSchema(Schema):
     status: str
     required_skills: List[str]
 
+class SimilarJobSchema(JobListSchema):
+    similarity: float  # 與指定職缺的餘弦相似度（0 到 1）
+
+# ?fields= 可選擇的欄位
+JOB_FIELDS = tuple(JobSchema.model_fields)
+
+# Job.status 是由這些欄位計算出來的 property
+STATUS_DEPENDENCIES = ("posting_date", "expiration_date", "is_active", "is_scheduled")
+
+class JobFieldsSchema(Schema):
+    """?fields= 的部分欄位輸出，只序列化實際提供的欄位"""
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    salary_range: Optional[str] = None
+    salary_min: Optional[int] = None
+    salary_max: Optional[int] = None
+    salary_currency: Optional[str] = None
+    company_name: Optional[str] = None
+    posting_date: Optional[datetime] = None
+    expiration_date: Optional[datetime] = None
+    required_skills: Optional[List[str]] = None
+    is_active: Optional[bool] = None
+    is_scheduled: Optional[bool] = None
+    status: Optional[str] = None
+    version: Optional[int] = None
+
+    @model_serializer(mode="wrap")
+    def _only_selected_fields(self, handler):
+        data = handler(self)
+        return {name: value for name, value in data.items() if name in self.model_fields_set}
+
+def _job_output_kind(value):
+    # API 以 dict 回傳部分欄位，以 Job 物件回傳完整輸出
+    return "fields" if isinstance(value, (dict, JobFieldsSchema)) else "full"
+
+class JobListItemSchema(RootModel[Annotated[
+    Union[Annotated[JobListSchema, Tag("full")], Annotated[JobFieldsSchema, Tag("fields")]],
+    Discriminator(_job_output_kind),
+]]):
+    """列表項目：預設為 JobListSchema，指定 fields 時為 JobFieldsSchema"""
+
+class JobDetailSchema(RootModel[Annotated[
+    Union[Annotated[JobSchema, Tag("full")], Annotated[JobFieldsSchema, Tag("fields")]],
+    Discriminator(_job_output_kind),
+]]):
+    """職缺詳情：預設為 JobSchema，指定 fields 時為 JobFieldsSchema"""
+
+class JobBatchSchema(Schema):
+    items: List[JobDetailSchema]
+    missing: List[int]
+
 class JobFilterSchema(Schema):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -67,6 +133,57 @@ class JobFilterSchema(Schema):
     salary_range: Optional[str] = None
     required_skills: Optional[str] = None # 假設技能是以逗號分隔的字串傳入
     status: Optional[str] = None # "Active", "Expired", "Scheduled"
+    salary_min_gte: Optional[int] = None
+    salary_max_lte: Optional[int] = None
+    salary_currency: Optional[str] = None
+    fuzzy: bool = False  # title / company_name / location 也包含拼字相近的值
+    q: Optional[str] = None  # 關鍵字查詢（全文索引）
+
+class FacetValueSchema(Schema):
+    value: str
+    count: int
+
+class JobFacetsSchema(Schema):
+    count: int
+    status: Dict[str, int]  # active / expired / scheduled / inactive
+    location: List[FacetValueSchema]
+    company_name: List[FacetValueSchema]
+    required_skills: List[FacetValueSchema]
+
+class QueryDeadlinesSchema(Schema):
+    budgets: Dict[str, Optional[float]]  # 各操作的查詢時間預算（秒），staff 使用 staff_budgets
+    staff_budgets: Dict[str, Optional[float]]
+    exceeded: Dict[str, int]  # 超過預算而回傳 503 的次數
+
+class SavedSearchCreateSchema(JobFilterSchema):
+    name: str
+
+class SavedSearchSchema(Schema):
+    id: int
+    name: str
+    filters: Dict[str, Any]
+    created_at: datetime
+
+class SavedSearchMatchSchema(Schema):
+    job_id: int
+    matched_at: datetime
+    delivered_at: Optional[datetime] = None  # 尚未通知時為 null
+
+class DuplicateJobSchema(Schema):
+    message: str
+    duplicate_of: int  # 同公司中內容相似的既有職缺 id
+
+class JobChangeSchema(Schema):
+    cursor: int
+    operation: str  # "upsert" 或 "delete"
+    job_id: int
+    changed_at: datetime
+    job: Optional[JobSchema] = None  # upsert 時為職缺目前的內容，delete 時為 null
+
+class JobChangesSchema(Schema):
+    items: List[JobChangeSchema]
+    next_cursor: int  # 下一次請求的 since
+    has_more: bool
 
 class OrderSchema(Schema):
     order_by: Optional[str] = None # "posting_date", "-posting_date", "expiration_date", "-expiration_date"
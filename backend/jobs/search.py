@@ -0,0 +1,60 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+
+# 全文索引的欄位，順序與 migration 0006 建立的 FTS5 欄位相同
+SEARCH_COLUMNS = ("title", "description", "required_skills")
+DEFAULT_WEIGHTS = {"title": 3.0, "description": 1.0, "required_skills": 2.0}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def keywords(query):
+    """把關鍵字查詢拆成單字，忽略標點與 FTS5 的查詢語法"""
+    return _TOKEN_RE.findall(query or "")
+
+
+def index_table(model):
+    return f"{model._meta.db_table}_search"
+
+
+def supports_full_text():
+    return connection.vendor == "sqlite"
+
+
+def _weights():
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, "JOBS_SEARCH_WEIGHTS", {})}
+    return [float(weights[column]) for column in SEARCH_COLUMNS]
+
+
+def keyword_search(queryset, query):
+    """
+    只保留包含 query 所有單字的職缺（title、description、required_skills），並加上 search_rank 欄位：
+    FTS5 依索引中的詞頻、文件長度與平均長度計算的 BM25 分數（越大越相關）。
+    """
+    terms = keywords(query)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+    if not supports_full_text():
+        # 沒有全文索引時以 icontains 篩選，不計算相關性
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(description__icontains=term) | Q(required_skills__icontains=term)
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    model = queryset.model
+    index = index_table(model)
+    quoted_index = connection.ops.quote_name(index)
+    table = connection.ops.quote_name(model._meta.db_table)
+    match = " ".join('"%s"' % term for term in terms)
+    weights = ", ".join(str(weight) for weight in _weights())
+    # ORM 無法 JOIN 虛擬資料表，以 extra() 把 FTS5 索引加入 FROM。整個查詢只開啟一次 FTS5 游標，
+    # 詞的文件頻率只計算一次，SQLite 只對符合的文件計分並以 LIMIT 保留前 k 筆
+    return queryset.extra(
+        select={"search_rank": f"-bm25({quoted_index}, {weights})"},
+        tables=[index],
+        where=[f"{quoted_index}.rowid = {table}.id", f"{quoted_index} MATCH %s"],
+        params=[match],
+    )
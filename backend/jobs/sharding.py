@@ -0,0 +1,191 @@
+import heapq
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from . import deadlines
+
+# 職缺 id 的高位元為分片編號、低 SHARD_BITS 位元為分片內的流水號；第 0 個分片（default）的 id 與不分片時相同。
+# 最多 32 個分片時 id 仍小於 2 ** 53，JavaScript 的 Number 可以精確表示
+SHARD_BITS = 48
+MAX_SHARDS = 32
+# 依公司名稱分片的 model；其他資料表（使用者、變更紀錄、搜尋索引等）都在 default
+SHARDED_MODELS = {"jobs.job", "jobs.archivedjob"}
+
+_executor = None
+
+
+def databases():
+    """存放職缺的資料庫 alias，依分片編號排列；未設定 JOBS_SHARD_DATABASES 時只有 default"""
+    shards = list(getattr(settings, "JOBS_SHARD_DATABASES", None) or [DEFAULT_DB_ALIAS])
+    if len(shards) > MAX_SHARDS:
+        raise ImproperlyConfigured(f"JOBS_SHARD_DATABASES supports at most {MAX_SHARDS} databases")
+    return shards
+
+
+def is_sharded():
+    return len(databases()) > 1
+
+
+def shard_for_company(company_name):
+    """新職缺寫入的分片：以公司名稱（不分大小寫）的 CRC32 決定，與行程無關"""
+    shards = databases()
+    return shards[zlib.crc32((company_name or "").strip().lower().encode()) % len(shards)]
+
+
+def shard_for_id(job_id):
+    """id 所在的分片；超出設定範圍的 id 查詢 default（找不到時回傳 404）"""
+    shards = databases()
+    index = int(job_id) >> SHARD_BITS
+    return shards[index] if 0 <= index < len(shards) else DEFAULT_DB_ALIAS
+
+
+def group_by_shard(job_ids):
+    """把 id 依所在的分片分組：{alias: [id, ...]}，保留原本的順序"""
+    groups = {}
+    for job_id in job_ids:
+        groups.setdefault(shard_for_id(job_id), []).append(job_id)
+    return groups
+
+
+@contextmanager
+def atomic(using):
+    """
+    在 using 分片上批次修改職缺、並在 default 寫入變更紀錄的交易，default 先於分片提交。只用於 default 端以寫入開始的
+    批次（例如狀態更新）：SQLite 的交易先讀取再寫入時，並行的寫入會讓鎖無法升級而立即失敗，所以逐筆寫入時
+    post_save 對 default 的寫入不包在這裡，各自提交。兩個資料庫無法原子提交，分片提交失敗時 default 可能留下
+    多餘的變更紀錄（讀取時回傳職缺目前的內容）。
+    """
+    with transaction.atomic(using=using):
+        if using == DEFAULT_DB_ALIAS:
+            yield
+        else:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                yield
+
+
+def scatter(function, aliases=None):
+    """
+    在每個分片上執行 function(alias)，依分片順序回傳結果。多個分片時以執行緒平行查詢，
+    並套用呼叫端目前的查詢期限（deadlines.query_deadline），逾時的例外在呼叫端拋出。
+    """
+    aliases = list(aliases or databases())
+    if len(aliases) == 1:
+        return [function(aliases[0])]
+    deadline = deadlines.current_deadline()
+
+    def run(alias):
+        # 執行緒池中的連線保留給之後的查詢重複使用
+        with deadlines.apply_deadline(deadline, alias):
+            return function(alias)
+
+    return list(_pool().map(run, aliases))
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_SHARDS, thread_name_prefix="jobs-shard")
+    return _executor
+
+
+class _Descending:
+    """排序鍵中遞減的欄位：反轉比較的方向"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+class ShardedQuerySet:
+    """
+    在所有分片上執行同一個有排序的 queryset 並合併結果（scatter-gather）。分頁切片 [start:stop] 時每個分片
+    平行取前 stop 筆，依 queryset 的排序欄位合併後取 [start:stop]；count() 為各分片數量的總和。
+    排序欄位最後應為 id 讓順序固定，且需包含在 SELECT 中（包含 annotate 的欄位）。
+    """
+
+    def __init__(self, queryset, aliases=None):
+        self.queryset = queryset
+        self.aliases = list(aliases or databases())
+        self.ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+
+    def _sort_key(self, job):
+        return tuple(_Descending(getattr(job, name[1:])) if name.startswith("-") else getattr(job, name)
+                     for name in self.ordering)
+
+    def count(self):
+        return sum(scatter(lambda alias: self.queryset.using(alias).count(), self.aliases))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        parts = scatter(lambda alias: list(self.queryset.using(alias)[:stop]), self.aliases)
+        return list(islice(heapq.merge(*parts, key=self._sort_key), start, stop))
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+class JobShardRouter:
+    """
+    Job 與 ArchivedJob 的資料庫路由：已載入的職缺寫回原本的分片，新職缺依公司名稱、其他依 id 決定分片。
+    沒有 instance 的查詢（Job.objects.filter(...)）使用 default，需要時以 JobQuerySet.for_id() / across_shards() 指定。
+    """
+
+    def _shard_for(self, model, instance=None, **hints):
+        if model._meta.label_lower not in SHARDED_MODELS or instance is None or not is_sharded():
+            return None
+        if instance._state.db:
+            return instance._state.db
+        if instance.pk is not None:
+            return shard_for_id(instance.pk)
+        return shard_for_company(instance.company_name)
+
+    db_for_read = _shard_for
+    db_for_write = _shard_for
+
+
+def reserve_id_range(alias):
+    """讓分片的自動遞增 id 從分片的範圍開始（只會往上調整）；分片編號 0 不需處理"""
+    shards = databases()
+    if alias not in shards or shards.index(alias) == 0:
+        return
+    from .models import ArchivedJob, Job
+
+    floor = shards.index(alias) << SHARD_BITS
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for model in (Job, ArchivedJob):
+            table = model._meta.db_table
+            if connection.vendor == "sqlite":
+                cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s", [floor, table, floor])
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s "
+                               "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)", [table, floor, table])
+            elif connection.vendor == "postgresql":
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                               f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)})))",
+                               [table, floor])
+
+
+@receiver(post_migrate)
+def reserve_id_ranges(sender, using, **kwargs):
+    if sender.name == "jobs":
+        reserve_id_range(using)
@@ -0,0 +1,128 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import changes, dedupe, facets, percolator, trigram
+from .compression import decompress
+from .models import ArchivedJob, Job
+from .schemas import STATUS_DEPENDENCIES
+from .similar import similar_index
+from .suggest import suggest_index
+
+# 批次 update() / 原生 SQL 變更職缺後送出（狀態更新、封存、刪除、匯入等），無法逐筆計算差異
+jobs_bulk_changed = Signal()
+# 批次把排程職缺轉為上架後送出，ids 為轉為上架的職缺 id
+jobs_activated = Signal()
+# 單一 UPDATE 部分更新職缺後送出，只知道更新後的職缺 instance 與變更的欄位名稱 changed
+job_patched = Signal()
+
+
+def _loaded_values(instance):
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is None:
+        return None
+    values = {name: loaded[name] for name in facets.VALUE_FIELDS if name in loaded}
+    # 讀取時的 description 欄位是壓縮存放的資料列的空字串
+    if "description" in values and loaded.get("description_compressed") is not None:
+        values["description"] = decompress(loaded["description_compressed"])
+    return values
+
+
+def _index_search_terms(instance, fields):
+    # trigram 索引只會新增值，刪除職缺或改名後留下的舊值由 rebuild_search_index 清除
+    deferred = instance.get_deferred_fields()
+    for field in trigram.SEARCH_FIELDS:
+        if field in fields and field not in deferred:
+            trigram.ensure_terms(field, [getattr(instance, field)])
+
+
+def _percolate_if_posted(instance, old, new):
+    # 新增或狀態轉為上架 / 排程的職缺與儲存的搜尋比對；old 為 None 表示新增，不完整表示不知道原本的狀態
+    if set(facets.VALUE_FIELDS) - set(new):
+        return
+    now = timezone.now()
+    status = facets.job_status(new, now)
+    if status not in percolator.NOTIFY_STATUSES:
+        return
+    if old and not set(STATUS_DEPENDENCIES) - set(old) and facets.job_status(old, now) == status:
+        return
+    percolator.percolate([instance], now=now)
+
+
+def _index_fingerprint(instance, old, new):
+    # 新增或 title / description / 公司 / 到期日變更時重新計算重複刊登的簽章；old 不完整表示不知道原本的值
+    if set(dedupe.DEDUPE_FIELDS) - set(new):
+        return
+    if old is not None and all(field in old and old[field] == new[field] for field in dedupe.DEDUPE_FIELDS):
+        return
+    dedupe.index_jobs([(instance.id, *(new[field] for field in dedupe.DEDUPE_FIELDS))])
+
+
+def _change_event(old, new):
+    # 新增、狀態轉換或其他修改；old 不完整表示不知道原本的狀態，視為一般修改
+    if old is None:
+        return changes.CREATED
+    if not set(STATUS_DEPENDENCIES) - set(old):
+        now = timezone.now()
+        if facets.job_status(old, now) != facets.job_status(new, now):
+            return changes.STATUS
+    return changes.UPDATED
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_save, sender=ArchivedJob)
+def job_saved(sender, instance, created, **kwargs):
+    # 逐筆寫入（API、admin）時增量更新統計快取與前綴索引
+    old = None if created else (_loaded_values(instance) or {})
+    new = facets.job_values(instance)
+    facets.record_change(sender, old=old, new=new)
+    if sender is Job:
+        suggest_index.record_change(old=old, new=new)
+        similar_index.record_change(instance)
+        _percolate_if_posted(instance, old, new)
+        _index_fingerprint(instance, old, new)
+    # 封存的職缺仍可讀取，變更與刪除同樣寫入變更紀錄
+    changes.record(changes.UPSERT, [instance.id], event=_change_event(old, new))
+    _index_search_terms(instance, trigram.SEARCH_FIELDS)
+    instance._loaded_values = new
+
+
+@receiver(post_delete, sender=Job)
+@receiver(post_delete, sender=ArchivedJob)
+def job_deleted(sender, instance, **kwargs):
+    old = _loaded_values(instance) or facets.job_values(instance)
+    facets.record_change(sender, old=old)
+    if sender is Job:
+        suggest_index.record_change(old=old)
+        similar_index.remove(instance.id)
+        dedupe.remove([instance.id])
+    changes.record(changes.DELETE, [instance.id])
+
+
+@receiver(job_patched)
+def job_partially_updated(sender, instance, changed, old=None, **kwargs):
+    # old 為更新前的狀態欄位（只在變更狀態欄位時提供），用來判斷是否為狀態轉換
+    facets.record_change(sender, changed=changed)
+    if sender is Job:
+        suggest_index.record_change(changed=changed)
+        similar_index.record_change(instance)
+    new = facets.job_values(instance)
+    changes.record(changes.UPSERT, [instance.id], event=changes.UPDATED if old is None else _change_event(old, new))
+    _index_search_terms(instance, changed)
+    instance._loaded_values = new
+    if sender is Job and set(STATUS_DEPENDENCIES) & set(changed):
+        _percolate_if_posted(instance, old or {}, instance._loaded_values)
+    if sender is Job and set(dedupe.DEDUPE_FIELDS) & set(changed):
+        _index_fingerprint(instance, {}, instance._loaded_values)
+
+
+@receiver(jobs_activated)
+def jobs_activated_in_bulk(sender, ids, **kwargs):
+    percolator.percolate_ids(ids)
+
+
+@receiver(jobs_bulk_changed)
+def jobs_changed_in_bulk(sender, **kwargs):
+    facets.invalidate()
+    suggest_index.mark_stale()
+    similar_index.mark_stale()
@@ -0,0 +1,369 @@
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from . import sharding
+from .compression import description_text, text_columns
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# 計算向量與判斷是否上架需要的欄位
+VECTOR_FIELDS = ("title", "description", "required_skills", "is_active", "is_scheduled", "posting_date", "expiration_date")
+# 標題與技能的詞比描述中的詞重要
+FIELD_WEIGHTS = {"title": 2.0, "required_skills": 2.0, "description": 1.0}
+
+_TOKEN_RE = re.compile(r"\w+")
+_CHUNK_SIZE = 10000
+
+
+# 詞 -> 維度的快取（依維度數分開），詞彙量通常遠小於上限
+_BUCKET_CACHE = {}
+_BUCKET_CACHE_SIZE = 200_000
+
+
+def _buckets(tokens, dimensions):
+    # 以 hashing trick 把詞對應到固定維度，不需要保存詞彙表；crc32 在各行程間結果相同
+    cache = _BUCKET_CACHE.setdefault(dimensions, {})
+    buckets = list(map(cache.get, tokens))
+    if None in buckets:
+        if len(cache) > _BUCKET_CACHE_SIZE:
+            cache.clear()
+        for position, token in enumerate(tokens):
+            if buckets[position] is None:
+                buckets[position] = cache[token] = zlib.crc32(token.encode()) % dimensions
+    return buckets
+
+
+def weighted_buckets(title, description, skills, dimensions):
+    """
+    職缺每個詞對應的維度與權重（同一維度可重複出現，由 bincount 加總為詞頻）：
+    標題與描述拆成小寫單字，每個技能整個當作一個詞
+    """
+    buckets, weights = [], []
+    for field, tokens in (
+        ("title", _TOKEN_RE.findall(title.lower())),
+        ("description", _TOKEN_RE.findall(description.lower())),
+        ("required_skills", [skill.lower() for skill in skills or []]),
+    ):
+        buckets += _buckets(tokens, dimensions)
+        weights += [FIELD_WEIGHTS[field]] * len(tokens)
+    return buckets, weights
+
+
+class VectorIndex:
+    """
+    上架中與尚未到期職缺的 TF-IDF 向量。matrix 每列是一筆職缺經 L2 正規化的 float32 向量，
+    ids / is_active / posting / expiration 是對應的欄位，用於在查詢時以向量運算判斷是否上架。
+    刪除的列 id 設為 -1 並重複使用。
+    """
+
+    def __init__(self, dimensions, capacity):
+        self.dimensions = dimensions
+        self.matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.is_active = np.zeros(capacity, dtype=bool)
+        self.posting = np.zeros(capacity, dtype=np.float64)
+        self.expiration = np.zeros(capacity, dtype=np.float64)
+        self.idf = np.ones(dimensions, dtype=np.float32)
+        self.rows = {}
+        self.free = []
+        self.size = 0
+
+    @classmethod
+    def build(cls, jobs, dimensions, capacity):
+        """
+        jobs 為依 VECTOR_FIELDS 順序、前面加上 id 的 tuple，每次讀取一段計算詞頻矩陣，
+        全部讀完後再依文件頻率計算 IDF。capacity 為預估筆數，不足時自動擴充。
+        """
+        index = cls(dimensions, max(capacity, 1))
+        jobs = iter(jobs)
+        while chunk := list(itertools.islice(jobs, _CHUNK_SIZE)):
+            start = index.size
+            while start + len(chunk) > len(index.ids):
+                index._grow()
+            rows, buckets, weights = [], [], []
+            for offset, job in enumerate(chunk):
+                job_buckets, job_weights = weighted_buckets(job[1], job[2], job[3], dimensions)
+                rows += [offset] * len(job_buckets)
+                buckets += job_buckets
+                weights += job_weights
+            # 以 bincount 一次把整段的 (列, 維度, 權重) 加總成詞頻矩陣
+            flat = np.asarray(rows, dtype=np.int64) * dimensions + np.asarray(buckets, dtype=np.int64)
+            counts = np.bincount(flat, weights=weights, minlength=len(chunk) * dimensions)
+            index.matrix[start:start + len(chunk)] = np.log1p(counts).reshape(len(chunk), dimensions)
+            for offset, job in enumerate(chunk):
+                index._set_row(start + offset, job)
+            index.size += len(chunk)
+
+        document_frequency = np.count_nonzero(index.matrix[:index.size], axis=0)
+        index.idf = (np.log((1 + index.size) / (1 + document_frequency)) + 1).astype(np.float32)
+        index.matrix[:index.size] *= index.idf
+        index._normalize(slice(0, index.size))
+        return index
+
+    # 每列一個值的陣列，存檔時只保存使用中的部分；rows 與 free 在讀取時由 ids 重建
+    ROW_ARRAYS = ("matrix", "ids", "is_active", "posting", "expiration")
+
+    def save(self, path):
+        """寫入暫存檔後改名，其他行程不會讀到寫到一半的檔案"""
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(file, idf=self.idf, **{name: getattr(self, name)[:self.size] for name in self.ROW_ARRAYS})
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            matrix = data["matrix"]
+            index = cls(matrix.shape[1], max(len(matrix), 1))
+            index.matrix[:len(matrix)] = matrix
+            for name in cls.ROW_ARRAYS[1:]:
+                getattr(index, name)[:len(matrix)] = data[name]
+            index.idf = data["idf"]
+            index.size = len(matrix)
+        for row, job_id in enumerate(index.ids[:index.size].tolist()):
+            if job_id == -1:
+                index.free.append(row)
+            else:
+                index.rows[job_id] = row
+        return index
+
+    def _set_row(self, row, job):
+        job_id, _, _, _, is_active, is_scheduled, posting_date, expiration_date = job
+        self.rows[job_id] = row
+        self.ids[row] = job_id
+        # 與 list_jobs 的 status=active 相同：啟用、非排程，且在發布日與到期日之間
+        self.is_active[row] = is_active and not is_scheduled
+        self.posting[row] = posting_date.timestamp()
+        self.expiration[row] = expiration_date.timestamp()
+
+    def _normalize(self, rows):
+        norms = np.linalg.norm(self.matrix[rows], axis=-1, keepdims=True)
+        np.divide(self.matrix[rows], norms, out=self.matrix[rows], where=norms > 0)
+
+    def vectorize(self, title, description, skills):
+        buckets, weights = weighted_buckets(title, description, skills, self.dimensions)
+        counts = np.bincount(buckets, weights=weights, minlength=self.dimensions) if buckets else np.zeros(self.dimensions)
+        vector = np.log1p(counts).astype(np.float32) * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def upsert(self, job):
+        """新增或更新單筆職缺，沿用建立索引時的 IDF"""
+        row = self.rows.get(job[0])
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                if self.size == len(self.ids):
+                    self._grow()
+                row = self.size
+                self.size += 1
+        self.matrix[row] = self.vectorize(job[1], job[2], job[3])
+        self._set_row(row, job)
+
+    def remove(self, job_id):
+        row = self.rows.pop(job_id, None)
+        if row is not None:
+            self.ids[row] = -1
+            self.is_active[row] = False
+            self.free.append(row)
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        self.matrix = np.resize(self.matrix, (capacity, self.dimensions))
+        self.matrix[self.size:] = 0
+        for name, fill in (("ids", -1), ("is_active", False), ("posting", 0), ("expiration", 0)):
+            values = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=values.dtype)
+            grown[:len(values)] = values
+            setattr(self, name, grown)
+
+    def active_mask(self, now):
+        timestamp = now.timestamp()
+        size = self.size
+        return self.is_active[:size] & (self.posting[:size] <= timestamp) & (self.expiration[:size] > timestamp)
+
+    def top_k(self, vector, k, now, exclude=None):
+        """與 vector 餘弦相似度最高的 k 筆上架中職缺，回傳 [(id, 相似度)]，相似度為 0 的不包含在內"""
+        scores = self.matrix[:self.size] @ vector
+        mask = self.active_mask(now) & (scores > 0)
+        if exclude is not None and exclude in self.rows:
+            mask[self.rows[exclude]] = False
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > k:
+            # argpartition 以 O(n) 找出前 k 名，只對這 k 筆排序
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(self.ids[row]), float(scores[row])) for row in candidates]
+
+
+def _job_tuple(job):
+    # PUT 寫入後日期欄位可能仍是 isoformat 字串，與 facets.job_values() 相同轉為有時區的 datetime
+    values = []
+    for name in VECTOR_FIELDS:
+        value = job._meta.get_field(name).to_python(getattr(job, name))
+        if name in ("posting_date", "expiration_date") and value is not None and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        values.append(value)
+    return (job.id, *values)
+
+
+class SimilarIndex:
+    """
+    GET /api/jobs/{id}/similar 使用的記憶體內向量索引，每個行程一份，第一次查詢時建立。
+
+    本行程內的單筆寫入由 record_change() / remove() 直接更新對應的列；批次寫入、其他行程的寫入
+    （超過 JOBS_SIMILAR_REFRESH_SECONDS）與 IDF 的變化由背景執行緒重建，重建期間繼續使用舊索引。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.built_at = None
+        self.stale = False
+        self.refreshing = False
+        self.building = 0
+        # 建立索引期間本行程的寫入，建立完成後在新索引上重新套用
+        self.pending = []
+
+    def similar(self, job, k):
+        if self.index is None and not self.load():
+            self.build()
+        elif self.stale or time.monotonic() - self.built_at > getattr(settings, "JOBS_SIMILAR_REFRESH_SECONDS", 600):
+            self.refresh_in_background()
+        with self.lock:
+            index = self.index
+            row = index.rows.get(job.id)
+            vector = index.matrix[row] if row is not None else index.vectorize(job.title, job.description, job.required_skills)
+            return index.top_k(vector, k, timezone.now(), exclude=job.id)
+
+    def build(self):
+        start_time = time.perf_counter()
+        with self.lock:
+            self.building += 1
+        path = getattr(settings, "JOBS_SIMILAR_INDEX_PATH", None)
+        try:
+            index = self._compute()
+            if path:
+                # 在套用建立期間的寫入之前存檔，此時 index 還沒有其他執行緒使用
+                index.save(path)
+        except Exception:
+            with self.lock:
+                self.building -= 1
+                if not self.building:
+                    self.pending = []
+            raise
+        with self.lock:
+            self.building -= 1
+            for job_id, job in self.pending:
+                if job is None:
+                    index.remove(job_id)
+                else:
+                    index.upsert(job)
+            if not self.building:
+                self.pending = []
+            self.index = index
+            self.built_at = time.monotonic()
+        logger.info(f"建立相似職缺索引：{index.size} 筆職缺，耗時 {time.perf_counter() - start_time:.3f} 秒")
+
+    def load(self):
+        """
+        讀取 JOBS_SIMILAR_INDEX_PATH 中最近一次建立的索引（由 build_similar_index 或其他行程寫入），
+        讓新行程不必在第一次查詢時重新計算所有向量。檔案不存在或維度不同時回傳 False。
+        """
+        path = getattr(settings, "JOBS_SIMILAR_INDEX_PATH", None)
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            modified_at = os.path.getmtime(path)
+            index = VectorIndex.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"讀取相似職缺索引 {path} 時發生錯誤: {str(e)}")
+            return False
+        if index.dimensions != getattr(settings, "JOBS_SIMILAR_DIMENSIONS", 256):
+            return False
+        with self.lock:
+            self.index = index
+            # 以檔案的建立時間計算多久後需要在背景重建
+            self.built_at = time.monotonic() - max(0.0, time.time() - modified_at)
+        logger.info(f"讀取相似職缺索引：{index.size} 筆職缺")
+        return True
+
+    def _compute(self):
+        dimensions = getattr(settings, "JOBS_SIMILAR_DIMENSIONS", 256)
+        # 已到期的職缺不會再上架（除非被修改，屆時由 record_change 加入）；分片時依序讀取每個分片
+        now = timezone.now()
+        shards = [Job.objects.using(alias).filter(expiration_date__gt=now).order_by() for alias in sharding.databases()]
+        return VectorIndex.build(
+            itertools.chain.from_iterable(
+                jobs.annotate(description_text=description_text())
+                .values_list("id", *text_columns(VECTOR_FIELDS)).iterator(chunk_size=_CHUNK_SIZE)
+                for jobs in shards
+            ),
+            dimensions, sum(jobs.count() for jobs in shards),
+        )
+
+    def refresh_in_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+            self.stale = False
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                logger.error(f"重建相似職缺索引時發生錯誤: {str(e)}")
+            finally:
+                connections.close_all()
+                with self.lock:
+                    self.refreshing = False
+
+        threading.Thread(target=run, name="similar-jobs", daemon=True).start()
+
+    def record_change(self, job):
+        """單筆職缺寫入後更新向量；job 缺少需要的欄位（only() 載入）時改為標記需要重建"""
+        with self.lock:
+            if self.index is None and not self.building:
+                return
+            if set(VECTOR_FIELDS) & job.get_deferred_fields():
+                self.stale = True
+                return
+            values = _job_tuple(job)
+            if self.building:
+                self.pending.append((job.id, values))
+            if self.index is not None and (job.id in self.index.rows or job.expiration_date > timezone.now()):
+                self.index.upsert(values)
+
+    def remove(self, job_id):
+        with self.lock:
+            if self.building:
+                self.pending.append((job_id, None))
+            if self.index is not None:
+                self.index.remove(job_id)
+
+    def mark_stale(self):
+        with self.lock:
+            self.stale = True
+
+    def clear(self):
+        with self.lock:
+            self.index = None
+            self.built_at = None
+            self.stale = False
+
+
+# 每個行程共用一份索引
+similar_index = SimilarIndex()
@@ -0,0 +1,87 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import DateTimeField, Q, Value
+from django.db.models.functions import Least
+
+from . import changes, dedupe, sharding
+from .models import Job
+from .signals import jobs_activated, jobs_bulk_changed
+
+_CHUNK_SIZE = 500
+
+
+def _update_in_chunks(job_ids, now, using=DEFAULT_DB_ALIAS, **values):
+    # 每批一個短交易，與變更紀錄一起提交
+    for start in range(0, len(job_ids), _CHUNK_SIZE):
+        chunk = job_ids[start:start + _CHUNK_SIZE]
+        with sharding.atomic(using):
+            Job.objects.using(using).filter(id__in=chunk).update(**values)
+            changes.record(changes.UPSERT, chunk, now=now, event=changes.STATUS)
+
+
+def update_job_statuses(now):
+    """
+    將已到期的職缺標記為過期、已到發布時間的排程職缺轉為上架，
+    回傳 (過期數, 轉為上架數, 目前上架數)。update_job_status 命令與 API 共用。分片時依序處理每個分片。
+    """
+    expired_ids = []
+    activated_ids = []
+    active_count = 0
+    for using in sharding.databases():
+        jobs = Job.objects.using(using)
+        # 處理已到期但仍標記為上架或排程的職缺；已是過期狀態的職缺不再重複寫入，也不寫入變更紀錄
+        shard_expired = list(
+            jobs.filter(Q(is_active=True) | Q(is_scheduled=True), expiration_date__lt=now)
+            .values_list("id", flat=True)
+        )
+        _update_in_chunks(shard_expired, now, using, is_active=False, is_scheduled=False)
+        expired_ids += shard_expired
+
+        # 處理排程中但已到發布時間的職缺；先取得 id，轉為上架後才能與儲存的搜尋比對
+        shard_activated = list(
+            jobs.filter(is_scheduled=True, posting_date__lte=now, expiration_date__gt=now)
+            .values_list("id", flat=True)
+        )
+        _update_in_chunks(shard_activated, now, using, is_active=True, is_scheduled=False)
+        activated_ids += shard_activated
+
+        # 確保所有活躍的職缺狀態正確
+        active_count += jobs.filter(posting_date__lte=now, expiration_date__gt=now, is_active=True).count()
+    expired_count = len(expired_ids)
+    # 到期的職缺不再參與重複刊登比對
+    dedupe.prune(now)
+
+    if expired_ids or activated_ids:
+        jobs_bulk_changed.send(sender=Job)
+    if activated_ids:
+        jobs_activated.send(sender=Job, ids=activated_ids)
+    return expired_count, len(activated_ids), active_count
+
+
+def activate_jobs(queryset, now):
+    """
+    把 queryset 中尚未到期且未上架的職缺立即上架（排程職缺的發布日期改為 now），回傳上架的數量。
+    後台的批次操作使用，與排程更新相同地分批寫入並與儲存的搜尋比對。
+    """
+    job_ids = list(
+        queryset.filter(expiration_date__gt=now)
+        .exclude(is_active=True, is_scheduled=False, posting_date__lte=now)
+        .order_by("id").values_list("id", flat=True)
+    )
+    _update_in_chunks(job_ids, now, queryset.db, is_active=True, is_scheduled=False,
+                      posting_date=Least("posting_date", Value(now, output_field=DateTimeField())))
+    if job_ids:
+        jobs_bulk_changed.send(sender=Job)
+        jobs_activated.send(sender=Job, ids=job_ids)
+    return len(job_ids)
+
+
+def expire_jobs(queryset, now):
+    """把 queryset 中尚未到期的職缺立即下架（到期日改為 now），回傳下架的數量"""
+    job_ids = list(queryset.filter(expiration_date__gt=now).order_by("id").values_list("id", flat=True))
+    _update_in_chunks(job_ids, now, queryset.db, is_active=False, is_scheduled=False, expiration_date=now,
+                      posting_date=Least("posting_date", Value(now, output_field=DateTimeField())))
+    if job_ids:
+        # 提前到期的職缺不再參與重複刊登比對
+        dedupe.remove(job_ids)
+        jobs_bulk_changed.send(sender=Job)
+    return len(job_ids)
@@ -0,0 +1,183 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.utils import timezone
+
+from . import sharding
+from .facets import job_status, unnest_skills_sql
+from .filters import filter_jobs
+from .models import Job
+from .schemas import STATUS_DEPENDENCIES
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_FIELDS = ("title", "company_name", "location", "required_skills")
+
+# 每個單字的開頭都可以當作前綴，例如輸入 "eng" 可以找到 "Senior Engineer"
+_WORD_START_RE = re.compile(r"\b\w")
+
+
+def index_keys(value):
+    lowered = value.lower()
+    return {lowered[match.start():] for match in _WORD_START_RE.finditer(lowered)} | {lowered}
+
+
+class PrefixIndex:
+    """
+    單一欄位的前綴索引：counts 記錄每個值出現的次數，keys 是依字母排序的 (前綴鍵, 值)，
+    查詢時以二分搜尋找到第一個符合的鍵，再往後掃描到不符合為止。
+    """
+
+    def __init__(self, counts):
+        self.counts = dict(counts)
+        self.keys = sorted((key, value) for value in self.counts for key in index_keys(value))
+
+    def add(self, value, delta):
+        count = self.counts.get(value, 0) + delta
+        if count > 0:
+            if value not in self.counts:
+                for key in index_keys(value):
+                    bisect.insort(self.keys, (key, value))
+            self.counts[value] = count
+        elif value in self.counts:
+            del self.counts[value]
+            for key in index_keys(value):
+                index = bisect.bisect_left(self.keys, (key, value))
+                if index < len(self.keys) and self.keys[index] == (key, value):
+                    del self.keys[index]
+
+    def search(self, prefix, limit):
+        prefix = prefix.lower()
+        matched = set()
+        index = bisect.bisect_left(self.keys, (prefix,))
+        while index < len(self.keys) and self.keys[index][0].startswith(prefix):
+            matched.add(self.keys[index][1])
+            index += 1
+        return heapq.nsmallest(limit, ((-self.counts[value], value) for value in matched))
+
+
+def load_counts(field):
+    """從 Job 資料表（所有分片）統計上架中職缺的欄位每個值的出現次數"""
+    counts = Counter()
+    for rows in sharding.scatter(lambda alias: _shard_counts(field, alias)):
+        counts.update(dict(rows))
+    return counts
+
+
+def _shard_counts(field, using):
+    jobs = filter_jobs(Job.objects.using(using), status="active", now=timezone.now()).order_by()
+    if field != "required_skills":
+        return list(jobs.values_list(field).annotate(count=Count("id")))
+    connection = connections[using]
+    source = connection.ops.quote_name("active_jobs")
+    skills_sql = unnest_skills_sql(source, connection)
+    if skills_sql is None:
+        return Counter(skill for skills in jobs.values_list("required_skills", flat=True).iterator() for skill in skills)
+    table_function, value = skills_sql
+    source_sql, params = jobs.values("required_skills").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"WITH {source} AS ({source_sql}) SELECT {value}, COUNT(*) FROM {source}, {table_function} "
+                       f"GROUP BY {value}", params)
+        return cursor.fetchall()
+
+
+class SuggestIndex:
+    """
+    title / company_name / location / required_skills 的記憶體內前綴索引，只計算狀態為 active 的職缺。
+
+    每個欄位在第一次查詢時建立；本行程內的單筆寫入由 record_change() 增量更新。
+    超過 JOBS_SUGGEST_REFRESH_SECONDS（涵蓋其他行程的寫入與隨時間到期、上架的職缺）
+    或有無法增量更新的寫入時，在背景執行緒重建，重建期間繼續使用舊索引。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.indexes = {}
+        self.built_at = {}
+        self.stale = set()
+        self.refreshing = set()
+
+    def suggest(self, field, prefix, limit):
+        index = self.indexes.get(field)
+        if index is None:
+            self.build(field)
+            index = self.indexes[field]
+        elif field in self.stale or time.monotonic() - self.built_at[field] > getattr(settings, "JOBS_SUGGEST_REFRESH_SECONDS", 300):
+            self.refresh_in_background(field)
+        with self.lock:
+            return [{"value": value, "count": -count} for count, value in index.search(prefix, limit)]
+
+    def build(self, field):
+        start_time = time.perf_counter()
+        index = PrefixIndex(load_counts(field))
+        with self.lock:
+            self.indexes[field] = index
+            self.built_at[field] = time.monotonic()
+        logger.info(f"建立 {field} 前綴索引：{len(index.counts)} 個值，耗時 {time.perf_counter() - start_time:.3f} 秒")
+
+    def refresh_in_background(self, field):
+        with self.lock:
+            if field in self.refreshing:
+                return
+            self.refreshing.add(field)
+            self.stale.discard(field)
+
+        def run():
+            try:
+                self.build(field)
+            except Exception as e:
+                logger.error(f"重建 {field} 前綴索引時發生錯誤: {str(e)}")
+            finally:
+                connections.close_all()
+                with self.lock:
+                    self.refreshing.discard(field)
+
+        threading.Thread(target=run, name=f"suggest-{field}", daemon=True).start()
+
+    def record_change(self, old=None, new=None, changed=None):
+        """
+        單筆職缺寫入後更新已建立的索引；old / new 是寫入前後的欄位值，只有狀態為 active 的一方會計入。
+        只知道變更的欄位名稱 changed 時，把受影響的欄位標記為需要重建。
+        """
+        now = timezone.now()
+        with self.lock:
+            for field, index in self.indexes.items():
+                if changed is not None:
+                    if field in changed or set(STATUS_DEPENDENCIES) & set(changed):
+                        self.stale.add(field)
+                    continue
+                if field in self.refreshing:
+                    # 重建中的索引可能不包含這次寫入，重建完成後再重建一次
+                    self.stale.add(field)
+                for values, delta in ((old, -1), (new, 1)):
+                    if values is None:
+                        continue
+                    if field not in values or set(STATUS_DEPENDENCIES) - set(values):
+                        self.stale.add(field)
+                        continue
+                    if job_status(values, now) != "active":
+                        continue
+                    for value in (values[field] or []) if field == "required_skills" else [values[field]]:
+                        index.add(value, delta)
+
+    def mark_stale(self):
+        with self.lock:
+            self.stale.update(self.indexes)
+
+    def clear(self):
+        with self.lock:
+            self.indexes.clear()
+            self.built_at.clear()
+            self.stale.clear()
+
+
+# 每個行程共用一份索引
+suggest_index = SuggestIndex()
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from taskqueue.queue import task
+
+from . import changes, statuses
+from .archive import archive_expired_jobs
+from .models import ArchivedJob, Job
+from .percolator import rekey_saved_searches
+from .purge import purge_expired
+from .similar import similar_index
+from .trigram import SEARCH_FIELDS, rebuild_terms
+
+# 由 run_worker 執行的背景工作，與同名的管理命令做相同的事；回傳值存到 Task.result 供 GET /api/tasks/{id} 查詢
+
+
+@task("jobs.update_statuses")
+def update_statuses():
+    expired, activated, active = statuses.update_job_statuses(timezone.now())
+    return {"expired": expired, "activated": activated, "active": active}
+
+
+@task("jobs.archive")
+def archive(older_than=None):
+    days = older_than if older_than is not None else getattr(settings, "JOBS_ARCHIVE_AFTER_DAYS", 30)
+    return {"archived": archive_expired_jobs(timezone.now() - timedelta(days=days))}
+
+
+@task("jobs.purge")
+def purge(retention_days=None):
+    days = retention_days if retention_days is not None else getattr(settings, "JOBS_RETENTION_DAYS", 365)
+    cutoff = timezone.now() - timedelta(days=days)
+    batch_size = getattr(settings, "JOBS_PURGE_BATCH_SIZE", 500)
+    pause = getattr(settings, "JOBS_PURGE_PAUSE", 0.05)
+    return {"deleted": sum(purge_expired(model, cutoff, batch_size=batch_size, pause=pause)
+                           for model in (ArchivedJob, Job))}
+
+
+@task("jobs.compact_changes")
+def compact_changes():
+    return {"deleted": changes.compact()}
+
+
+@task("jobs.rebuild_search_index")
+def rebuild_search_index():
+    added = removed = 0
+    for field in SEARCH_FIELDS:
+        field_added, field_removed = rebuild_terms(field)
+        added += field_added
+        removed += field_removed
+    return {"added": added, "removed": removed, "rekeyed": rekey_saved_searches()}
+
+
+@task("jobs.build_similar_index")
+def build_similar_index():
+    similar_index.build()
+    return {"size": similar_index.index.size}
@@ -10,6 +10,7 @@ from datetime import timedelta
 from ninja.testing import TestClient
 from job_platform.api import api
 from jobs.models import Job
+from jobs.schemas import JobSchema
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -703,3 +704,1510 @@ class TestUpdateJobStatus:
         # 記錄測試信息
         print(f"測試成功：已更新 {expired_count} 個已過期職缺和 {scheduled_count} 個已到發布時間的排程職缺")
         # 注意：API 實際測試可以在真實服務器上進行，這裡只測試核心邏輯
+
+
+# --- Seed Command Tests --- #
+@pytest.mark.django_db
+def test_seed_jobs_command_is_deterministic():
+    from io import StringIO
+    from django.core.management import call_command
+
+    reference = timezone.now().replace(microsecond=0).isoformat()
+
+    def seed():
+        call_command("seed_jobs", count=120, seed=7, batch_size=50, clear=True,
+                     reference_date=reference, stdout=StringIO())
+        return list(Job.objects.order_by("id").values_list(
+            "title", "company_name", "location", "posting_date", "expiration_date", "required_skills"))
+
+    first = seed()
+    assert len(first) == 120
+    assert seed() == first
+    # 依比例混合過期、排程與活躍職缺
+    statuses = {job.status for job in Job.objects.all()}
+    assert {"Expired", "Scheduled", "Active"} <= statuses
+
+
+# --- Load Test Command Tests --- #
+def test_loadtest_percentile_nearest_rank():
+    from jobs.management.commands.loadtest import percentile
+
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.95) == 95.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.99) == 0.0
+
+@pytest.mark.django_db(transaction=True)
+def test_loadtest_command_in_process():
+    from io import StringIO
+    from django.core.management import call_command
+
+    exp_dt = timezone.now() + timedelta(days=30)
+    Job.objects.create(title="Load Job", company_name="Load Co", expiration_date=exp_dt,
+                       location="Remote", salary_range="S", description="D")
+    out = StringIO()
+    call_command("loadtest", create_user=True, host="testserver", concurrency=1, requests=30, duration=30,
+                 mix="list=5,detail=5,create=1,update=1", stdout=out)
+    report = out.getvalue()
+    for operation in ("login", "list", "total"):
+        assert operation in report
+    total_line = next(line for line in report.splitlines() if line.startswith("total"))
+    assert total_line.split()[2] == "0"  # 沒有錯誤
+
+
+# --- JSON Renderer Tests --- #
+def test_fast_json_renderer_matches_ninja_renderer_bytes():
+    import json
+    from ninja.renderers import JSONRenderer
+    from job_platform.renderers import FastJSONRenderer
+    from jobs.schemas import JobListSchema
+
+    now = timezone.now().replace(microsecond=123456)
+    job = Job(id=7, title="資深工程師 Senior Engineer", company_name="台灣 Tech", location="台北",
+              posting_date=now, expiration_date=now.replace(microsecond=0) + timedelta(days=3),
+              required_skills=["Python", "Django"], is_active=True, is_scheduled=False)
+    data = {"items": [JobListSchema.from_orm(job).model_dump()], "count": 1}
+
+    expected = JSONRenderer().render(None, data, response_status=200)
+    assert FastJSONRenderer().render(None, data, response_status=200) == expected
+
+    compact = FastJSONRenderer(compact=True).render(None, data, response_status=200)
+    assert json.loads(compact) == json.loads(expected)
+
+
+# --- Sparse Fieldset Tests --- #
+@pytest.mark.django_db
+def test_list_jobs_with_fields_limits_output_and_columns(authenticated_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    now = timezone.now()
+    Job.objects.create(title="Mobile Card", description="Long description", company_name="CardCo",
+                       location="Remote", salary_range="S", posting_date=now - timedelta(days=1),
+                       expiration_date=now + timedelta(days=10))
+
+    with CaptureQueriesContext(connection) as queries:
+        response = authenticated_client.get("/jobs?fields=id,title,company_name,status")
+    assert response.status_code == 200, response.content
+    item = response.json()["items"][0]
+    assert item == {"id": item["id"], "title": "Mobile Card", "company_name": "CardCo", "status": "Active"}
+    job_queries = [query["sql"] for query in queries.captured_queries if '"jobs_job"' in query["sql"]]
+    # 只查詢一頁與 count，且沒有載入 description
+    assert len(job_queries) == 2
+    assert all('"description"' not in sql for sql in job_queries)
+
+@pytest.mark.django_db
+def test_list_jobs_default_output_unchanged_without_fields(authenticated_client):
+    exp_dt = timezone.now() + timedelta(days=30)
+    Job.objects.create(title="Default", description="D", company_name="C", location="L",
+                       salary_range="S", expiration_date=exp_dt, required_skills=["Go"])
+    response = authenticated_client.get("/jobs")
+    assert response.status_code == 200, response.content
+    assert list(response.json()["items"][0]) == [
+        "id", "title", "company_name", "location", "posting_date", "expiration_date", "status", "required_skills",
+    ]
+
+@pytest.mark.django_db
+def test_get_job_with_fields(authenticated_client):
+    exp_dt = timezone.now() + timedelta(days=30)
+    job = Job.objects.create(title="Sync Job", description="Huge text", company_name="SyncCo",
+                             location="L", salary_range="100k", expiration_date=exp_dt)
+    wanted = [name for name in JobSchema.model_fields if name != "description"]
+    response = authenticated_client.get(f"/jobs/{job.id}?fields={','.join(wanted)}")
+    assert response.status_code == 200, response.content
+    result = response.json()
+    assert list(result) == wanted
+    assert result["status"] == "Active"
+
+@pytest.mark.django_db
+def test_fields_rejects_unknown_field(authenticated_client):
+    exp_dt = timezone.now() + timedelta(days=30)
+    job = Job.objects.create(title="T", description="D", company_name="C", location="L",
+                             salary_range="S", expiration_date=exp_dt)
+    assert authenticated_client.get("/jobs?fields=id,password").status_code == 400
+    assert authenticated_client.get(f"/jobs/{job.id}?fields=secret").status_code == 400
+
+
+# --- Batch Fetch Tests --- #
+@pytest.mark.django_db
+def test_get_jobs_batch_preserves_order_and_reports_missing(authenticated_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    exp_dt = timezone.now() + timedelta(days=30)
+    first = Job.objects.create(title="First", description="D", company_name="C", location="L",
+                               salary_range="S", expiration_date=exp_dt)
+    second = Job.objects.create(title="Second", description="D", company_name="C", location="L",
+                                salary_range="S", expiration_date=exp_dt)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = authenticated_client.get(f"/jobs/batch?ids={second.id},99999,{first.id},{second.id}")
+    assert response.status_code == 200, response.content
+    result = response.json()
+    assert [item["title"] for item in result["items"]] == ["Second", "First"]
+    assert result["missing"] == [99999]
+    assert len([query for query in queries.captured_queries if '"jobs_job"' in query["sql"]]) == 1
+
+    response = authenticated_client.get(f"/jobs/batch?ids={first.id}&fields=id,status")
+    assert response.json()["items"] == [{"id": first.id, "status": "Active"}]
+
+@pytest.mark.django_db
+def test_get_jobs_batch_validation(authenticated_client, settings):
+    settings.JOBS_BATCH_MAX_SIZE = 3
+    assert authenticated_client.get("/jobs/batch?ids=1,2,3,4").status_code == 400
+    assert authenticated_client.get("/jobs/batch?ids=1,abc").status_code == 400
+    assert authenticated_client.get("/jobs/batch?ids=").status_code == 400
+
+# --- Partial Update Tests --- #
+@pytest.mark.django_db
+def test_patch_job_single_statement_update(authenticated_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    job = Job.objects.create(title="Patch Me", description="D", company_name="C", location="L",
+                             salary_range="S", posting_date=timezone.now() - timedelta(days=1),
+                             expiration_date=timezone.now() + timedelta(days=30), required_skills=["Python"])
+
+    with CaptureQueriesContext(connection) as queries:
+        response = authenticated_client.patch(f"/jobs/{job.id}", json={"title": "Patched", "version": 1})
+    assert response.status_code == 200, response.content
+    result = response.json()
+    assert result["title"] == "Patched"
+    assert result["version"] == 2
+    assert result["required_skills"] == ["Python"]
+    assert result["status"] == "Active"
+    job_queries = [query["sql"] for query in queries.captured_queries if '"jobs_job"' in query["sql"]]
+    assert len(job_queries) == 1
+    assert job_queries[0].startswith("UPDATE") and '"description"' not in job_queries[0].split("WHERE")[0]
+
+    # 舊版本號寫入會衝突，且不會覆蓋資料
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={"title": "Stale", "version": 1})
+    assert response.status_code == 409, response.content
+    assert response.json()["version"] == 2
+    job.refresh_from_db()
+    assert job.title == "Patched"
+
+    # PUT 也會遞增版本號
+    response = authenticated_client.put(f"/jobs/{job.id}", json={"title": "Put"})
+    assert response.json()["version"] == 3
+
+@pytest.mark.django_db
+def test_patch_job_validation(authenticated_client):
+    job = Job.objects.create(title="Dates", description="D", company_name="C", location="L",
+                             salary_range="S", posting_date=timezone.now() - timedelta(days=5),
+                             expiration_date=timezone.now() + timedelta(days=30))
+
+    # 到期日早於資料庫中的發布日期，由 WHERE 條件擋下
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={
+        "expiration_date": (timezone.now() - timedelta(days=10)).isoformat(), "version": 1})
+    assert response.status_code == 400, response.content
+    assert response.json()["message"] == "Posting date must be before expiration date."
+
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={"is_scheduled": True, "version": 1})
+    assert response.status_code == 400, response.content
+    assert response.json()["message"] == "Scheduled job posting_date must be in the future"
+
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={"company_name": "Other", "version": 1})
+    assert response.status_code == 400, response.content
+
+    job.refresh_from_db()
+    assert job.version == 1
+    assert authenticated_client.patch("/jobs/99999", json={"title": "X", "version": 1}).status_code == 404
+
+    future = timezone.now() + timedelta(days=3)
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={
+        "is_scheduled": True, "posting_date": future.isoformat(), "version": 1})
+    assert response.status_code == 200, response.content
+    assert response.json()["status"] == "Scheduled"
+
+    # 排程中的職缺可以只改發布日期（由 CASE 依資料庫中的 is_scheduled 決定）
+    later = future + timedelta(days=1)
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={"posting_date": later.isoformat(), "version": 2})
+    assert response.status_code == 200, response.content
+    assert response.json()["status"] == "Scheduled"
+    job.refresh_from_db()
+    assert job.posting_date == later
+
+# --- Archive Tests --- #
+@pytest.mark.django_db
+def test_archive_jobs_moves_expired_jobs_in_batches():
+    from io import StringIO
+    from django.core.management import call_command
+    from jobs.models import ArchivedJob
+
+    now = timezone.now()
+    live = Job.objects.create(title="Live", description="D", company_name="C", location="L", salary_range="S",
+                              expiration_date=now + timedelta(days=10))
+    old = [Job.objects.create(title=f"Old {i}", description="D", company_name="C", location="L", salary_range="S",
+                              posting_date=now - timedelta(days=90), expiration_date=now - timedelta(days=60),
+                              required_skills=["Python"]) for i in range(5)]
+    recent = Job.objects.create(title="Recent", description="D", company_name="C", location="L", salary_range="S",
+                                posting_date=now - timedelta(days=10), expiration_date=now - timedelta(days=1))
+
+    out = StringIO()
+    call_command("archive_jobs", "--older-than", "30", "--batch-size", "2", stdout=out)
+    assert out.getvalue().count("已封存") == 4  # 3 批進度 + 結果
+    assert set(Job.objects.values_list("id", flat=True)) == {live.id, recent.id}
+    assert set(ArchivedJob.objects.values_list("id", flat=True)) == {job.id for job in old}
+    archived = ArchivedJob.objects.get(id=old[0].id)
+    assert archived.title == "Old 0"
+    assert archived.required_skills == ["Python"]
+    assert archived.status == "Expired"
+
+@pytest.mark.django_db
+def test_archived_jobs_fall_through_on_reads(authenticated_client):
+    from django.core.management import call_command
+
+    now = timezone.now()
+    Job.objects.create(title="Live", description="D", company_name="C", location="L", salary_range="S",
+                       expiration_date=now + timedelta(days=10))
+    hot = Job.objects.create(title="Expired Hot", description="D", company_name="C", location="L", salary_range="S",
+                             posting_date=now - timedelta(days=20), expiration_date=now - timedelta(days=2))
+    cold = Job.objects.create(title="Expired Cold", description="D", company_name="C", location="L", salary_range="S",
+                              posting_date=now - timedelta(days=90), expiration_date=now - timedelta(days=60))
+    call_command("archive_jobs", "--older-than", "30", "--silent", stdout=open(os.devnull, "w"))
+
+    response = authenticated_client.get("/jobs?status=expired&order_by=-expiration_date")
+    assert response.status_code == 200, response.content
+    result = response.json()
+    assert result["count"] == 2
+    assert [item["title"] for item in result["items"]] == ["Expired Hot", "Expired Cold"]
+
+    response = authenticated_client.get("/jobs?status=expired&title=cold&fields=id,title")
+    assert response.json()["items"] == [{"id": cold.id, "title": "Expired Cold"}]
+
+    # 未指定 status 時只查詢主表
+    assert authenticated_client.get("/jobs").json()["count"] == 2
+
+    response = authenticated_client.get(f"/jobs/{cold.id}")
+    assert response.status_code == 200, response.content
+    assert response.json()["status"] == "Expired"
+    response = authenticated_client.get(f"/jobs/batch?ids={cold.id},{hot.id}")
+    assert [item["id"] for item in response.json()["items"]] == [cold.id, hot.id]
+
+# --- Retention Purge Tests --- #
+@pytest.mark.django_db
+def test_purge_jobs_deletes_past_retention_in_batches():
+    from io import StringIO
+    from django.core.management import call_command
+    from jobs.models import ArchivedJob
+
+    now = timezone.now()
+    keep = Job.objects.create(title="Keep", description="D", company_name="C", location="L", salary_range="S",
+                              posting_date=now - timedelta(days=40), expiration_date=now - timedelta(days=10))
+    for i in range(5):
+        Job.objects.create(title=f"Old {i}", description="D", company_name="C", location="L", salary_range="S",
+                           posting_date=now - timedelta(days=500), expiration_date=now - timedelta(days=400))
+    ArchivedJob.objects.create(title="Archived Old", description="D", company_name="C", location="L", salary_range="S",
+                               posting_date=now - timedelta(days=500), expiration_date=now - timedelta(days=400))
+
+    out = StringIO()
+    call_command("purge_jobs", "--retention-days", "365", "--batch-size", "2", "--pause", "0", stdout=out)
+    assert list(Job.objects.values_list("id", flat=True)) == [keep.id]
+    assert ArchivedJob.objects.count() == 0
+    assert "已刪除 6 筆" in out.getvalue()
+    assert "Job: 已刪除 5 筆" in out.getvalue()
+
+# --- Salary Range Tests --- #
+def test_parse_salary_range():
+    from jobs.salary import parse_salary_range
+
+    assert parse_salary_range("100k-150k USD") == (100000, 150000, "USD")
+    assert parse_salary_range("$50,000 - $70,000 / year") == (50000, 70000, "USD")
+    assert parse_salary_range("100-150k EUR") == (100000, 150000, "EUR")
+    assert parse_salary_range("NT$40,000-60,000/月") == (480000, 720000, "TWD")
+    assert parse_salary_range("Competitive") == (None, None, "")
+
+@pytest.mark.django_db
+def test_list_jobs_filter_by_salary(authenticated_client):
+    exp_dt = timezone.now() + timedelta(days=30)
+    for title, salary in [("Low", "60k-80k USD"), ("Mid", "$120,000 - $140,000"), ("High", "150k-200k USD"), ("Unknown", "Negotiable")]:
+        Job.objects.create(title=title, description="D", company_name="C", location="L", salary_range=salary, expiration_date=exp_dt)
+
+    job = Job.objects.get(title="Mid")
+    assert (job.salary_min, job.salary_max, job.salary_currency) == (120000, 140000, "USD")
+
+    response = authenticated_client.get("/jobs?salary_min_gte=120000&order_by=posting_date")
+    assert [item["title"] for item in response.json()["items"]] == ["Mid", "High"]
+    response = authenticated_client.get("/jobs?salary_min_gte=100000&salary_max_lte=150000")
+    assert [item["title"] for item in response.json()["items"]] == ["Mid"]
+
+    # PATCH 修改 salary_range 時一併更新數值欄位
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={"salary_range": "90k-95k EUR", "version": 1})
+    assert response.status_code == 200, response.content
+    assert (response.json()["salary_min"], response.json()["salary_currency"]) == (90000, "EUR")
+
+@pytest.mark.django_db
+def test_backfill_salaries_command():
+    from io import StringIO
+    from django.core.management import call_command
+
+    job = Job.objects.create(title="Legacy", description="D", company_name="C", location="L",
+                             salary_range="100k-150k USD", expiration_date=timezone.now() + timedelta(days=30))
+    Job.objects.filter(id=job.id).update(salary_min=None, salary_max=None, salary_currency="")
+
+    call_command("backfill_salaries", "--batch-size", "1", stdout=StringIO())
+    job.refresh_from_db()
+    assert (job.salary_min, job.salary_max, job.salary_currency) == (100000, 150000, "USD")
+
+# --- Facet Tests --- #
+@pytest.mark.django_db
+def test_job_facets_counts_and_filters(authenticated_client):
+    from django.core.cache import cache
+
+    cache.clear()
+    now = timezone.now()
+    exp_dt = now + timedelta(days=30)
+    for title, location, company, skills in [
+        ("Python Dev", "Remote", "Acme", ["Python", "Django"]),
+        ("Go Dev", "Remote", "Acme", ["Go"]),
+        ("Py Data", "Taipei", "Beta", ["Python"]),
+    ]:
+        Job.objects.create(title=title, description="D", company_name=company, location=location,
+                           salary_range="S", expiration_date=exp_dt, required_skills=skills)
+    Job.objects.create(title="Old Python", description="D", company_name="Beta", location="Taipei", salary_range="S",
+                       posting_date=now - timedelta(days=20), expiration_date=now - timedelta(days=1),
+                       required_skills=["Python"])
+
+    response = authenticated_client.get("/jobs/facets")
+    assert response.status_code == 200, response.content
+    result = response.json()
+    assert result["count"] == 4
+    assert result["status"] == {"active": 3, "expired": 1, "scheduled": 0, "inactive": 0}
+    assert result["location"] == [{"value": "Remote", "count": 2}, {"value": "Taipei", "count": 2}]
+    assert result["required_skills"][0] == {"value": "Python", "count": 3}
+
+    response = authenticated_client.get("/jobs/facets?status=active&company_name=acme&limit=1")
+    result = response.json()
+    assert result["count"] == 2
+    assert result["company_name"] == [{"value": "Acme", "count": 2}]
+    assert len(result["required_skills"]) == 1
+
+    assert authenticated_client.get("/jobs/facets?limit=0").status_code == 400
+
+    # 單筆寫入時增量更新快取，不需要重新統計
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    new_job = Job.objects.create(title="New", description="D", company_name="Gamma", location="Remote",
+                                 salary_range="S", expiration_date=exp_dt, required_skills=["Go"])
+    response = authenticated_client.put(f"/jobs/{new_job.id}", json={"location": "Berlin"})
+    assert response.status_code == 200, response.content
+    Job.objects.get(title="Go Dev").delete()
+    with CaptureQueriesContext(connection) as queries:
+        result = authenticated_client.get("/jobs/facets").json()
+    assert not [query for query in queries.captured_queries if "jobs_job" in query["sql"]]
+    assert result["count"] == 4
+    assert result["location"] == [{"value": "Taipei", "count": 2}, {"value": "Berlin", "count": 1}, {"value": "Remote", "count": 1}]
+    assert {"value": "Go", "count": 1} in result["required_skills"]
+    result = authenticated_client.get("/jobs/facets?status=active&company_name=acme").json()
+    assert result["count"] == 1
+
+    # PATCH 只知道變更的欄位，影響統計時刪除快取重新計算
+    response = authenticated_client.patch(f"/jobs/{new_job.id}", json={"location": "Paris", "version": 2})
+    assert response.status_code == 200, response.content
+    assert {"value": "Paris", "count": 1} in authenticated_client.get("/jobs/facets").json()["location"]
+
+    # status=expired 時包含封存表
+    from django.core.management import call_command
+    call_command("archive_jobs", "--older-than", "0", "--silent", stdout=open(os.devnull, "w"))
+    result = authenticated_client.get("/jobs/facets?status=expired").json()
+    assert result["count"] == 1
+    assert result["company_name"] == [{"value": "Beta", "count": 1}]
+
+@pytest.mark.django_db
+def test_job_facets_accept_keyword_and_fuzzy_filters(authenticated_client):
+    from django.core.cache import cache
+
+    cache.clear()
+    exp_dt = timezone.now() + timedelta(days=30)
+    for title, description, company in [("Python", "Build Django APIs", "Acme"), ("Golang", "Write Go services", "Acme"),
+                                        ("Data Engineer", "Python pipelines", "Beta")]:
+        Job.objects.create(title=title, description=description, company_name=company, location="Remote",
+                           salary_range="S", expiration_date=exp_dt)
+
+    # 與 list_jobs 相同的 q / fuzzy 條件
+    for query in ("q=python", "title=pythn&fuzzy=true", "title=pythn"):
+        facets = authenticated_client.get(f"/jobs/facets?{query}").json()
+        assert facets["count"] == authenticated_client.get(f"/jobs?{query}").json()["count"]
+    assert authenticated_client.get("/jobs/facets?q=python").json()["company_name"] == [
+        {"value": "Acme", "count": 1}, {"value": "Beta", "count": 1}]
+    assert authenticated_client.get("/jobs/facets?title=pythn&fuzzy=true").json()["count"] == 1
+
+    # 無法增量更新的條件在可能受影響的寫入後重新統計
+    for title, description in [("Analyst", "SQL and Python"), ("Designer", "Figma")]:
+        Job.objects.create(title=title, description=description, company_name="Gamma", location="Remote",
+                           salary_range="S", expiration_date=exp_dt)
+    assert authenticated_client.get("/jobs/facets?q=python").json()["count"] == 3
+
+    response = authenticated_client.post("/jobs/saved-searches", json={"name": "Python", "q": "python"})
+    assert response.status_code == 400
+
+@pytest.mark.django_db
+def test_job_facets_invalidated_by_bulk_changes_in_other_processes(authenticated_client, monkeypatch):
+    """其他行程（cron 的狀態更新等）的批次變更透過共用的世代編號讓本行程的統計快取失效"""
+    from django.core.cache import cache
+    from django.core.cache.backends.locmem import LocMemCache
+    from jobs import facets, statuses
+
+    cache.clear()
+    now = timezone.now()
+    job = Job.objects.create(title="T", description="D", company_name="C", location="L", salary_range="S",
+                             expiration_date=now + timedelta(days=30))
+    assert authenticated_client.get("/jobs/facets").json()["status"]["active"] == 1
+
+    Job.objects.filter(id=job.id).update(expiration_date=now - timedelta(days=1))
+    # 另一個行程：有自己的記憶體快取
+    monkeypatch.setattr(facets, "cache", LocMemCache("other-process", {}))
+    statuses.update_job_statuses(timezone.now())
+    monkeypatch.setattr(facets, "cache", cache)
+    assert authenticated_client.get("/jobs/facets").json()["status"] == {
+        "active": 0, "expired": 1, "scheduled": 0, "inactive": 0}
+
+# --- Suggest Tests --- #
+@pytest.mark.django_db
+def test_suggest_prefix_index_and_incremental_updates(authenticated_client):
+    from jobs.suggest import suggest_index
+
+    suggest_index.clear()
+    exp_dt = timezone.now() + timedelta(days=30)
+    for title, skills in [("Senior Engineer", ["Python", "PostgreSQL"]), ("Senior Engineer", ["Python"]),
+                          ("Engineering Manager", ["People"]), ("Data Analyst", ["Python"])]:
+        Job.objects.create(title=title, description="D", company_name="C", location="L", salary_range="S",
+                           expiration_date=exp_dt, required_skills=skills)
+
+    response = authenticated_client.get("/jobs/suggest?field=title&prefix=eng")
+    assert response.status_code == 200, response.content
+    assert response.json() == [{"value": "Senior Engineer", "count": 2}, {"value": "Engineering Manager", "count": 1}]
+    assert authenticated_client.get("/jobs/suggest?field=required_skills&prefix=p&limit=2").json() == [
+        {"value": "Python", "count": 3}, {"value": "People", "count": 1}]
+
+    # 索引建立後的新增、修改與刪除直接更新索引
+    job = Job.objects.create(title="Platform Engineer", description="D", company_name="C", location="L",
+                             salary_range="S", expiration_date=exp_dt)
+    Job.objects.get(title="Data Analyst").delete()
+    response = authenticated_client.put(f"/jobs/{job.id}", json={"title": "Engine Tuner"})
+    assert response.status_code == 200, response.content
+    assert [item["value"] for item in authenticated_client.get("/jobs/suggest?field=title&prefix=eng").json()] == [
+        "Senior Engineer", "Engine Tuner", "Engineering Manager"]
+    assert authenticated_client.get("/jobs/suggest?field=title&prefix=data").json() == []
+    assert authenticated_client.get("/jobs/suggest?field=salary_range&prefix=1").status_code == 400
+
+    # 只計算上架中的職缺：過期、停用的職缺不計入，停用的職缺從索引中扣除
+    Job.objects.create(title="Expired Engineer", description="D", company_name="C", location="L", salary_range="S",
+                       expiration_date=timezone.now() - timedelta(days=1), required_skills=["Python"])
+    Job.objects.create(title="Inactive Engineer", description="D", company_name="C", location="L", salary_range="S",
+                       expiration_date=exp_dt, is_active=False)
+    response = authenticated_client.put(f"/jobs/{job.id}", json={"is_active": False})
+    assert response.status_code == 200, response.content
+    assert authenticated_client.get("/jobs/suggest?field=title&prefix=eng").json() == [
+        {"value": "Senior Engineer", "count": 2}, {"value": "Engineering Manager", "count": 1}]
+    suggest_index.clear()
+    assert authenticated_client.get("/jobs/suggest?field=title&prefix=eng").json() == [
+        {"value": "Senior Engineer", "count": 2}, {"value": "Engineering Manager", "count": 1}]
+    assert authenticated_client.get("/jobs/suggest?field=required_skills&prefix=py").json() == [{"value": "Python", "count": 2}]
+    suggest_index.clear()
+
+
+# --- Trigram Search Tests --- #
+@pytest.mark.django_db
+def test_trigram_substring_filter_matches_icontains(authenticated_client):
+    from jobs.filters import filter_jobs
+    from jobs.models import SearchTerm
+
+    exp_dt = timezone.now() + timedelta(days=30)
+    for title, company, location in [("Senior Python Engineer", "Acme", "Taipei"), ("Data Engineer", "ACME Labs", "Tainan"),
+                                     ("Product Manager", "Globex", "Remote"), ("Go Developer", "Initech", "Taichung")]:
+        Job.objects.create(title=title, description="D", company_name=company, location=location, salary_range="S",
+                           expiration_date=exp_dt)
+    assert SearchTerm.objects.filter(field="title", value="Data Engineer").exists()
+
+    # 結果與直接 icontains 相同，包含少於三個字元的查詢
+    for field, query in [("title", "engineer"), ("title", "ENGINE"), ("title", "go"), ("title", "nothing"),
+                         ("company_name", "acme"), ("location", "tai"), ("location", "pei")]:
+        expected = set(Job.objects.filter(**{f"{field}__icontains": query}).values_list("id", flat=True))
+        assert set(filter_jobs(Job.objects.all(), **{field: query}).values_list("id", flat=True)) == expected
+
+    # 部分更新後的新值也可以搜尋
+    job = Job.objects.get(title="Go Developer")
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={"title": "Rust Developer", "version": job.version})
+    assert response.status_code == 200, response.content
+    response = authenticated_client.get("/jobs?title=rust")
+    assert [item["id"] for item in response.json()["items"]] == [job.id]
+
+
+@pytest.mark.django_db
+def test_trigram_fuzzy_search_ranks_by_similarity(authenticated_client):
+    from io import StringIO
+    from django.core.management import call_command
+    from jobs.models import SearchTerm
+
+    exp_dt = timezone.now() + timedelta(days=30)
+    for title in ["Backend Engineer", "Frontend Engineer", "Accountant"]:
+        Job.objects.create(title=title, description="D", company_name="C", location="L", salary_range="S",
+                           expiration_date=exp_dt)
+
+    assert authenticated_client.get("/jobs?title=enginer").json()["items"] == []
+    response = authenticated_client.get("/jobs?title=backend%20enginer&fuzzy=true")
+    assert response.status_code == 200, response.content
+    titles = [item["title"] for item in response.json()["items"]]
+    assert titles[0] == "Backend Engineer"
+    assert "Accountant" not in titles
+
+    # 刪除職缺後留下的值由 rebuild_search_index 清除
+    Job.objects.filter(title="Accountant").delete()
+    call_command("rebuild_search_index", stdout=StringIO())
+    assert not SearchTerm.objects.filter(field="title", value="Accountant").exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index_keeps_terms_added_during_the_scan(authenticated_client, monkeypatch):
+    from jobs import sharding, trigram
+
+    exp_dt = timezone.now() + timedelta(days=30)
+    Job.objects.create(title="Backend Engineer", description="D", company_name="C", location="L", salary_range="S",
+                       expiration_date=exp_dt)
+    scatter = sharding.scatter
+    saved = []
+
+    def scatter_then_save(function, aliases=None):
+        # 掃描完 Job 之後才寫入的職缺（新的值與重新使用已無職缺使用的值），不在掃描結果中
+        result = scatter(function, aliases)
+        if not saved:
+            for title in ("Platform Analyst", "Accountant"):
+                saved.append(Job.objects.create(title=title, description="D", company_name="C", location="L",
+                                                salary_range="S", expiration_date=exp_dt))
+        return result
+
+    trigram.ensure_terms("title", ["Accountant"])
+    monkeypatch.setattr(sharding, "scatter", scatter_then_save)
+    assert trigram.rebuild_terms("title") == (0, 0)
+    assert [item["id"] for item in authenticated_client.get("/jobs?title=analyst").json()["items"]] == [saved[0].id]
+    assert [item["id"] for item in authenticated_client.get("/jobs?title=accountant").json()["items"]] == [saved[1].id]
+
+
+# --- Relevance Search Tests --- #
+@pytest.mark.django_db
+def test_list_jobs_order_by_relevance(authenticated_client):
+    exp_dt = timezone.now() + timedelta(days=30)
+    jobs = {}
+    for title, description, skills in [
+        ("Senior Python Backend Engineer", "Build backend services in Python.", ["Python", "Django"]),
+        ("Backend Engineer", "Senior role working with Python and Go.", ["Go"]),
+        ("Senior Frontend Engineer", "React and TypeScript.", ["React"]),
+        ("Python Developer", "Backend automation.", ["Python"]),
+    ]:
+        jobs[title] = Job.objects.create(title=title, description=description, company_name="C", location="L",
+                                         salary_range="S", expiration_date=exp_dt, required_skills=skills)
+
+    response = authenticated_client.get("/jobs?q=senior%20python%20backend&order_by=relevance")
+    assert response.status_code == 200, response.content
+    titles = [item["title"] for item in response.json()["items"]]
+    # 只包含所有關鍵字都出現的職缺，標題符合較多的排在前面
+    assert titles == ["Senior Python Backend Engineer", "Backend Engineer"]
+
+    # 與技能、狀態篩選一起使用
+    response = authenticated_client.get("/jobs?q=python&order_by=relevance&required_skills=Django&status=active")
+    assert [item["title"] for item in response.json()["items"]] == ["Senior Python Backend Engineer"]
+
+    # 寫入後全文索引立即更新
+    job = jobs["Senior Frontend Engineer"]
+    response = authenticated_client.put(f"/jobs/{job.id}", json={"title": "Senior Python Backend Lead"})
+    assert response.status_code == 200, response.content
+    jobs["Backend Engineer"].delete()
+    response = authenticated_client.get("/jobs?q=senior%20python%20backend&order_by=relevance")
+    assert [item["title"] for item in response.json()["items"]] == [
+        "Senior Python Backend Engineer", "Senior Python Backend Lead"]
+
+
+@pytest.mark.django_db
+def test_list_jobs_relevance_includes_archived_jobs(authenticated_client):
+    from io import StringIO
+    from django.core.management import call_command
+
+    now = timezone.now()
+    Job.objects.create(title="Python Engineer", description="Python everywhere.", company_name="C", location="L",
+                       salary_range="S", posting_date=now - timedelta(days=90),
+                       expiration_date=now - timedelta(days=60))
+    Job.objects.create(title="Java Engineer", description="Some Python scripts.", company_name="C", location="L",
+                       salary_range="S", posting_date=now - timedelta(days=20),
+                       expiration_date=now - timedelta(days=1))
+    call_command("archive_jobs", older_than=30, stdout=StringIO())
+
+    response = authenticated_client.get("/jobs?q=python&order_by=relevance&status=expired")
+    assert response.status_code == 200, response.content
+    assert [item["title"] for item in response.json()["items"]] == ["Python Engineer", "Java Engineer"]
+
+
+# --- Similar Jobs Tests --- #
+@pytest.mark.django_db
+def test_similar_jobs_ranks_active_jobs_by_cosine(authenticated_client, settings, tmp_path):
+    from jobs.similar import similar_index
+
+    settings.JOBS_SIMILAR_INDEX_PATH = tmp_path / "similar_index.npz"
+    similar_index.clear()
+    now = timezone.now()
+    exp_dt = now + timedelta(days=30)
+
+    def create(title, description, skills, **kwargs):
+        return Job.objects.create(title=title, description=description, company_name="C", location="L",
+                                  salary_range="S", expiration_date=kwargs.pop("expiration_date", exp_dt),
+                                  required_skills=skills, **kwargs)
+
+    source = create("Senior Python Backend Engineer", "Build Django APIs and PostgreSQL services.", ["Python", "Django"])
+    close = create("Python Backend Engineer", "Build Django APIs.", ["Python", "Django"])
+    related = create("Backend Engineer", "Maintain Go code.", ["Go"])
+    create("Pastry Cook", "Bake bread, cakes.", ["Baking"])
+    create("Python Backend Engineer", "Build Django APIs.", ["Python"], is_active=False)
+    create("Senior Python Backend Engineer", "Build Django APIs.", ["Python", "Django"], posting_date=now - timedelta(days=60),
+           expiration_date=now - timedelta(days=1))
+
+    response = authenticated_client.get(f"/jobs/{source.id}/similar?limit=5")
+    assert response.status_code == 200, response.content
+    items = response.json()
+    # 只回傳上架中的職缺，不包含自己與完全不相關的職缺
+    assert [item["id"] for item in items] == [close.id, related.id]
+    assert 1 >= items[0]["similarity"] > items[1]["similarity"] > 0
+    assert settings.JOBS_SIMILAR_INDEX_PATH.exists()
+    saved_ids = set(similar_index.index.rows)
+
+    # 建立索引後的新增、修改與刪除直接更新向量
+    newer = create("Senior Python Backend Engineer", "Build Django APIs and PostgreSQL services.", ["Python", "Django"])
+    response = authenticated_client.patch(f"/jobs/{related.id}", json={"title": "Pastry Cook", "version": related.version})
+    assert response.status_code == 200, response.content
+    close.delete()
+    response = authenticated_client.get(f"/jobs/{source.id}/similar")
+    assert [item["id"] for item in response.json()] == [newer.id]
+
+    # 新行程從建立索引時的存檔讀取
+    similar_index.clear()
+    assert similar_index.load()
+    assert set(similar_index.index.rows) == saved_ids and len(saved_ids) == 5
+
+    assert authenticated_client.get(f"/jobs/{source.id}/similar?limit=0").status_code == 400
+    assert authenticated_client.get("/jobs/999999/similar").status_code == 404
+
+@pytest.mark.django_db
+def test_similar_index_accepts_put_posting_dates(authenticated_client, settings):
+    """PUT 以字串寫入 posting_date 後，已建立的相似職缺索引同樣更新"""
+    from jobs.similar import similar_index
+
+    settings.JOBS_SIMILAR_INDEX_PATH = None
+    similar_index.clear()
+    exp_dt = timezone.now() + timedelta(days=30)
+    source, other = (Job.objects.create(title=title, description="Build Django APIs.", company_name="C", location="L",
+                                        salary_range="S", expiration_date=exp_dt, required_skills=["Python"])
+                     for title in ("Python Engineer", "Python Developer"))
+    assert [item["id"] for item in authenticated_client.get(f"/jobs/{source.id}/similar").json()] == [other.id]
+
+    posting_date = (timezone.now() - timedelta(days=1)).isoformat()
+    assert authenticated_client.put(f"/jobs/{other.id}", json={"posting_date": posting_date}).status_code == 200
+    assert authenticated_client.put(f"/jobs/{other.id}", json={"is_scheduled": False}).status_code == 200
+    assert [item["id"] for item in authenticated_client.get(f"/jobs/{source.id}/similar").json()] == [other.id]
+    similar_index.clear()
+    similar_index.clear()
+
+
+# --- Saved Search Tests --- #
+@pytest.mark.django_db
+def test_saved_search_matches_new_and_activated_jobs(authenticated_client):
+    from django.core.management import call_command
+    from jobs.models import SavedSearchMatch
+    from jobs.percolator import job_keys, match_key
+    from jobs import facets
+
+    now = timezone.now()
+    exp_dt = now + timedelta(days=30)
+
+    def save_search(**filters):
+        response = authenticated_client.post("/jobs/saved-searches", json=filters)
+        assert response.status_code == 201, response.content
+        return response.json()["id"]
+
+    def create(title, skills, **kwargs):
+        kwargs = {"location": "Taipei", "expiration_date": exp_dt, **kwargs}
+        return Job.objects.create(title=title, description="D", company_name="C", salary_range="S",
+                                  required_skills=skills, **kwargs)
+
+    def matched(search_id):
+        return set(SavedSearchMatch.objects.filter(search_id=search_id).values_list("job_id", flat=True))
+
+    python_taipei = save_search(name="Python in Taipei", required_skills="python", location="taipei")
+    active_designer = save_search(name="Designer", title="Designer", status="ACTIVE")
+    everything = save_search(name="Everything")
+
+    python_job = create("Backend Engineer", ["Python"])
+    other_city = create("Backend Engineer", ["Python"], location="Remote")
+    scheduled = create("UX Designer", ["Figma"], posting_date=now + timedelta(hours=1), is_scheduled=True)
+    create("Old Designer", ["Figma"], posting_date=now - timedelta(days=40), expiration_date=now - timedelta(days=1))
+    assert matched(python_taipei) == {python_job.id}
+    # 排程中的職缺還不符合 status=active，到發布時間由狀態更新批次轉為上架後才符合
+    assert matched(active_designer) == set()
+    assert matched(everything) == {python_job.id, other_city.id, scheduled.id}
+
+    # 只有反向索引鍵出現在職缺中的搜尋會成為候選
+    designer_key = match_key({"title": "Designer", "status": "active"})
+    assert designer_key not in job_keys(facets.job_values(python_job), "active")
+    assert designer_key in job_keys(facets.job_values(scheduled), "active")
+
+    Job.objects.filter(id=scheduled.id).update(posting_date=now - timedelta(minutes=1))
+    call_command("update_job_status")
+    assert matched(active_designer) == {scheduled.id}
+
+    # 再次上架不會重複記錄
+    python_job.is_active = False
+    python_job.save()
+    python_job.is_active = True
+    python_job.save()
+    assert SavedSearchMatch.objects.filter(search_id=python_taipei).count() == 1
+
+
+@pytest.mark.django_db
+def test_saved_search_api(authenticated_client):
+    from jobs.models import SavedSearch
+
+    response = authenticated_client.post("/jobs/saved-searches", json={"name": "Expired", "status": "expired"})
+    assert response.status_code == 400
+    response = authenticated_client.post("/jobs/saved-searches", json={"name": "  "})
+    assert response.status_code == 400
+
+    response = authenticated_client.post("/jobs/saved-searches",
+                                         json={"name": "Go", "required_skills": "Go", "salary_min_gte": 50000})
+    assert response.status_code == 201, response.content
+    search = response.json()
+    assert search["filters"] == {"required_skills": "Go", "salary_min_gte": 50000}
+    assert [item["id"] for item in authenticated_client.get("/jobs/saved-searches").json()] == [search["id"]]
+
+    exp_dt = timezone.now() + timedelta(days=30)
+    job = Job.objects.create(title="Go Developer", description="D", company_name="C", location="L", salary_range="60k-80k USD",
+                             expiration_date=exp_dt, required_skills=["Go"])
+    response = authenticated_client.get(f"/jobs/saved-searches/{search['id']}/matches?pending=true")
+    assert response.status_code == 200, response.content
+    assert [(item["job_id"], item["delivered_at"]) for item in response.json()["items"]] == [(job.id, None)]
+    SavedSearch.objects.get(id=search["id"]).matches.update(delivered_at=timezone.now())
+    assert authenticated_client.get(f"/jobs/saved-searches/{search['id']}/matches?pending=true").json()["count"] == 0
+
+    other = User.objects.create_user(username="other", password="otherpassword123")
+    other_search = SavedSearch.objects.create(user=other, name="Other", filters={})
+    assert authenticated_client.delete(f"/jobs/saved-searches/{other_search.id}").status_code == 404
+    assert authenticated_client.get(f"/jobs/saved-searches/{other_search.id}/matches").status_code == 404
+    assert authenticated_client.delete(f"/jobs/saved-searches/{search['id']}").status_code == 204
+    assert authenticated_client.get("/jobs/saved-searches").json() == []
+
+
+# --- Duplicate Detection Tests --- #
+@pytest.mark.django_db
+def test_create_job_rejects_near_duplicate_from_same_company(authenticated_client, settings):
+    from jobs.management.commands.seed_jobs import SENTENCES
+    from jobs.models import JobFingerprint
+
+    description = " ".join(SENTENCES[:8])
+    job_data = {
+        "title": "Senior Backend Engineer",
+        "description": description,
+        "location": "Taipei",
+        "salary_range": "100k-150k USD",
+        "company_name": "Pay Co.",
+        "expiration_date": (timezone.now() + timedelta(days=30)).isoformat(),
+        "required_skills": ["Python"],
+    }
+    response = authenticated_client.post("/jobs", json=job_data)
+    assert response.status_code == 201, response.content
+    original_id = response.json()["id"]
+
+    repost = {**job_data, "title": "Senior Backend Engineer (Remote)", "description": description + " Apply today!"}
+    response = authenticated_client.post("/jobs", json=repost)
+    assert response.status_code == 409, response.content
+    assert response.json()["duplicate_of"] == original_id
+
+    # 其他公司或內容不同的職缺不受影響
+    response = authenticated_client.post("/jobs", json={**repost, "company_name": "Other Co."})
+    assert response.status_code == 201, response.content
+    response = authenticated_client.post("/jobs", json={**job_data, "title": "Pastry Cook",
+                                                        "description": "Bake bread and cakes every morning."})
+    assert response.status_code == 201, response.content
+
+    # flag 模式照常建立並記錄重複的職缺
+    settings.JOBS_DUPLICATE_ACTION = "flag"
+    response = authenticated_client.post("/jobs", json=repost)
+    assert response.status_code == 201, response.content
+    assert JobFingerprint.objects.get(job_id=response.json()["id"]).duplicate_of == original_id
+
+    # 原本的職缺刪除後不再視為重複
+    settings.JOBS_DUPLICATE_ACTION = "reject"
+    Job.objects.filter(id__in=[original_id, response.json()["id"]]).delete()
+    assert authenticated_client.post("/jobs", json=repost).status_code == 201
+
+
+@pytest.mark.django_db
+def test_dedupe_jobs_command_streams_existing_jobs():
+    from io import StringIO
+    from django.core.management import call_command
+    from jobs.management.commands.seed_jobs import SENTENCES
+    from jobs.models import JobFingerprint
+
+    now = timezone.now()
+    description = " ".join(SENTENCES[8:])
+
+    def create(title, company, **kwargs):
+        return Job.objects.create(title=title, description=description, company_name=company, location="L",
+                                  salary_range="S", expiration_date=kwargs.pop("expiration_date", now + timedelta(days=30)),
+                                  **kwargs)
+
+    original = create("Data Engineer", "Warehouse Inc.")
+    duplicates = [create("Data Engineer II", "Warehouse Inc."), create("Data Engineer", "warehouse  inc.")]
+    other_company = create("Data Engineer", "Lakehouse Ltd.")
+    expired = create("Data Engineer", "Warehouse Inc.", posting_date=now - timedelta(days=40),
+                     expiration_date=now - timedelta(days=1))
+
+    out = StringIO()
+    call_command("dedupe_jobs", "--batch-size", "2", "--silent", stdout=out)
+    assert "4 筆" in out.getvalue() and "2 筆" in out.getvalue()
+    assert dict(JobFingerprint.objects.exclude(duplicate_of=None).values_list("job_id", "duplicate_of")) == {
+        job.id: original.id for job in duplicates}
+    assert not JobFingerprint.objects.filter(job_id=expired.id).exists()
+
+    call_command("dedupe_jobs", "--delete", "--silent", stdout=StringIO())
+    assert set(Job.objects.values_list("id", flat=True)) == {original.id, other_company.id, expired.id}
+
+# --- Change Feed Tests --- #
+@pytest.mark.django_db
+def test_job_changes_feed_pages_upserts_and_deletes(authenticated_client):
+    job_data = {
+        "title": "Feed Engineer",
+        "description": "Streams changes.",
+        "location": "Taipei",
+        "salary_range": "100k-150k USD",
+        "company_name": "Feed Co.",
+        "expiration_date": (timezone.now() + timedelta(days=30)).isoformat(),
+    }
+    start = authenticated_client.get("/jobs/changes?limit=1000").json()
+    while start["has_more"]:
+        start = authenticated_client.get(f"/jobs/changes?since={start['next_cursor']}&limit=1000").json()
+    since = start["next_cursor"]
+
+    first = authenticated_client.post("/jobs", json=job_data).json()
+    second = authenticated_client.post("/jobs", json={**job_data, "title": "Pipeline Engineer",
+                                                       "description": "Moves data around."}).json()
+    response = authenticated_client.patch(f"/jobs/{first['id']}", json={"version": first["version"], "location": "Remote"})
+    assert response.status_code == 200, response.content
+    assert authenticated_client.delete(f"/jobs/{second['id']}").status_code == 204
+
+    # 第一頁是兩筆新增：附上職缺目前的內容，之後已刪除的職缺略過，刪除紀錄在下一頁
+    page = authenticated_client.get(f"/jobs/changes?since={since}&limit=2").json()
+    assert [(item["operation"], item["job_id"]) for item in page["items"]] == [("upsert", first["id"])]
+    assert page["items"][0]["job"]["location"] == "Remote"
+    assert page["has_more"]
+    page = authenticated_client.get(f"/jobs/changes?since={page['next_cursor']}&limit=10").json()
+    assert [(item["operation"], item["job_id"]) for item in page["items"]] == [
+        ("upsert", first["id"]), ("delete", second["id"])]
+    assert page["items"][1]["job"] is None and not page["has_more"]
+
+    # 同一頁中同一職缺只保留最後一筆
+    page = authenticated_client.get(f"/jobs/changes?since={since}&limit=10").json()
+    assert [(item["operation"], item["job_id"]) for item in page["items"]] == [
+        ("upsert", first["id"]), ("delete", second["id"])]
+
+    assert authenticated_client.get("/jobs/changes?since=-1").status_code == 400
+    assert authenticated_client.get("/jobs/changes?limit=0").status_code == 400
+
+
+@pytest.mark.django_db
+def test_status_sweep_and_compaction_of_job_changes():
+    from io import StringIO
+    from django.core.management import call_command
+    from jobs.models import JobChange
+    from jobs.statuses import update_job_statuses
+
+    now = timezone.now()
+    job = Job.objects.create(title="Sweep", description="D", company_name="C", location="L", salary_range="S",
+                             posting_date=now - timedelta(days=10), expiration_date=now - timedelta(days=1))
+    scheduled = Job.objects.create(title="Later", description="D", company_name="C", location="L", salary_range="S",
+                                   is_scheduled=True, posting_date=now - timedelta(minutes=1),
+                                   expiration_date=now + timedelta(days=10))
+    assert JobChange.objects.filter(job_id=job.id).count() == 1
+
+    expired, activated, _ = update_job_statuses(now)
+    assert (expired, activated) == (1, 1)
+    assert JobChange.objects.filter(job_id=job.id).count() == 2
+    assert JobChange.objects.filter(job_id=scheduled.id).count() == 2
+    # 已是過期狀態的職缺不再重複更新與記錄
+    assert update_job_statuses(now)[:2] == (0, 0)
+    assert JobChange.objects.filter(job_id=job.id).count() == 2
+
+    job_id = job.id
+    job.delete()
+    call_command("compact_job_changes", "--batch-size", "1", "--silent", stdout=StringIO())
+    assert list(JobChange.objects.filter(job_id__in=[job_id, scheduled.id]).order_by("id").values_list(
+        "job_id", "operation")) == [(scheduled.id, "upsert"), (job_id, "delete")]
+
+@pytest.mark.django_db
+def test_patch_status_changes_record_status_events(authenticated_client):
+    """PATCH 造成的狀態轉換與 PUT 相同記錄為 status 事件，其他修改為 updated"""
+    from jobs.models import JobChange
+
+    now = timezone.now()
+    job = Job.objects.create(title="Scheduled", description="D", company_name="C", location="L", salary_range="S",
+                             posting_date=now + timedelta(days=2), expiration_date=now + timedelta(days=30),
+                             is_scheduled=True)
+
+    def patch(version, **data):
+        response = authenticated_client.patch(f"/jobs/{job.id}", json={"version": version, **data})
+        assert response.status_code == 200, response.content
+        return JobChange.objects.filter(job_id=job.id).latest("id").event
+
+    assert patch(1, is_scheduled=False) == JobChange.STATUS
+    assert patch(2, title="Renamed") == JobChange.UPDATED
+    assert patch(3, expiration_date=(now + timedelta(days=60)).isoformat()) == JobChange.UPDATED
+    assert patch(4, is_active=False) == JobChange.STATUS
+
+# --- Event Stream Tests --- #
+@pytest.mark.django_db
+def test_job_events_stream_filters_and_resumes(authenticated_client, settings):
+    import asyncio
+    import json
+    from asgiref.sync import async_to_sync, sync_to_async
+    from django.test import AsyncClient
+    from jobs.events import job_events
+    from jobs.statuses import update_job_statuses
+
+    settings.JOBS_EVENTS_POLL_INTERVAL = 0.05
+    headers = {"Authorization": authenticated_client.headers["Authorization"]}
+    now = timezone.now()
+
+    def create(title, company, **kwargs):
+        return Job.objects.create(title=title, description="D", company_name=company, location="L", salary_range="S",
+                                  expiration_date=now + timedelta(days=10), **kwargs)
+
+    async def read_events(response, count):
+        events = []
+        while len(events) < count:
+            chunk = (await asyncio.wait_for(anext(response.streaming_content), 5)).decode()
+            if chunk.startswith("id:"):
+                lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+                events.append((int(lines["id"]), lines["event"], json.loads(lines["data"])))
+        return events
+
+    async def scenario():
+        client = AsyncClient()
+        response = await client.get("/api/jobs/events?company_name=Stream Co.&status=active,scheduled", headers=headers)
+        assert response.status_code == 200 and response["Content-Type"] == "text/event-stream"
+        assert (await anext(response.streaming_content)).startswith(b"retry:")
+
+        posting_date = timezone.now() + timedelta(seconds=0.5)
+        scheduled = await sync_to_async(create)("Launch", "Stream Co.", is_scheduled=True, posting_date=posting_date)
+        await sync_to_async(create)("Other", "Other Co.")
+        [created] = await read_events(response, 1)
+        assert (created[1], created[2]["job_id"], created[2]["status"]) == ("created", scheduled.id, "scheduled")
+
+        # 排程職缺到發布時間後由狀態更新轉為上架
+        await asyncio.sleep((posting_date - timezone.now()).total_seconds())
+        await sync_to_async(update_job_statuses)(timezone.now())
+        [activated] = await read_events(response, 1)
+        assert (activated[1], activated[2]["job_id"], activated[2]["status"]) == ("status", scheduled.id, "active")
+        await response.streaming_content.aclose()
+
+        # 以 Last-Event-ID 重新連線，補送中斷期間的事件
+        second = await sync_to_async(create)("Second", "Stream Co.")
+        await sync_to_async(Job.objects.filter(id=scheduled.id).delete)()
+        response = await client.get("/api/jobs/events?company_name=stream co.",
+                                    headers={**headers, "Last-Event-ID": str(activated[0])})
+        assert (await anext(response.streaming_content)).startswith(b"retry:")
+        resumed = await read_events(response, 2)
+        assert [(event[1], event[2]["job_id"]) for event in resumed] == [("created", second.id), ("deleted", scheduled.id)]
+        await response.streaming_content.aclose()
+
+    async_to_sync(scenario)()
+    assert not job_events._subscribers
+    # WSGI 無法長時間保持連線
+    from django.test import Client
+    assert Client().get("/api/jobs/events", headers=headers).status_code == 400
+
+
+# --- Read Model Tests --- #
+@pytest.mark.django_db
+def test_read_model_matches_database_listing(authenticated_client, settings):
+    from jobs.readmodel import active_jobs
+    from jobs.statuses import update_job_statuses
+
+    now = timezone.now()
+    posted = now - timedelta(days=1)
+    companies = ["Acme", "Globex", "Initech"]
+    skills = [["Python", "Django"], ["Go"], ["Python", "AWS"], []]
+    for index in range(24):
+        Job.objects.create(
+            title=f"{'Senior ' if index % 3 == 0 else ''}Backend Engineer {index % 4}", description="D",
+            company_name=companies[index % 3], location=["Taipei", "Remote"][index % 2],
+            salary_range=f"{40 + index}k - {60 + index}k USD" if index % 5 else "Negotiable",
+            salary_min=40000 + index * 1000 if index % 5 else None, salary_max=60000 + index * 1000 if index % 5 else None,
+            salary_currency="USD" if index % 5 else None, required_skills=skills[index % 4],
+            # 多筆相同的發布日期，分頁順序取決於 id
+            posting_date=posted if index % 2 else posted - timedelta(hours=index),
+            expiration_date=now + timedelta(days=index % 6 + 1),
+        )
+    Job.objects.create(title="Backend Engineer", description="D", company_name="Acme", location="Taipei",
+                       salary_range="S", is_active=False, expiration_date=now + timedelta(days=3))
+    Job.objects.create(title="Backend Engineer", description="D", company_name="Acme", location="Taipei",
+                       salary_range="S", posting_date=now - timedelta(days=10), expiration_date=now - timedelta(days=1))
+
+    queries = [
+        "status=active", "status=active&page=2", "status=active&page=3&order_by=posting_date",
+        "status=active&order_by=expiration_date", "status=active&order_by=-expiration_date&page=2",
+        "status=active&title=senior&company_name=acme", "status=active&location=REMOTE&order_by=-posting_date",
+        "status=active&required_skills=python,django", "status=active&required_skills=aws",
+        "status=active&salary_min_gte=45000&salary_max_lte=80000", "status=active&salary_currency=usd",
+        "status=active&salary_range=negotiable", "status=active&fields=id,title,status,required_skills",
+        "status=active&title=nothing",
+    ]
+
+    def responses():
+        result = {}
+        for query in queries:
+            response = authenticated_client.get(f"/jobs?{query}")
+            result[query] = (response.status_code, response.json())
+        return result
+
+    def compare():
+        settings.JOBS_READ_MODEL = False
+        expected = responses()
+        settings.JOBS_READ_MODEL = True
+        assert responses() == expected
+
+    settings.JOBS_READ_MODEL = True
+    index = active_jobs.load()
+    assert len(index) == 24
+    assert active_jobs.query({"status": "active"}, None, timezone.now()).count() == 24
+    compare()
+
+    # 載入後的新增、修改、刪除與狀態排程都從變更紀錄套用
+    job = Job.objects.create(title="Senior Backend Engineer", description="D", company_name="Acme", location="Taipei",
+                             salary_range="S", required_skills=["Python"], expiration_date=now + timedelta(days=2))
+    response = authenticated_client.patch(f"/jobs/{job.id}", json={"location": "Remote", "version": job.version})
+    assert response.status_code == 200, response.content
+    Job.objects.filter(company_name="Globex").first().delete()
+    soon = Job.objects.filter(company_name="Initech").first()
+    Job.objects.filter(id=soon.id).update(expiration_date=now + timedelta(seconds=1))
+    update_job_statuses(now + timedelta(seconds=2))
+    compare()
+    assert active_jobs.index is index
+    assert len(index.rows_for([job.id])) == 1
+    active_jobs.clear()
+
+
+# --- Admin Tests --- #
+@pytest.mark.django_db
+def test_admin_changelist_filters_search_and_batched_actions(settings):
+    from django.core.cache import cache
+    from django.test import Client
+    from jobs.models import ArchivedJob, JobChange
+
+    settings.JOBS_ADMIN_COUNT_LIMIT = 2
+    settings.JOBS_ADMIN_FILTER_CHOICES = 2
+    cache.clear()
+    now = timezone.now()
+
+    def create(title, company, **kwargs):
+        return Job.objects.create(title=title, description="D", company_name=company, location="Taipei",
+                                  salary_range="S", expiration_date=kwargs.pop("expiration_date", now + timedelta(days=30)),
+                                  **kwargs)
+
+    active = create("Backend Engineer", "Acme Labs")
+    scheduled = create("Data Engineer", "Globex", is_scheduled=True, posting_date=now + timedelta(days=1))
+    expired = create("Designer", "Initech", posting_date=now - timedelta(days=10), expiration_date=now - timedelta(days=1))
+    admin_user = User.objects.create_superuser("admin", "admin@example.com", "adminpassword123")
+    client = Client()
+    client.force_login(admin_user)
+
+    response = client.get("/admin/jobs/job/")
+    assert response.status_code == 200
+    content = response.content.decode()
+    # 計數超過上限時不計算確切筆數；公司的相異值超過選項上限，改為自動完成的輸入框
+    assert "More than 2 jobs" in content
+    assert 'id="company_name-filter"' in content and "?location=Taipei" in content
+
+    response = client.get("/admin/jobs/job/?q=engineer&status=active")
+    assert list(response.context["cl"].result_list) == [active]
+    response = client.get("/admin/jobs/job/?company_name=labs")
+    assert list(response.context["cl"].result_list) == [active]
+    response = client.get("/admin/jobs/job/autocomplete/company_name/?term=glo")
+    assert response.json() == {"results": ["Globex"]}
+
+    def run_action(action, *jobs, select_across=False):
+        data = {"action": action, "_selected_action": [job.id for job in jobs], "index": 0}
+        if select_across:
+            data["select_across"] = "1"
+        response = client.post("/admin/jobs/job/", data)
+        assert response.status_code == 302, response.content
+
+    run_action("activate_jobs", scheduled, expired)
+    scheduled.refresh_from_db()
+    assert scheduled.status == "Active" and scheduled.posting_date <= timezone.now()
+    assert JobChange.objects.filter(job_id=scheduled.id).latest("id").event == "status"
+    expired.refresh_from_db()
+    assert expired.status == "Expired"
+
+    run_action("expire_jobs", active)
+    active.refresh_from_db()
+    assert not active.is_active and active.expiration_date <= timezone.now()
+
+    # 選取所有結果時只搬移已到期的職缺
+    run_action("archive_jobs", active, select_across=True)
+    assert set(ArchivedJob.objects.values_list("id", flat=True)) == {active.id, expired.id}
+    assert list(Job.objects.values_list("id", flat=True)) == [scheduled.id]
+    cache.clear()
+
+# --- Write Coalescing Tests --- #
+@pytest.mark.django_db(transaction=True)
+def test_write_coalescer_groups_concurrent_writes(authenticated_client):
+    """並行的寫入在寫入執行緒中分組提交，每個呼叫端取得自己的結果或例外，失敗的寫入不影響同批其他寫入"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from django.db import connection
+    from django.test.utils import override_settings
+    from jobs.coalescer import atomic_write
+    from jobs.models import JobChange
+
+    groups = []
+    start = threading.Barrier(8)
+    expiration = timezone.now() + timedelta(days=30)
+
+    def create(index):
+        groups.append((threading.current_thread().name, id(connection.atomic_blocks[0]), len(connection.atomic_blocks)))
+        if index == 3:
+            raise ValueError("invalid job")
+        return Job.objects.create(title=f"Coalesced {index}", description="d", company_name=f"Company {index}",
+                                  location="Remote", expiration_date=expiration)
+
+    def submit(index):
+        start.wait()
+        return atomic_write(create, index)
+
+    with override_settings(JOBS_WRITE_COALESCING=True, JOBS_WRITE_COALESCE_WINDOW_MS=200):
+        with ThreadPoolExecutor(8) as pool:
+            futures = [pool.submit(submit, index) for index in range(8)]
+        for index, future in enumerate(futures):
+            if index == 3:
+                with pytest.raises(ValueError):
+                    future.result()
+            else:
+                assert future.result().title == f"Coalesced {index}"
+
+        assert {name for name, _, _ in groups} == {"jobs-write-coalescer"}
+        assert all(depth == 2 for _, _, depth in groups)  # 每筆寫入在群組交易中的 savepoint 執行
+        assert len({group for _, group, _ in groups}) < 8
+        assert Job.objects.count() == 7
+        assert JobChange.objects.filter(event="created").count() == 7
+
+        # API 的新增與修改同樣經由寫入執行緒，回應內容不變
+        payload = {"title": "Via API", "description": "d", "company_name": "API Co", "location": "Remote",
+                   "salary_range": "50k-60k USD", "expiration_date": expiration.isoformat()}
+        response = authenticated_client.post("/jobs", json=payload)
+        assert response.status_code == 201, response.content
+        job_id = response.json()["id"]
+        response = authenticated_client.put(f"/jobs/{job_id}", json={"title": "Via API (edited)"})
+        assert response.status_code == 200 and response.json()["title"] == "Via API (edited)"
+        assert Job.objects.get(id=job_id).title == "Via API (edited)"
+
+# --- Query Deadline Tests --- #
+# 約 0.4 秒的查詢條件
+SLOW_CONDITION = ("(WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter WHERE x < 1000000) "
+                  "SELECT count(*) FROM counter) > 0")
+
+
+@pytest.mark.django_db
+def test_query_deadline_interrupts_runaway_statement():
+    from django.db import connection
+    from jobs.deadlines import QueryDeadlineExceeded, exceeded_counts, query_deadline
+
+    before = exceeded_counts().get("list", 0)
+    with pytest.raises(QueryDeadlineExceeded):
+        with query_deadline("list", 0.01):
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT {SLOW_CONDITION}")
+    assert exceeded_counts()["list"] == before + 1
+
+    # 中斷後連線仍可使用，也不再受期限限制
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        assert cursor.fetchone() == (1,)
+    with query_deadline("list", None), connection.cursor() as cursor:
+        cursor.execute("SELECT 2")
+        assert cursor.fetchone() == (2,)
+
+
+@pytest.mark.django_db
+def test_list_jobs_deadline_returns_503_except_for_staff(authenticated_client, test_user, settings, monkeypatch):
+    from jobs import api as jobs_api
+
+    filter_jobs = jobs_api.filter_jobs
+
+    def slow_filter_jobs(queryset, **kwargs):
+        # 以描述篩選時加上耗時的條件，模擬大量資料上的全文比對
+        queryset = filter_jobs(queryset, **kwargs)
+        return queryset.extra(where=[SLOW_CONDITION]) if kwargs.get("description") else queryset
+
+    monkeypatch.setattr(jobs_api, "filter_jobs", slow_filter_jobs)
+    settings.JOBS_QUERY_DEADLINES = {"list": 0.1}
+    settings.JOBS_QUERY_DEADLINES_STAFF = {}
+    Job.objects.create(title="Engineer", description="Scalable systems", company_name="Acme", location="Remote",
+                       salary_range="S", expiration_date=timezone.now() + timedelta(days=5))
+
+    assert authenticated_client.get("/jobs?title=engineer").status_code == 200
+    response = authenticated_client.get("/jobs?description=scalable&required_skills=Python,Go")
+    assert response.status_code == 503
+    assert "time budget" in response.json()["message"]
+    assert authenticated_client.get("/jobs/deadlines").status_code == 403
+
+    # staff 不受限制（匯出與後台查詢需要完整結果）
+    test_user.is_staff = True
+    test_user.save()
+    settings.JOBS_QUERY_DEADLINES_STAFF = {"list": None}
+    response = authenticated_client.get("/jobs?description=scalable")
+    assert response.status_code == 200 and response.json()["count"] == 1
+    response = authenticated_client.get("/jobs/deadlines")
+    assert response.status_code == 200
+    assert response.json()["budgets"] == {"list": 0.1} and response.json()["exceeded"]["list"] >= 1
+
+
+# --- Description Compression Tests --- #
+DESCRIPTION = ("We offer flexible working hours, remote options and a learning budget. "
+               "Own features end to end, from discovery to monitoring in production. ")
+
+
+@pytest.mark.django_db
+def test_compressed_descriptions_stay_readable_and_searchable(authenticated_client, settings, monkeypatch):
+    from django.core.cache import cache
+    from jobs import compression
+
+    cache.clear()
+    monkeypatch.setattr(compression, "_dictionaries", {0: b""})
+    settings.JOBS_COMPRESS_DESCRIPTIONS = True
+    compression.create_dictionary([DESCRIPTION * 2, DESCRIPTION + "Experience with Kubernetes is required."])
+
+    description = DESCRIPTION + "You will automate infrastructure with Terraform."
+    response = authenticated_client.post("/jobs", json={
+        "title": "Platform Engineer",
+        "description": description,
+        "location": "Remote",
+        "salary_range": "100k-150k USD",
+        "company_name": "Compressed Inc.",
+        "expiration_date": (timezone.now() + timedelta(days=30)).isoformat(),
+        "required_skills": ["Python"],
+    })
+    assert response.status_code == 201
+    job_id = response.json()["id"]
+    stored = Job.objects.values("description", "description_compressed").get(id=job_id)
+    assert stored["description"] == "" and len(stored["description_compressed"]) < len(description) / 2
+
+    # 讀取屬性時才解壓縮
+    job = Job.objects.get(id=job_id)
+    assert job.__dict__["description"] == ""
+    assert job.description == description
+    assert authenticated_client.get(f"/jobs/{job_id}").json()["description"] == description
+    assert authenticated_client.get(f"/jobs/{job_id}?fields=id,description").json()["description"] == description
+
+    # 描述篩選與全文索引比對解壓縮後的內文
+    assert authenticated_client.get("/jobs?description=with terraform").json()["count"] == 1
+    assert authenticated_client.get("/jobs?q=terraform").json()["count"] == 1
+
+    # PATCH 寫入的新描述同樣壓縮，全文索引跟著更新
+    response = authenticated_client.patch(f"/jobs/{job_id}", json={"version": 1, "description": DESCRIPTION + "Ansible."})
+    assert response.status_code == 200 and response.json()["description"] == DESCRIPTION + "Ansible."
+    assert Job.objects.filter(id=job_id, description="", description_compressed__isnull=False).exists()
+    assert authenticated_client.get("/jobs?q=terraform").json()["count"] == 0
+    assert authenticated_client.get("/jobs?q=ansible").json()["count"] == 1
+
+
+@pytest.mark.django_db
+def test_compress_job_descriptions_command_backfills_and_restores(settings, monkeypatch):
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+    from jobs import compression
+    from jobs.models import ArchivedJob, DescriptionDictionary
+
+    cache.clear()
+    monkeypatch.setattr(compression, "_dictionaries", {0: b""})
+    now = timezone.now()
+    jobs = [
+        Job.objects.create(title=f"Engineer {index}", description=DESCRIPTION * (index + 1), company_name="Acme",
+                           location="Remote", salary_range="S", expiration_date=now + timedelta(days=5))
+        for index in range(3)
+    ]
+    archived = ArchivedJob.objects.create(title="Archived", description=DESCRIPTION + "Archived.", company_name="Acme",
+                                          location="Remote", salary_range="S", expiration_date=now - timedelta(days=5))
+    with pytest.raises(CommandError):
+        call_command("compress_job_descriptions", silent=True)
+
+    settings.JOBS_COMPRESS_DESCRIPTIONS = True
+    call_command("compress_job_descriptions", silent=True)
+    assert DescriptionDictionary.objects.count() == 1
+    assert not Job.objects.filter(description_compressed__isnull=True).exists()
+    assert [job.description for job in Job.objects.order_by("id")] == [job.description for job in jobs]
+    assert Job.objects.only("title", "description").get(id=jobs[1].id).description == DESCRIPTION * 2
+    assert ArchivedJob.objects.get(id=archived.id).description == DESCRIPTION + "Archived."
+    texts = Job.objects.annotate(description_text=compression.description_text()).order_by("id")
+    assert list(texts.values_list("description_text", flat=True)) == [job.description for job in jobs]
+
+    call_command("compress_job_descriptions", decompress=True, silent=True)
+    assert not Job.objects.filter(description_compressed__isnull=False).exists()
+    assert list(Job.objects.order_by("id").values_list("description", flat=True)) == [job.description for job in jobs]
+    assert Job.objects.filter(description__contains="Archived.").count() == 0
+    assert ArchivedJob.objects.values_list("description", flat=True).get(id=archived.id) == DESCRIPTION + "Archived."
+
+# --- Sharding Tests --- #
+SHARD_ALIAS = "jobs_shard_1"
+
+
+@pytest.fixture(scope="module")
+def shard_database(tmp_path_factory, django_db_setup, django_db_blocker):
+    """第二個分片的資料庫：需在測試宣告 databases 之前加入連線設定，平行查詢的執行緒才能連線"""
+    from django.core.management import call_command
+    from django.db import connections
+    from django.test.utils import override_settings
+
+    connections.settings[SHARD_ALIAS] = {**connections.settings["default"],
+                                         "NAME": str(tmp_path_factory.mktemp("shards") / "shard.sqlite3")}
+    with django_db_blocker.unblock(), override_settings(JOBS_SHARD_DATABASES=["default", SHARD_ALIAS]):
+        call_command("migrate", database=SHARD_ALIAS, verbosity=0)
+    yield SHARD_ALIAS
+    connections[SHARD_ALIAS].close()
+    del connections.settings[SHARD_ALIAS]
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", SHARD_ALIAS])
+def test_sharded_jobs_route_by_company_and_merge_listings(shard_database, authenticated_client):
+    """職缺依公司寫入各自的分片，id 帶有分片編號；依 id 的讀寫到對應的分片，列表、facets 與狀態更新涵蓋所有分片"""
+    from django.core.cache import cache
+    from django.test.utils import override_settings
+    from jobs import sharding, statuses
+    from jobs.similar import similar_index
+    from jobs.suggest import suggest_index
+
+    cache.clear()
+    alias = shard_database
+    with override_settings(JOBS_SHARD_DATABASES=["default", alias], JOBS_SIMILAR_INDEX_PATH=None):
+        companies = {}
+        for index in range(100):
+            companies.setdefault(sharding.shard_for_company(f"Company {index}"), f"Company {index}")
+        expiration = (timezone.now() + timedelta(days=30)).isoformat()
+        ids = {}
+        for shard, company in companies.items():
+            for index in range(3):
+                payload = {"title": f"{company} Engineer {index}", "description": "d", "company_name": company,
+                           "location": "Remote", "salary_range": "50k-60k USD", "expiration_date": expiration}
+                response = authenticated_client.post("/jobs", json=payload)
+                assert response.status_code == 201, response.content
+                ids.setdefault(shard, []).append(response.json()["id"])
+
+        assert all(job_id < 2 ** 48 for job_id in ids["default"])
+        assert all(job_id >> sharding.SHARD_BITS == 1 for job_id in ids[alias])
+        assert set(Job.objects.using(alias).values_list("id", flat=True)) == set(ids[alias])
+        assert not Job.objects.filter(id__in=ids[alias]).exists()
+
+        shard_job = ids[alias][0]
+        assert authenticated_client.get(f"/jobs/{shard_job}").json()["company_name"] == companies[alias]
+        response = authenticated_client.patch(f"/jobs/{shard_job}", json={"version": 1, "title": "Patched"})
+        assert response.status_code == 200 and response.json()["version"] == 2
+        response = authenticated_client.put(f"/jobs/{shard_job}", json={"title": "Replaced"})
+        assert response.status_code == 200 and response.json()["title"] == "Replaced"
+        batch = authenticated_client.get(f"/jobs/batch?ids={shard_job},{ids['default'][0]}").json()
+        assert [item["id"] for item in batch["items"]] == [shard_job, ids["default"][0]]
+
+        # 前綴建議與相似職缺包含所有分片的職缺
+        suggest_index.clear()
+        similar_index.clear()
+        suggested = authenticated_client.get("/jobs/suggest?field=company_name&prefix=Company").json()
+        assert {item["value"] for item in suggested} == set(companies.values())
+        similar = authenticated_client.get(f"/jobs/{ids['default'][0]}/similar").json()
+        assert set(ids[alias][1:]) <= {item["id"] for item in similar}
+        suggest_index.clear()
+        similar_index.clear()
+
+        # 各分片的結果依排序合併，分頁不重複也不遺漏
+        rows = list(Job.objects.values_list("posting_date", "id")) + list(Job.objects.using(alias).values_list("posting_date", "id"))
+        expected = [job_id for _, job_id in sorted(rows, reverse=True)]
+        response = authenticated_client.get("/jobs?page=1&page_size=4").json()
+        assert response["count"] == 6
+        pages = [item["id"] for item in response["items"]]
+        pages += [item["id"] for item in authenticated_client.get("/jobs?page=2&page_size=4").json()["items"]]
+        assert pages == expected
+        ascending = authenticated_client.get("/jobs?order_by=posting_date&fields=id,title").json()["items"]
+        assert [item["id"] for item in ascending] == expected[::-1]
+        assert authenticated_client.get(f"/jobs?company_name={companies[alias]}").json()["count"] == 3
+        assert authenticated_client.get("/jobs/facets").json()["count"] == 6
+
+        # 狀態更新處理每個分片
+        Job.objects.using(alias).filter(id=shard_job).update(expiration_date=timezone.now() - timedelta(days=1))
+        assert statuses.update_job_statuses(timezone.now())[:2] == (1, 0)
+        assert not Job.objects.using(alias).get(id=shard_job).is_active
+
+        assert authenticated_client.delete(f"/jobs/{shard_job}").status_code == 204
+        assert authenticated_client.get(f"/jobs/{shard_job}").status_code == 404
+
+        # 超過保存期限的職缺在每個分片都會刪除
+        from io import StringIO
+        from django.core.management import call_command
+        from jobs.models import ArchivedJob
+
+        old = {"description": "D", "location": "L", "salary_range": "S", "company_name": companies[alias],
+               "posting_date": timezone.now() - timedelta(days=900), "expiration_date": timezone.now() - timedelta(days=800)}
+        old_job = Job.objects.create(title="Old", **old)
+        old_archived = ArchivedJob.objects.using(alias).create(title="Old Archived", **old)
+        assert old_job._state.db == alias
+        call_command("purge_jobs", "--pause", "0", "--silent", stdout=StringIO())
+        assert not Job.objects.using(alias).filter(id=old_job.id).exists()
+        assert not ArchivedJob.objects.using(alias).filter(id=old_archived.id).exists()
+        assert Job.objects.using(alias).count() == 2
+
+        # 重建 trigram 索引時保留只出現在分片的值
+        Job.objects.create(title="Gopher", description="D", location="Shard Town", salary_range="S",
+                           company_name=companies[alias], expiration_date=timezone.now() + timedelta(days=5))
+        call_command("rebuild_search_index", stdout=StringIO())
+        assert authenticated_client.get("/jobs?location=Shard Town").json()["count"] == 1
+        assert authenticated_client.get("/jobs?title=Gopher").json()["count"] == 1
+
+        # 重複刊登的掃描與刪除涵蓋每個分片
+        from jobs.management.commands.seed_jobs import SENTENCES
+
+        reposts = [Job.objects.create(title="Data Engineer", description=" ".join(SENTENCES[8:]), location="L",
+                                      salary_range="S", company_name=companies[alias],
+                                      expiration_date=timezone.now() + timedelta(days=5)) for _ in range(2)]
+        call_command("dedupe_jobs", "--delete", "--silent", stdout=StringIO())
+        assert Job.objects.using(alias).filter(id=reposts[0].id).exists()
+        assert not Job.objects.using(alias).filter(id=reposts[1].id).exists()
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", SHARD_ALIAS])
+def test_compressed_descriptions_on_shards(shard_database, authenticated_client, settings, monkeypatch):
+    """字典只存在 default：分片上的解壓縮函式到 default 讀取字典，壓縮指令處理每個分片"""
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from jobs import compression, sharding
+
+    cache.clear()
+    alias = shard_database
+    settings.JOBS_SHARD_DATABASES = ["default", alias]
+    monkeypatch.setattr(compression, "_dictionaries", {0: b""})
+    company = next(f"Company {index}" for index in range(100) if sharding.shard_for_company(f"Company {index}") == alias)
+    job = Job.objects.create(title="Engineer", description=DESCRIPTION + "We are hiring.", company_name=company,
+                             location="Remote", salary_range="S", expiration_date=timezone.now() + timedelta(days=5))
+    assert job._state.db == alias
+
+    settings.JOBS_COMPRESS_DESCRIPTIONS = True
+    call_command("compress_job_descriptions", silent=True)
+    assert Job.objects.using(alias).filter(id=job.id, description="", description_compressed__isnull=False).exists()
+
+    # 新行程：記憶體中還沒有字典
+    monkeypatch.setattr(compression, "_dictionaries", {0: b""})
+    assert authenticated_client.get("/jobs?description=hiring").json()["count"] == 1
+    Job.objects.using(alias).filter(id=job.id).update(title="Updated")
+    monkeypatch.setattr(compression, "_dictionaries", {0: b""})
+    job = Job.objects.for_id(job.id).get(id=job.id)
+    job.title = "Saved"
+    job.save()
+    assert authenticated_client.get(f"/jobs/{job.id}").json()["description"] == DESCRIPTION + "We are hiring."
+
+    call_command("compress_job_descriptions", decompress=True, silent=True)
+    assert Job.objects.using(alias).values_list("description", flat=True).get(id=job.id) == DESCRIPTION + "We are hiring."
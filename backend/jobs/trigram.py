@@ -0,0 +1,154 @@
+from django.conf import settings
+from django.db.models import Case, Count, F, FloatField, Max, Q, Value, When
+from django.db.models.functions import Cast
+
+from . import sharding
+from .models import ArchivedJob, Job, SearchTerm, SearchTrigram
+
+# 以 trigram 索引搜尋的欄位
+SEARCH_FIELDS = ("title", "company_name", "location")
+
+# 單一 IN 查詢最多帶入的參數數量，避免超過 SQLite 的參數上限
+_CHUNK_SIZE = 500
+
+
+def trigrams(value):
+    """小寫後每三個連續字元為一個 trigram；少於三個字元時為空集合"""
+    lowered = value.lower()
+    return {lowered[index:index + 3] for index in range(len(lowered) - 2)}
+
+
+def ensure_terms(field, values):
+    """確保 values 都已加入 field 的 trigram 索引，寫入職缺時呼叫"""
+    values = {value for value in values if value}
+    missing = set()
+    ordered = sorted(values)
+    for start in range(0, len(ordered), _CHUNK_SIZE):
+        chunk = ordered[start:start + _CHUNK_SIZE]
+        existing = set(SearchTerm.objects.filter(field=field, value__in=chunk).values_list("value", flat=True))
+        missing.update(value for value in chunk if value not in existing)
+    if not missing:
+        return 0
+
+    # 其他行程可能同時寫入相同的值，兩張表都以唯一限制忽略重複
+    SearchTerm.objects.bulk_create(
+        [SearchTerm(field=field, value=value, trigram_count=len(trigrams(value))) for value in missing],
+        ignore_conflicts=True,
+    )
+    ordered = sorted(missing)
+    for start in range(0, len(ordered), _CHUNK_SIZE):
+        terms = SearchTerm.objects.filter(field=field, value__in=ordered[start:start + _CHUNK_SIZE])
+        SearchTrigram.objects.bulk_create(
+            [SearchTrigram(term_id=term_id, field=field, trigram=trigram)
+             for term_id, value in terms.values_list("id", "value")
+             for trigram in trigrams(value)],
+            ignore_conflicts=True,
+        )
+    return len(missing)
+
+
+def index_job(job):
+    for field in SEARCH_FIELDS:
+        ensure_terms(field, [getattr(job, field)])
+
+
+def rebuild_terms(field):
+    """
+    依目前的職缺與封存職缺（所有分片）補上缺少的值、刪除不再使用的值，回傳 (新增數, 刪除數)。
+    掃描期間寫入的職缺可能新增或重新使用某個值：只刪除掃描開始前已存在的值，刪除前再確認一次沒有職缺使用。
+    """
+    max_id = SearchTerm.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+    used = _used_values(field)
+    added = ensure_terms(field, used)
+    unused = {term_id: value for term_id, value in
+              SearchTerm.objects.filter(field=field, id__lte=max_id).values_list("id", "value") if value not in used}
+    reused = _used_values(field, set(unused.values()))
+    unused = [term_id for term_id, value in unused.items() if value not in reused]
+    for start in range(0, len(unused), _CHUNK_SIZE):
+        SearchTerm.objects.filter(id__in=unused[start:start + _CHUNK_SIZE]).delete()
+    return added, len(unused)
+
+
+def _used_values(field, values=None):
+    """Job 與 ArchivedJob（所有分片）中 field 的相異值；指定 values 時只檢查這些值"""
+    if values is not None and not values:
+        return set()
+    used = set()
+    for model in (Job, ArchivedJob):
+        def distinct(alias):
+            queryset = model.objects.using(alias).order_by()
+            if values is None:
+                return list(queryset.values_list(field, flat=True).distinct())
+            ordered = sorted(values)
+            return [value for start in range(0, len(ordered), _CHUNK_SIZE)
+                    for value in queryset.filter(**{f"{field}__in": ordered[start:start + _CHUNK_SIZE]})
+                    .values_list(field, flat=True).distinct()]
+        for found in sharding.scatter(distinct):
+            used.update(found)
+    return used
+
+
+def substring_terms(field, query):
+    """
+    field 中包含 query（不分大小寫）的相異值。先以 trigram 交集找出候選值，
+    再以 icontains 驗證，結果與直接對職缺做 icontains 相同。
+    """
+    grams = trigrams(query)
+    candidates = (
+        SearchTrigram.objects.filter(field=field, trigram__in=grams)
+        .values("term")
+        .annotate(matched=Count("id"))
+        .filter(matched=len(grams))
+        .values("term")
+    )
+    return SearchTerm.objects.filter(id__in=candidates, value__icontains=query).values("value")
+
+
+def similar_terms(field, query):
+    """依 trigram 相似度（Jaccard）排序、達到 JOBS_FUZZY_THRESHOLD 的前 JOBS_FUZZY_MAX_TERMS 個值與相似度"""
+    grams = trigrams(query)
+    if not grams:
+        return []
+    threshold = getattr(settings, "JOBS_FUZZY_THRESHOLD", 0.3)
+    limit = getattr(settings, "JOBS_FUZZY_MAX_TERMS", 50)
+    shared = Cast(Count("trigrams"), FloatField())
+    return list(
+        SearchTerm.objects.filter(field=field, trigrams__trigram__in=grams)
+        .annotate(similarity=shared / (Value(float(len(grams))) + F("trigram_count") - shared))
+        .filter(similarity__gte=threshold)
+        .order_by("-similarity", "value")
+        .values_list("value", "similarity")[:limit]
+    )
+
+
+def substring_filter(field, query):
+    """
+    與 Q(field__icontains=query) 相同結果的條件。query 至少三個字元且符合的值不超過
+    JOBS_TRIGRAM_MAX_TERMS 個時，改以索引欄位的 IN 比對；符合的值很多時職缺也很密集，
+    直接沿排序索引掃描 icontains 反而較快。
+    """
+    limit = getattr(settings, "JOBS_TRIGRAM_MAX_TERMS", 50)
+    if trigrams(query):
+        values = list(substring_terms(field, query).values_list("value", flat=True)[:limit + 1])
+        if len(values) <= limit:
+            return Q(**{f"{field}__in": values})
+    return Q(**{f"{field}__icontains": query})
+
+
+def fuzzy_filter(field, query):
+    """
+    模糊搜尋：包含 query 的值，加上 trigram 相似度達門檻的值（容許拼字錯誤）。
+    回傳 (條件, 排序分數)，子字串符合的分數為 1，其餘為相似度。
+    """
+    similar = similar_terms(field, query)
+    contains = substring_filter(field, query)
+    condition = contains
+    if similar:
+        condition |= Q(**{f"{field}__in": [value for value, _ in similar]})
+    score = Case(
+        When(contains, then=Value(1.0)),
+        *(When(**{field: value}, then=Value(similarity)) for value, similarity in similar),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return condition, score
@@ -0,0 +1,45 @@
+from django.db import connections
+from django.db.models.sql import UpdateQuery
+
+
+def supports_update_returning(connection):
+    # PostgreSQL 與 SQLite 3.35+ 支援 UPDATE ... RETURNING；MySQL / MariaDB 只支援 INSERT / DELETE
+    return connection.features.can_return_columns_from_insert and connection.vendor != "mysql"
+
+
+def update_returning(model, pk, values, *conditions, using="default"):
+    """
+    以單一 UPDATE ... RETURNING 更新主鍵為 pk 且符合 conditions 的列，只寫入 values 中的欄位，
+    回傳更新後的 model instance；沒有符合條件的列時回傳 None。
+
+    資料庫不支援 RETURNING 時退回 update() 後再讀取一次。
+    """
+    queryset = model._base_manager.using(using).filter(pk=pk).filter(*conditions)
+    connection = connections[using]
+    if not supports_update_returning(connection):
+        if not queryset.update(**values):
+            return None
+        return model._base_manager.using(using).get(pk=pk)
+
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    compiler = query.get_compiler(using)
+    compiler.pre_sql_setup()
+    sql, params = compiler.as_sql()
+
+    fields = model._meta.concrete_fields
+    quote_name = connection.ops.quote_name
+    sql = f"{sql} RETURNING {', '.join(quote_name(field.column) for field in fields)}"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+
+    # 與一般 SELECT 相同，套用欄位的 from_db_value 轉換（例如 JSONField、時區）
+    select_compiler = connection.ops.compiler("SQLCompiler")(query, connection, using)
+    columns = [field.get_col(model._meta.db_table) for field in fields]
+    converters = select_compiler.get_converters(columns)
+    if converters:
+        row = next(iter(select_compiler.apply_converters([row], converters)))
+    return model.from_db(using, [field.attname for field in fields], row)
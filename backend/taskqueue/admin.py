@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """背景工作的執行狀態，只供查閱"""
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'available_at', 'worker', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = [field.name for field in Task._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,14 @@
+from django.shortcuts import get_object_or_404
+from ninja import Router
+
+from .models import Task
+from .schemas import MessageSchema, TaskSchema
+from user_auth.authentication import jwt_auth
+
+router = Router()
+
+
+@router.get("/{task_id}", response={200: TaskSchema, 404: MessageSchema}, auth=jwt_auth)
+def get_task(request, task_id: int):
+    """查詢背景工作的狀態與結果，供加入工作的端點回傳的 id 輪詢"""
+    return 200, get_object_or_404(Task, id=task_id)
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TaskqueueConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'taskqueue'
+
+    def ready(self):
+        # 載入各 app 的 tasks 模組，註冊其中以 @task 宣告的工作；worker 行程與 API 行程看到相同的工作清單
+        autodiscover_modules('tasks')
@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from taskqueue import queue
+
+
+class Command(BaseCommand):
+    help = '將背景工作加入佇列，例如由 crontab 定時加入 jobs.update_statuses，交給 run_worker 執行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help='工作名稱')
+        parser.add_argument('--kwargs', default='{}', help='工作參數（JSON 物件）')
+        parser.add_argument('--list', action='store_true', help='列出已註冊的工作')
+
+    def handle(self, *args, **options):
+        if options['list'] or not options['name']:
+            for name in sorted(queue.registry):
+                self.stdout.write(name)
+            return
+        try:
+            kwargs = json.loads(options['kwargs'])
+        except ValueError as e:
+            raise CommandError(f'--kwargs 不是有效的 JSON：{e}')
+        if not isinstance(kwargs, dict):
+            raise CommandError('--kwargs 必須是 JSON 物件')
+        try:
+            task = queue.enqueue(options['name'], **kwargs)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'已加入工作 {task.name} #{task.id}'))
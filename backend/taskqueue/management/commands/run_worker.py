@@ -0,0 +1,39 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from taskqueue.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('執行背景工作佇列的 worker：從資料庫認領工作並在執行緒池或行程池中執行，'
+            '收到 SIGINT / SIGTERM 後不再認領新工作，等待執行中的工作結束')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='同時執行的工作數')
+        parser.add_argument('--processes', action='store_true', help='以行程池執行工作（CPU 為主的工作），預設為執行緒池')
+        parser.add_argument('--name', help='worker 名稱，預設為「主機名稱:pid」')
+        parser.add_argument('--once', action='store_true', help='執行完目前已到時間的工作後結束（供 cron 使用）')
+        parser.add_argument('--silent', action='store_true', help='不輸出結束訊息')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] <= 0:
+            raise CommandError('--concurrency 必須大於 0')
+
+        worker = Worker(concurrency=options['concurrency'], processes=options['processes'], name=options['name'])
+
+        def shutdown(signum, frame):
+            logger.info(f"收到訊號 {signal.Signals(signum).name}，等待執行中的工作結束")
+            worker.stop()
+
+        previous = {signum: signal.signal(signum, shutdown) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            succeeded, failed = worker.run(once=options['once'])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        if not options['silent']:
+            self.stdout.write(self.style.SUCCESS(f'worker {worker.name} 結束：{succeeded} 個工作完成，{failed} 個工作失敗'))
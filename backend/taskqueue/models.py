@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    背景工作佇列中的一筆工作，由 run_worker 認領後執行。排隊中的工作 available_at 是可以開始執行的時間
+    （重試時往後延），執行中的工作 available_at 是租約到期時間：worker 中斷而沒有延長租約時，
+    到期後由其他 worker 重新認領。
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (SUCCEEDED, "Succeeded"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=9, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    available_at = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True, default="")  # 目前或最後一次認領的 worker
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")  # 最後一次失敗的 traceback
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            # 認領時找出已到時間的排隊中工作與租約到期的執行中工作
+            models.Index(fields=['status', 'available_at'], name='taskqueue_claim'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
@@ -0,0 +1,111 @@
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# 工作名稱 -> 函式，由各 app 的 tasks 模組以 @task 註冊
+registry = {}
+
+
+def task(name, max_attempts=None):
+    """
+    註冊背景工作。函式只接受可序列化為 JSON 的關鍵字參數，回傳值（同樣需可序列化）存到 Task.result；
+    同一個工作可能因 worker 中斷而重新執行，函式需可重複執行。
+    """
+    def decorator(function):
+        registry[name] = function
+        function.task_name = name
+        function.max_attempts = max_attempts
+        return function
+    return decorator
+
+
+def _visibility_timeout():
+    return timedelta(seconds=getattr(settings, "TASKQUEUE_VISIBILITY_TIMEOUT", 300))
+
+
+def enqueue(name, run_at=None, max_attempts=None, **kwargs):
+    """
+    將工作加入佇列並回傳 Task；在呼叫端的交易中寫入，交易回復時工作也不會執行。
+    run_at 為最早執行的時間，預設立即執行。
+    """
+    if name not in registry:
+        raise ValueError(f"Unknown task: {name}")
+    max_attempts = max_attempts or registry[name].max_attempts or getattr(settings, "TASKQUEUE_MAX_ATTEMPTS", 3)
+    return Task.objects.create(name=name, kwargs=kwargs, max_attempts=max_attempts,
+                               available_at=run_at or timezone.now())
+
+
+def claim(worker, limit, now=None):
+    """
+    認領最多 limit 筆已到執行時間的排隊中工作，以及租約已到期的執行中工作（原本的 worker 已中斷），
+    回傳認領到的 Task。每筆以條件式 UPDATE 認領（狀態與 available_at 仍與讀取時相同才更新），
+    多個 worker 同時認領時同一筆工作只有一個會成功；支援 SKIP LOCKED 的資料庫（PostgreSQL）
+    另外以 SELECT ... FOR UPDATE SKIP LOCKED 讀取，各 worker 直接略過其他 worker 正在認領的列。
+    SQLite 不使用外層交易，每個 UPDATE 自行提交，不長時間持有寫入鎖。
+
+    租約到期時已經用完執行次數的工作標記為失敗，不再認領。
+    """
+    now = now or timezone.now()
+    lease = now + _visibility_timeout()
+    candidates = (Task.objects.filter(status__in=(Task.QUEUED, Task.RUNNING), available_at__lte=now)
+                  .order_by("available_at", "id"))
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    claimed = []
+    with transaction.atomic() if skip_locked else nullcontext():
+        if skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        rows = list(candidates.values_list("id", "status", "available_at", "attempts", "max_attempts")[:limit])
+        for task_id, status, available_at, attempts, max_attempts in rows:
+            current = Task.objects.filter(id=task_id, status=status, available_at=available_at)
+            if status == Task.RUNNING and attempts >= max_attempts:
+                if current.update(status=Task.FAILED, finished_at=now,
+                                  error="Visibility timeout expired before the task finished."):
+                    logger.warning(f"工作 #{task_id} 執行逾時且已用完 {max_attempts} 次執行次數，標記為失敗")
+                continue
+            if current.update(status=Task.RUNNING, available_at=lease, attempts=attempts + 1,
+                              worker=worker, started_at=now):
+                claimed.append(task_id)
+    tasks = Task.objects.in_bulk(claimed)
+    return [tasks[task_id] for task_id in claimed]
+
+
+def complete(task, result=None, now=None):
+    """
+    記錄工作成功。只有認領時的 worker 與執行次數仍相同才更新：租約到期後已被其他 worker 重新認領時回傳 False，
+    以重新執行的結果為準。
+    """
+    updated = Task.objects.filter(id=task.id, status=Task.RUNNING, worker=task.worker, attempts=task.attempts).update(
+        status=Task.SUCCEEDED, result=result, error="", finished_at=now or timezone.now())
+    return bool(updated)
+
+
+def fail(task, error, now=None):
+    """
+    記錄工作失敗：還有執行次數時延後重試，第 n 次失敗後等待 TASKQUEUE_RETRY_DELAY * 2^(n-1) 秒；
+    否則標記為失敗。與 complete() 相同，工作已被其他 worker 重新認領時不更新並回傳 False。
+    """
+    now = now or timezone.now()
+    current = Task.objects.filter(id=task.id, status=Task.RUNNING, worker=task.worker, attempts=task.attempts)
+    if task.attempts < task.max_attempts:
+        delay = getattr(settings, "TASKQUEUE_RETRY_DELAY", 10) * 2 ** (task.attempts - 1)
+        updated = current.update(status=Task.QUEUED, available_at=now + timedelta(seconds=delay), error=error)
+    else:
+        updated = current.update(status=Task.FAILED, error=error, finished_at=now)
+    return bool(updated)
+
+
+def renew(worker, task_ids, now=None):
+    """延長 worker 執行中工作的租約，回傳仍由此 worker 持有的筆數"""
+    if not task_ids:
+        return 0
+    lease = (now or timezone.now()) + _visibility_timeout()
+    return Task.objects.filter(id__in=list(task_ids), status=Task.RUNNING, worker=worker).update(available_at=lease)
+
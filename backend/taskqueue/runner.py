@@ -0,0 +1,22 @@
+import django
+from django.db import connections
+
+# 子行程反序列化工作函式與 initializer 時 Django 尚未載入，這個模組在匯入時不載入 models
+
+
+def setup_process():
+    # 子行程以 spawn 啟動，不繼承父行程的資料庫連線，需要自行載入 Django 與各 app 的 tasks 模組
+    django.setup()
+
+
+def execute(name, kwargs):
+    """
+    在 worker 的執行緒或子行程中執行工作，registry 在 setup_process() 載入 Django 之後才匯入。
+    結束後關閉此執行緒的資料庫連線，執行緒池中的執行緒不會各自保留閒置的連線。
+    """
+    from .queue import registry
+
+    try:
+        return registry[name](**kwargs)
+    finally:
+        connections.close_all()
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from ninja import Schema
+
+
+class TaskSchema(Schema):
+    """背景工作的狀態"""
+    id: int
+    name: str
+    status: str  # queued / running / succeeded / failed
+    attempts: int
+    max_attempts: int
+    available_at: datetime  # 排隊中：最早執行的時間；執行中：租約到期時間
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Any] = None
+    error: str = ""
+
+
+class MessageSchema(Schema):
+    message: str
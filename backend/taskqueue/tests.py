@@ -0,0 +1,155 @@
+import os
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_platform.settings')
+django.setup()
+
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+from ninja.testing import TestClient
+from job_platform.api import api
+from django.contrib.auth.models import User
+from taskqueue import queue
+from taskqueue.models import Task
+
+test_client = TestClient(api)
+
+
+@queue.task("tests.add")
+def add(a, b):
+    return {"sum": a + b}
+
+
+@queue.task("tests.boom", max_attempts=2)
+def boom():
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def authenticated_client(db):
+    User.objects.create_user(username="taskuser", password="testpassword123")
+    response = test_client.post("/auth/login", json={"username": "taskuser", "password": "testpassword123"})
+    assert response.status_code == 200, response.content
+    test_client.headers = {"Authorization": f"Bearer {response.json()['access']}"}
+    return test_client
+
+
+# --- Queue Tests --- #
+@pytest.mark.django_db
+def test_enqueue_and_claim_once():
+    """同一筆工作只會被一個 worker 認領，未到執行時間的工作不會被認領"""
+    with pytest.raises(ValueError):
+        queue.enqueue("tests.missing")
+    first = queue.enqueue("tests.add", a=1, b=2)
+    now = timezone.now()
+    queue.enqueue("tests.add", run_at=now + timedelta(minutes=5), a=3, b=4)
+    assert first.max_attempts == 3 and first.kwargs == {"a": 1, "b": 2}
+
+    claimed = queue.claim("worker-a", 10, now=now)
+    assert [task.id for task in claimed] == [first.id]
+    task = claimed[0]
+    assert (task.status, task.worker, task.attempts) == (Task.RUNNING, "worker-a", 1)
+    assert task.available_at == now + timedelta(seconds=300)  # 租約到期時間
+    assert queue.claim("worker-b", 10, now=now) == []
+
+    assert queue.complete(task, {"sum": 3})
+    task.refresh_from_db()
+    assert (task.status, task.result) == (Task.SUCCEEDED, {"sum": 3})
+
+
+@pytest.mark.django_db
+def test_retry_backoff_and_lease_expiry():
+    """失敗後以指數退避重試；租約到期的工作由其他 worker 重新認領，原 worker 的結果不再寫入"""
+    created = queue.enqueue("tests.boom")
+    now = timezone.now()
+    assert created.max_attempts == 2
+
+    task = queue.claim("worker-a", 1, now=now)[0]
+    assert queue.fail(task, "Traceback: boom", now=now)
+    task.refresh_from_db()
+    assert (task.status, task.error) == (Task.QUEUED, "Traceback: boom")
+    assert task.available_at == now + timedelta(seconds=10)
+    assert queue.claim("worker-a", 1, now=now + timedelta(seconds=5)) == []
+
+    # 第二次執行時 worker-a 中斷，租約到期後 worker-b 認領；已用完次數，標記為失敗
+    later = now + timedelta(seconds=10)
+    task = queue.claim("worker-a", 1, now=later)[0]
+    assert task.attempts == 2
+    assert queue.renew("worker-a", [task.id], now=later) == 1
+    assert queue.claim("worker-b", 1, now=later + timedelta(seconds=301)) == []
+    task.refresh_from_db()
+    assert task.status == Task.FAILED and "Visibility timeout" in task.error
+    assert not queue.complete(task, {"late": True})
+
+    # 還有次數的工作租約到期後重新認領，原 worker 的完成不會覆蓋新的執行
+    retried = queue.enqueue("tests.add", a=1, b=1)
+    stale = queue.claim("worker-a", 1, now=later)[0]
+    fresh = queue.claim("worker-b", 1, now=later + timedelta(seconds=301))[0]
+    assert fresh.id == retried.id and fresh.attempts == 2
+    assert not queue.complete(stale, {"sum": 2})
+    assert queue.complete(fresh, {"sum": 2})
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_worker_once():
+    """run_worker --once 在執行緒池中執行所有已到時間的工作後結束"""
+    added = [queue.enqueue("tests.add", a=i, b=i) for i in range(5)]
+    failing = queue.enqueue("tests.boom", max_attempts=1)
+
+    call_command("run_worker", "--once", "--concurrency", "2", "--silent")
+
+    for task in added:
+        task.refresh_from_db()
+        assert task.status == Task.SUCCEEDED
+        assert task.result == {"sum": task.kwargs["a"] * 2}
+    failing.refresh_from_db()
+    assert failing.status == Task.FAILED and failing.attempts == 1
+    assert "RuntimeError: boom" in failing.error
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_survives_database_errors_when_recording_results(monkeypatch):
+    """記錄結果時資料庫暫時無法寫入不會中斷 worker，該工作在租約到期後重新認領"""
+    from django.db import OperationalError
+    from taskqueue.worker import Worker
+
+    first = queue.enqueue("tests.add", a=1, b=2)
+    second = queue.enqueue("tests.add", a=2, b=2)
+    complete = queue.complete
+    calls = []
+
+    def flaky_complete(task, result=None, now=None):
+        calls.append(task.id)
+        if len(calls) == 1:
+            raise OperationalError("database is locked")
+        return complete(task, result, now)
+
+    monkeypatch.setattr(queue, "complete", flaky_complete)
+    assert Worker(concurrency=1, poll_interval=0.01).run(once=True) == (1, 0)
+
+    locked, recorded = (Task.objects.get(id=task_id) for task_id in calls)
+    assert {locked.id, recorded.id} == {first.id, second.id}
+    assert locked.status == Task.RUNNING and recorded.status == Task.SUCCEEDED
+    reclaimed = queue.claim("worker-b", 1, now=timezone.now() + timedelta(seconds=301))
+    assert [task.id for task in reclaimed] == [locked.id]
+
+
+@pytest.mark.django_db
+def test_background_update_status_and_task_lookup(authenticated_client):
+    """background=true 時 update-status 回傳 202 與排隊中的工作，可由 /tasks/{id} 查詢"""
+    response = authenticated_client.post("/jobs/update-status", query_params={"background": "true"})
+    assert response.status_code == 202, response.content
+    data = response.json()
+    assert (data["name"], data["status"]) == ("jobs.update_statuses", Task.QUEUED)
+
+    task = queue.claim("worker-a", 1)[0]
+    queue.complete(task, queue.registry[task.name](**task.kwargs))
+    response = authenticated_client.get(f"/tasks/{data['id']}")
+    assert response.status_code == 200
+    assert response.json()["status"] == Task.SUCCEEDED
+    assert set(response.json()["result"]) == {"expired", "activated", "active"}
+
+    assert authenticated_client.get("/tasks/999999").status_code == 404
+    assert TestClient(api).get(f"/tasks/{data['id']}").status_code == 401
@@ -0,0 +1,122 @@
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from . import queue
+from .runner import execute, setup_process
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    從資料庫佇列認領並執行工作。主執行緒負責認領、記錄結果與延長租約，工作在執行緒池或行程池中執行，
+    同時執行的工作數不超過 concurrency。I/O 為主的工作使用執行緒，CPU 為主的工作（建立索引等）
+    使用行程才能使用多個核心。stop() 後不再認領新工作，等待執行中的工作結束。
+    """
+
+    def __init__(self, concurrency=1, processes=False, name=None, poll_interval=None):
+        self.concurrency = concurrency
+        self.processes = processes
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval if poll_interval is not None else getattr(settings, "TASKQUEUE_POLL_INTERVAL", 1.0)
+        self.succeeded = self.failed = 0
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _executor(self):
+        if self.processes:
+            return ProcessPoolExecutor(self.concurrency, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=setup_process)
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix="taskqueue")
+
+    def _claim(self, limit):
+        try:
+            return queue.claim(self.name, limit)
+        except DatabaseError:
+            # SQLite 寫入鎖被其他行程持有等暫時性錯誤，下一輪再認領
+            logger.exception("認領工作失敗")
+            close_old_connections()
+            return []
+
+    def _finish(self, task, future):
+        try:
+            self._record(task, future)
+        except DatabaseError:
+            # 與認領相同的暫時性錯誤：不中斷 worker，工作維持執行中，租約到期後由其他 worker 重新認領
+            logger.exception(f"記錄工作 {task.name} #{task.id} 的結果失敗，租約到期後重新執行")
+            close_old_connections()
+
+    def _record(self, task, future):
+        error = future.exception()
+        if error is None:
+            try:
+                if queue.complete(task, future.result()):
+                    self.succeeded += 1
+                    logger.info(f"工作 {task.name} #{task.id} 完成")
+                else:
+                    logger.warning(f"工作 {task.name} #{task.id} 的租約已到期並被重新認領，不記錄這次的結果")
+                return
+            except (TypeError, ValueError) as e:
+                error = e  # 回傳值無法序列化為 JSON
+        message = "".join(traceback.format_exception(error))
+        if queue.fail(task, message):
+            retry = task.attempts < task.max_attempts
+            self.failed += not retry
+            logger.error(f"工作 {task.name} #{task.id} 第 {task.attempts} 次執行失敗"
+                         f"{'，稍後重試' if retry else '，不再重試'}：{error!r}")
+
+    def run(self, once=False):
+        """
+        執行直到 stop() 被呼叫；once 為 True 時執行完目前已到時間的工作後結束。回傳 (成功數, 失敗數)，
+        失敗數不含稍後重試的工作。
+        """
+        renew_interval = getattr(settings, "TASKQUEUE_VISIBILITY_TIMEOUT", 300) / 3
+        last_renewed = time.monotonic()
+        running = {}
+        logger.info(f"worker {self.name} 啟動，同時執行 {self.concurrency} 個工作（{'行程' if self.processes else '執行緒'}）")
+        executor = self._executor()
+        try:
+            while running or not self._stopping.is_set():
+                free = self.concurrency - len(running)
+                if free and not self._stopping.is_set():
+                    for task in self._claim(free):
+                        logger.info(f"工作 {task.name} #{task.id} 開始第 {task.attempts} 次執行")
+                        running[executor.submit(execute, task.name, task.kwargs)] = task
+                if not running:
+                    if once:
+                        break
+                    self._stopping.wait(self.poll_interval)
+                    continue
+
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    broken |= isinstance(future.exception(), BrokenExecutor)
+                    self._finish(running.pop(future), future)
+                if broken:
+                    # 子行程異常結束（記憶體不足等）時整個行程池無法再使用，其中的工作都已記錄失敗，建立新的行程池
+                    logger.error("行程池中的子行程異常結束，重新建立行程池")
+                    executor.shutdown(wait=False)
+                    executor = self._executor()
+
+                if running and time.monotonic() - last_renewed >= renew_interval:
+                    try:
+                        queue.renew(self.name, [task.id for task in running.values()])
+                        last_renewed = time.monotonic()
+                    except DatabaseError:
+                        logger.exception("延長工作租約失敗")
+        finally:
+            executor.shutdown(wait=True)
+        logger.info(f"worker {self.name} 結束：{self.succeeded} 個工作完成，{self.failed} 個工作失敗")
+        return self.succeeded, self.failed
@@ -11,6 +11,14 @@ echo "開始執行職缺狀態更新 $(date)"
 # 啟用虛擬環境並執行命令
 source venv/bin/activate
 python manage.py update_job_status
+# 將到期超過 JOBS_ARCHIVE_AFTER_DAYS 天的職缺搬到封存表
+python manage.py archive_jobs --silent
+# 永久刪除超過 JOBS_RETENTION_DAYS 的職缺
+python manage.py purge_jobs --silent
+# 壓縮職缺變更紀錄，每筆職缺只保留最新的一筆
+python manage.py compact_job_changes --silent
+# 重建相似職缺索引並存檔，API 行程啟動時直接讀取
+python manage.py build_similar_index
 echo "更新完成時間：$(date)"
 
 # 說明
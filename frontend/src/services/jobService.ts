@@ -1,5 +1,5 @@
 import api from './api'
-import type { Job, JobCreate, JobUpdate, JobFilter, PaginationParams, PagedJobListSchema } from '@/types'
+import type { Job, JobCreate, JobUpdate, JobFilter, PaginationParams, PagedJobListSchema, JobBatchResponse, JobFacets, FacetValue, SimilarJob, SavedSearch, SavedSearchCreate, PagedSavedSearchMatches, JobChangesResponse, JobEvent } from '@/types'
 
 export class JobService {
   static async getJobs(
@@ -38,6 +38,105 @@ export class JobService {
     return response.data
   }
 
+  // 與 getJobs 相同篩選條件下的各狀態、地點、公司與技能數量
+  static async getJobFacets(filters: JobFilter = {}, limit = 10): Promise<JobFacets> {
+    const params = new URLSearchParams()
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        params.append(key, Array.isArray(value) ? value.join(',') : value.toString())
+      }
+    })
+    params.append('limit', limit.toString())
+    const response = await api.get(`/jobs/facets?${params.toString()}`)
+    return response.data
+  }
+
+  // 輸入提示：field 為 title、company_name、location 或 required_skills
+  static async suggest(field: string, prefix: string, limit = 10): Promise<FacetValue[]> {
+    const params = new URLSearchParams({ field, prefix, limit: limit.toString() })
+    const response = await api.get(`/jobs/suggest?${params.toString()}`)
+    return response.data
+  }
+
+  // 與指定職缺最相似的上架中職缺，依相似度排序
+  static async getSimilarJobs(id: number, limit = 10): Promise<SimilarJob[]> {
+    const response = await api.get(`/jobs/${id}/similar?limit=${limit}`)
+    return response.data
+  }
+
+  // 儲存目前的篩選條件，之後新上架且符合的職缺會記錄在 matches 中
+  static async createSavedSearch(search: SavedSearchCreate): Promise<SavedSearch> {
+    const response = await api.post('/jobs/saved-searches', search)
+    return response.data
+  }
+
+  static async getSavedSearches(): Promise<SavedSearch[]> {
+    const response = await api.get('/jobs/saved-searches')
+    return response.data
+  }
+
+  static async deleteSavedSearch(id: number): Promise<void> {
+    await api.delete(`/jobs/saved-searches/${id}`)
+  }
+
+  // 符合儲存搜尋的新職缺，pending 為 true 時只列出尚未通知的
+  static async getSavedSearchMatches(id: number, page = 1, pending = false): Promise<PagedSavedSearchMatches> {
+    const response = await api.get(`/jobs/saved-searches/${id}/matches?page=${page}&pending=${pending}`)
+    return response.data
+  }
+
+  // 一次取得多筆職缺，依傳入順序回傳，不存在的 id 列在 missing
+  static async getJobsBatch(ids: number[]): Promise<JobBatchResponse> {
+    const response = await api.get(`/jobs/batch?ids=${ids.join(',')}`)
+    return response.data
+  }
+
+  // 讀取游標 since 之後的職缺變更，以回傳的 next_cursor 繼續讀取
+  static async getJobChanges(since = 0, limit = 100): Promise<JobChangesResponse> {
+    const response = await api.get(`/jobs/changes?since=${since}&limit=${limit}`)
+    return response.data
+  }
+
+  // 訂閱職缺事件（SSE）。EventSource 無法帶 Authorization header，改以 fetch 讀取串流；
+  // 連線結束時回傳最後收到的事件 id，重新連線時傳入 lastEventId 補讀中斷期間的事件
+  static async streamJobEvents(
+    onEvent: (event: JobEvent) => void,
+    options: { company_name?: string; status?: string; lastEventId?: number; signal?: AbortSignal } = {},
+  ): Promise<number | undefined> {
+    const params = new URLSearchParams()
+    if (options.company_name) params.append('company_name', options.company_name)
+    if (options.status) params.append('status', options.status)
+    const headers: Record<string, string> = { Authorization: `Bearer ${localStorage.getItem('access_token')}` }
+    let lastEventId = options.lastEventId
+    if (lastEventId !== undefined) headers['Last-Event-ID'] = String(lastEventId)
+
+    const response = await fetch(`${api.defaults.baseURL}/jobs/events?${params.toString()}`, {
+      headers,
+      signal: options.signal,
+    })
+    if (!response.ok || !response.body) {
+      throw new Error(`Event stream failed with status ${response.status}`)
+    }
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+    for (;;) {
+      const { value, done } = await reader.read()
+      if (done) return lastEventId
+      buffer += value
+      let end = buffer.indexOf('\n\n')
+      while (end >= 0) {
+        const data = buffer.slice(0, end).split('\n').find((line) => line.startsWith('data: '))
+        buffer = buffer.slice(end + 2)
+        if (data) {
+          const event = JSON.parse(data.slice(6)) as JobEvent
+          lastEventId = event.id
+          onEvent(event)
+        }
+        end = buffer.indexOf('\n\n')
+      }
+    }
+  }
+
   static async createJob(job: JobCreate): Promise<Job> {
     const response = await api.post('/jobs', job)
     return response.data
@@ -48,6 +147,12 @@ export class JobService {
     return response.data
   }
 
+  // 只送出變更的欄位；version 與伺服器不一致時回傳 409
+  static async patchJob(id: number, job: JobUpdate & { version: number }): Promise<Job> {
+    const response = await api.patch(`/jobs/${id}`, job)
+    return response.data
+  }
+
   static async deleteJob(id: number): Promise<void> {
     await api.delete(`/jobs/${id}`)
   }
@@ -4,11 +4,15 @@ export interface Job {
   description: string
   location: string
   salary_range: string
+  salary_min: number | null
+  salary_max: number | null
+  salary_currency: string
   company_name: string
   posting_date: string
   expiration_date: string
   required_skills: string[]
   status: string
+  version: number
 }
 
 export interface JobListItem {
@@ -22,6 +26,10 @@ export interface JobListItem {
   status: string
 }
 
+export interface SimilarJob extends JobListItem {
+  similarity: number
+}
+
 export interface JobCreate {
   title: string
   description: string
@@ -50,6 +58,43 @@ export interface JobFilter {
   location?: string
   required_skills?: string[] | string
   status?: string
+  salary_min_gte?: number
+  salary_max_lte?: number
+  salary_currency?: string
+  fuzzy?: boolean
+  q?: string
+}
+
+export interface SavedSearchCreate {
+  name: string
+  title?: string
+  description?: string
+  company_name?: string
+  location?: string
+  salary_range?: string
+  required_skills?: string
+  status?: 'active' | 'scheduled'
+  salary_min_gte?: number
+  salary_max_lte?: number
+  salary_currency?: string
+}
+
+export interface SavedSearch {
+  id: number
+  name: string
+  filters: Record<string, string | number>
+  created_at: string
+}
+
+export interface SavedSearchMatch {
+  job_id: number
+  matched_at: string
+  delivered_at: string | null
+}
+
+export interface PagedSavedSearchMatches {
+  items: SavedSearchMatch[]
+  count: number
 }
 
 export interface PaginationParams {
@@ -62,10 +107,59 @@ export interface PagedJobListSchema {
   count: number
 }
 
+export interface JobBatchResponse {
+  items: Job[]
+  missing: number[]
+}
+
+// GET /jobs/changes：cursor 之後的變更，upsert 附上職缺目前的內容
+export interface JobChange {
+  cursor: number
+  operation: 'upsert' | 'delete'
+  job_id: number
+  changed_at: string
+  job: Job | null
+}
+
+export interface JobChangesResponse {
+  items: JobChange[]
+  next_cursor: number
+  has_more: boolean
+}
+
+// GET /jobs/events（Server-Sent Events）每個事件的 data
+export interface JobEvent {
+  id: number
+  event: 'created' | 'updated' | 'status' | 'deleted'
+  job_id: number
+  changed_at: string
+  title: string | null
+  company_name: string | null
+  status: string | null
+}
+
+export interface FacetValue {
+  value: string
+  count: number
+}
+
+export interface JobFacets {
+  count: number
+  status: Record<string, number>
+  location: FacetValue[]
+  company_name: FacetValue[]
+  required_skills: FacetValue[]
+}
+
 export interface ApiError {
   message: string
 }
 
+// POST /jobs 遇到同公司的近似重複刊登時回傳 409
+export interface DuplicateJobError extends ApiError {
+  duplicate_of: number
+}
+
 export interface AuthTokens {
   access: string
   refresh: string